@@ -0,0 +1,284 @@
+"""
+Batch Analysis Module: Run the NLP pipeline over a corpus without the UI
+
+Reads articles from a CSV or JSONL file, analyzes them on a process pool
+and appends one JSON line per article to the output file. Each worker
+loads the models once and analyzes a chunk of articles with the batched
+pipeline functions (identify_entities_many, entity_ranking_many,
+generate_summary_many), so the models see many sentences per forward pass.
+
+The output file is the checkpoint. On start, the ids already written are
+skipped, so a killed run continues where it stopped. A half-written last
+line is dropped. Articles that fail are written to <output>.errors.jsonl
+and retried on the next run.
+
+Usage:
+    python -m features.batch_analysis testing/summarization/summarization_dataset.csv -o results.jsonl
+    python -m features.batch_analysis archive.jsonl -o results.jsonl --workers 4 --parquet
+"""
+
+import os
+import sys
+import csv
+import json
+import time
+import argparse
+from pathlib import Path
+from multiprocessing import get_context
+
+sys.dont_write_bytecode = True
+
+# Articles analyzed together by one worker (one set of batched model calls)
+BATCH_CHUNK_SIZE = int(os.getenv("BATCH_CHUNK_SIZE", "16"))
+BATCH_WORKERS = int(os.getenv("BATCH_WORKERS", "2"))
+
+# Column names tried in order when --text-column / --title-column / --id-column are not given
+TEXT_COLUMNS = ("full_text", "description", "content", "text", "original-text")
+TITLE_COLUMNS = ("headline", "title")
+ID_COLUMNS = ("article_id", "articleid", "id")
+
+
+def pick_column(fields, preferred, candidates):
+    """Return the preferred column if given, otherwise the first candidate present in fields."""
+    if preferred:
+        return preferred
+    return next((name for name in candidates if name in fields), None)
+
+
+def read_articles(path, text_column=None, title_column=None, id_column=None):
+    """
+    Yield {'id', 'title', 'description'} dicts from a CSV or JSONL file.
+
+    Rows without text are skipped. Without an id column, the row number is used.
+    """
+    path = Path(path)
+    if path.suffix.lower() in (".jsonl", ".json"):
+        def rows():
+            with open(path, encoding="utf-8") as file:
+                for line in file:
+                    if line.strip():
+                        yield json.loads(line)
+    else:
+        def rows():
+            with open(path, encoding="utf-8", newline="") as file:
+                yield from csv.DictReader(file)
+
+    columns = None
+    for row_number, row in enumerate(rows(), 1):
+        if columns is None:
+            columns = (
+                pick_column(row, text_column, TEXT_COLUMNS),
+                pick_column(row, title_column, TITLE_COLUMNS),
+                pick_column(row, id_column, ID_COLUMNS),
+            )
+            if columns[0] is None:
+                raise ValueError(f"No text column found in {path}; use --text-column")
+
+        text_key, title_key, id_key = columns
+        text = row.get(text_key) or ""
+        if not text.strip():
+            continue
+        yield {
+            "id": str(row.get(id_key)) if id_key and row.get(id_key) is not None else str(row_number),
+            "title": row.get(title_key, "") if title_key else "",
+            "description": text,
+        }
+
+
+def completed_ids(output_path):
+    """
+    Ids already present in the output file (the checkpoint).
+
+    A line cut off by a killed run is removed so new lines are appended cleanly.
+    """
+    done = set()
+    if not os.path.exists(output_path):
+        return done
+
+    with open(output_path, "rb+") as file:
+        data = file.read()
+        complete_length = data.rfind(b"\n") + 1
+        if complete_length < len(data):
+            file.truncate(complete_length)
+
+    for line in data[:complete_length].splitlines():
+        try:
+            done.add(json.loads(line)["id"])
+        except (ValueError, KeyError):
+            continue
+    return done
+
+
+def chunks(items, size):
+    chunk = []
+    for item in items:
+        chunk.append(item)
+        if len(chunk) == size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+# Set per worker by init_worker()
+INCLUDE_GRAPH = True
+
+
+def init_worker(threads_per_worker, include_graph):
+    """Load the models once per worker process."""
+    import torch
+    from features.model_registry import warm_up
+
+    # Workers share the CPU instead of each using every core
+    torch.set_num_threads(threads_per_worker)
+    # Also opens the entity embedding cache, whose folder is shared with the UI and the
+    # other workers; its disk tier appends under a file lock (see embedding_cache.py)
+    warm_up()
+
+    global INCLUDE_GRAPH
+    INCLUDE_GRAPH = include_graph
+
+
+def analyze_chunk(articles):
+    """
+    Analyze a chunk of articles with batched model calls.
+
+    Returns:
+        A list of (article, result, error) tuples; result is None when error is set.
+    """
+    from features.document import build_document
+    from features.flair_ner import identify_entities_many
+    from features.entity_ranking_and_summarization import entity_ranking_many, generate_summary_many
+    from features.relationship_mapping import build_graph
+
+    try:
+        documents = [build_document(article["description"]) for article in articles]
+        entities = identify_entities_many(documents)
+        rankings = entity_ranking_many(list(zip(documents, entities)))
+        summaries = generate_summary_many(list(zip(documents, rankings)))
+    except Exception as e:
+        # Retry one by one so a single bad article doesn't fail the whole chunk
+        if len(articles) > 1:
+            return [outcome for article in articles for outcome in analyze_chunk([article])]
+        return [(articles[0], None, str(e))]
+
+    outcomes = []
+    for article, document, article_entities, article_rankings, summary in zip(
+            articles, documents, entities, rankings, summaries):
+        try:
+            top_names = [e['name'] for e in article_rankings]
+            graph = build_graph(document, top_names) if INCLUDE_GRAPH and len(top_names) > 1 else {}
+            outcomes.append((article, {
+                "original-text": document.clean_text,
+                "summary": summary['summary'],
+                "graph": graph,
+                "all_entities": article_entities,
+                "rankings": article_rankings,
+            }, None))
+        except Exception as e:
+            outcomes.append((article, None, str(e)))
+    return outcomes
+
+
+def export_parquet(output_path):
+    """Convert the finished JSONL output to Parquet next to it (needs pandas and pyarrow)."""
+    try:
+        import pandas as pd
+        parquet_path = Path(output_path).with_suffix(".parquet")
+        frame = pd.read_json(output_path, lines=True)
+        # Nested lists are stored as JSON strings so the file reads back with any engine
+        for column in ("all_entities", "rankings", "graph"):
+            frame[column] = frame[column].map(json.dumps)
+        frame.to_parquet(parquet_path, index=False)
+        print(f"Wrote {parquet_path}")
+    except ImportError as e:
+        print(f"Parquet export skipped, missing dependency: {e}")
+
+
+def run_batch(input_path, output_path, workers=BATCH_WORKERS, chunk_size=BATCH_CHUNK_SIZE,
+              include_graph=True, store_in_cache=False, **column_names):
+    """
+    Analyze every article of input_path that is not yet in output_path.
+
+    Returns:
+        A dict with counts of analyzed, skipped and failed articles.
+    """
+    done = completed_ids(output_path)
+    skipped = len(done)
+
+    def pending_articles():
+        for article in read_articles(input_path, **column_names):
+            # Also skips repeated ids within the input
+            if article["id"] not in done:
+                done.add(article["id"])
+                yield article
+
+    if store_in_cache:
+        from features.result_cache import analysis_cache_key, store_analysis
+
+    threads_per_worker = max(1, (os.cpu_count() or 1) // max(1, workers))
+    counts = {"analyzed": 0, "skipped": skipped, "failed": 0}
+    start = time.perf_counter()
+    errors_path = f"{output_path}.errors.jsonl"
+
+    # spawn: workers start clean instead of inheriting this process's threads and sockets
+    with get_context("spawn").Pool(workers, initializer=init_worker, initargs=(threads_per_worker, include_graph)) as pool, \
+            open(output_path, "a", encoding="utf-8") as output, \
+            open(errors_path, "a", encoding="utf-8") as errors:
+
+        for outcomes in pool.imap_unordered(analyze_chunk, chunks(pending_articles(), chunk_size)):
+            for article, result, error in outcomes:
+                if error:
+                    errors.write(json.dumps({"id": article["id"], "error": error}) + "\n")
+                    counts["failed"] += 1
+                    continue
+
+                output.write(json.dumps({"id": article["id"], "title": article["title"], **result}) + "\n")
+                counts["analyzed"] += 1
+                if store_in_cache:
+                    store_analysis(analysis_cache_key(result["original-text"]), result)
+
+            # Every finished chunk is on disk before the next one is counted as done
+            output.flush()
+            os.fsync(output.fileno())
+            errors.flush()
+
+            elapsed = time.perf_counter() - start
+            print(f"{counts['analyzed']} analyzed, {counts['failed']} failed "
+                  f"({counts['analyzed'] / elapsed:.2f} articles/s)")
+
+    return counts
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the EntiLytics pipeline over a CSV or JSONL corpus.")
+    parser.add_argument("input", help="CSV or JSONL file of articles")
+    parser.add_argument("-o", "--output", required=True, help="JSONL output file (also the resume checkpoint)")
+    parser.add_argument("--workers", type=int, default=BATCH_WORKERS, help="Worker processes")
+    parser.add_argument("--chunk-size", type=int, default=BATCH_CHUNK_SIZE, help="Articles per batched model call")
+    parser.add_argument("--text-column", help="Column with the article text")
+    parser.add_argument("--title-column", help="Column with the headline")
+    parser.add_argument("--id-column", help="Column with a unique article id")
+    parser.add_argument("--no-graph", action="store_true", help="Skip the relationship map")
+    parser.add_argument("--store-cache", action="store_true", help="Also save results in the analysis cache table")
+    parser.add_argument("--parquet", action="store_true", help="Export the output to Parquet when done")
+    args = parser.parse_args()
+
+    counts = run_batch(
+        args.input, args.output,
+        workers=args.workers,
+        chunk_size=args.chunk_size,
+        include_graph=not args.no_graph,
+        store_in_cache=args.store_cache,
+        text_column=args.text_column,
+        title_column=args.title_column,
+        id_column=args.id_column,
+    )
+    print(f"Done: {counts}")
+
+    if args.parquet:
+        export_parquet(args.output)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,8 +1,12 @@
 import os
 import uuid
+import time
+import hashlib
+import threading
+from contextlib import contextmanager
 from datetime import datetime, timezone
 from dotenv import load_dotenv
-from sqlalchemy import create_engine, text, Column, BigInteger, String, Text, ForeignKey, DateTime
+from sqlalchemy import create_engine, event, text, Column, BigInteger, Integer, Float, String, Text, LargeBinary, ForeignKey, DateTime, Date, Index
 from sqlalchemy.orm import sessionmaker, declarative_base
 from sqlalchemy.sql import func
 
@@ -19,10 +23,109 @@ if not all([DB_USER, DB_PASS, DB_HOST, DB_NAME]):
     raise RuntimeError("Missing database environment variables!")
 
 DATABASE_URL = f"postgresql://{DB_USER}:{DB_PASS}@{DB_HOST}:5432/{DB_NAME}?sslmode=require"
-engine = create_engine(DATABASE_URL, connect_args={"connect_timeout": 10})
 
+# Connection pool settings
+# Connections kept open per process, and extra ones allowed under load
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "5"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+# Seconds to wait for a free connection before failing instead of hanging
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "10"))
+# Replace connections older than this; Azure drops idle SSL connections server-side
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "300"))
 
-SessionLocal = sessionmaker(bind=engine, autocommit=False, autoflush=False)
+engine = create_engine(
+    DATABASE_URL,
+    connect_args={"connect_timeout": 10},
+    pool_size=DB_POOL_SIZE,
+    max_overflow=DB_MAX_OVERFLOW,
+    pool_timeout=DB_POOL_TIMEOUT,
+    pool_recycle=DB_POOL_RECYCLE,
+    # Test each connection with a cheap round-trip before use so a dropped one is replaced, not raised
+    pool_pre_ping=True,
+    # Reuse the most recent connection so surplus ones sit idle and get recycled
+    pool_use_lifo=True,
+)
+
+# Objects stay readable after the session closes (helpers return ORM rows to the UI)
+SessionLocal = sessionmaker(bind=engine, autocommit=False, autoflush=False, expire_on_commit=False)
+
+# Pool metrics
+_pool_metrics = {
+    "checkouts": 0,
+    "connects": 0,
+    "invalidated": 0,
+    "wait_seconds_total": 0.0,
+    "wait_seconds_max": 0.0,
+}
+_pool_metrics_lock = threading.Lock()
+
+
+@event.listens_for(engine, "connect")
+def _count_connect(dbapi_connection, connection_record):
+    with _pool_metrics_lock:
+        _pool_metrics["connects"] += 1
+
+
+@event.listens_for(engine, "invalidate")
+def _count_invalidate(dbapi_connection, connection_record, exception):
+    # Includes stale connections caught by pre-ping
+    with _pool_metrics_lock:
+        _pool_metrics["invalidated"] += 1
+
+
+def pool_stats():
+    """
+    Current pool usage and checkout wait times, for monitoring.
+
+    Returns:
+        A dict with the pool size and limits, checked-out and overflow connections,
+        and checkout counters (wait = time to get a usable connection, including pre-ping).
+    """
+    pool = engine.pool
+    with _pool_metrics_lock:
+        metrics = dict(_pool_metrics)
+    checkouts = metrics["checkouts"]
+    return {
+        "pool_size": pool.size(),
+        "max_overflow": DB_MAX_OVERFLOW,
+        "checked_out": pool.checkedout(),
+        "checked_in": pool.checkedin(),
+        "overflow": max(0, pool.overflow()),
+        **metrics,
+        "wait_seconds_avg": metrics["wait_seconds_total"] / checkouts if checkouts else 0.0,
+    }
+
+
+@contextmanager
+def session_scope():
+    """
+    Database session for one unit of work.
+
+    Commits when the block finishes, rolls back and re-raises on error,
+    and always returns the connection to the pool.
+
+    Usage:
+        with session_scope() as db:
+            db.query(...)
+    """
+    db = SessionLocal()
+    try:
+        # Take the connection up front so the pool wait can be measured
+        start = time.perf_counter()
+        db.connection()
+        waited = time.perf_counter() - start
+        with _pool_metrics_lock:
+            _pool_metrics["checkouts"] += 1
+            _pool_metrics["wait_seconds_total"] += waited
+            _pool_metrics["wait_seconds_max"] = max(_pool_metrics["wait_seconds_max"], waited)
+
+        yield db
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
 Base = declarative_base()
 
 # Python Models
@@ -45,13 +148,39 @@ class UserSession(Base):
     created_at = Column(DateTime(timezone=True), default=lambda: datetime.now(timezone.utc))
 
 # Content Storage 
+class Source(Base):
+    """RSS feeds tracked by the feed poller"""
+    __tablename__ = "source"
+    sourceid = Column(BigInteger, primary_key=True)
+    name = Column(String(255))
+    url = Column(Text, unique=True)
+
 class Article(Base):
     __tablename__ = "article"
     articleid = Column(BigInteger, primary_key=True)
     title = Column(Text)
     content = Column(Text) # This stores 'original-text'
+    # Set for articles ingested by the feed poller; NULL for manual input
+    sourceid = Column(BigInteger, ForeignKey("source.sourceid"))
+    datepublished = Column(Date)
+    # Deduplication keys (see features/article_fingerprint.py)
+    normalized_link = Column(Text)
+    content_fingerprint = Column(String(256))
+    # SHA-256 of the content (article_content_hash()); the key saved analyses are upserted on
+    content_hash = Column(String(64))
     created_at = Column(DateTime(timezone=True), server_default=func.now())
 
+    __table_args__ = (
+        # One row per article URL across all feeds
+        Index("idx_article_normalized_link", "normalized_link", unique=True),
+        # One row per article text
+        Index("idx_article_content_hash", "content_hash", unique=True),
+        # Browsing a source newest-first
+        Index("idx_article_source_created", "sourceid", "created_at"),
+        # Recent articles (entity co-occurrence by week)
+        Index("idx_article_created", "created_at"),
+    )
+
 # NLP Analysis Results
 class Summary(Base):
     __tablename__ = "summary"
@@ -60,6 +189,13 @@ class Summary(Base):
     articleid = Column(BigInteger, ForeignKey("article.articleid"))
     summarytext = Column(Text)
 
+    __table_args__ = (
+        # One summary per user and article (conflict target of the save upsert)
+        Index("idx_summary_article_account", "articleid", "accountid", unique=True),
+        # A user's saved articles (sidebar history)
+        Index("idx_summary_account_article", "accountid", "articleid"),
+    )
+
 class AnalysisResult(Base):
     """Stores the Relationship Map and Ranked Entities"""
     __tablename__ = "analysis_result"
@@ -68,8 +204,95 @@ class AnalysisResult(Base):
     entities_all_json = Column(Text)
     # rankings_json stores the list of dicts: [{'name': '...', 'distance': 0.1}, ...]
     rankings_json = Column(Text) 
+    # Relationship map as zlib-compressed JSON (relationship_mapping.pack_graph())
+    graph_data = Column(LargeBinary)
+    # Full HTML document; only set for articles saved before graph_data
     graph_html = Column(Text)
 
+    __table_args__ = (
+        Index("idx_analysis_result_article", "articleid", unique=True),
+    )
+
+class AnalysisCache(Base):
+    """Pipeline output keyed by a hash of the cleaned text and pipeline version"""
+    __tablename__ = "analysis_cache"
+    content_hash = Column(String(64), primary_key=True)
+    pipeline_version = Column(String(255), nullable=False)
+    # result_json stores the analysis dict without the title: summary, graph, entities, rankings
+    result_json = Column(Text, nullable=False)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+    __table_args__ = (
+        # Purging rows past the cache's time to live
+        Index("idx_analysis_cache_created", "created_at"),
+    )
+
+# Normalized entity tables (Entilytics.sql); written by features/entity_store.py
+class EntityType(Base):
+    """NER label such as PER, ORG, LOC or MISC"""
+    __tablename__ = "entitytype"
+    entitytypeid = Column(BigInteger, primary_key=True)
+    typename = Column(String(100), nullable=False)
+
+    __table_args__ = (
+        Index("idx_entitytype_typename", "typename", unique=True),
+    )
+
+class Entity(Base):
+    """One row per distinct (name, type) across all articles"""
+    __tablename__ = "entity"
+    entityid = Column(BigInteger, primary_key=True)
+    name = Column(String(255), nullable=False)
+    entitytypeid = Column(BigInteger, ForeignKey("entitytype.entitytypeid"))
+
+    __table_args__ = (
+        # Upsert key, and lookup by name ("which articles mention X")
+        Index("idx_entity_name_type", "name", "entitytypeid", unique=True),
+        Index("idx_entity_type", "entitytypeid"),
+    )
+
+class EntityExtraction(Base):
+    """An entity found in an article: first character offset and number of mentions"""
+    __tablename__ = "entityextraction"
+    entityextractionid = Column(BigInteger, primary_key=True)
+    articleid = Column(BigInteger, ForeignKey("article.articleid", ondelete="CASCADE"))
+    entityid = Column(BigInteger, ForeignKey("entity.entityid"))
+    position = Column(Integer)
+    frequency = Column(Integer)
+
+    __table_args__ = (
+        # Articles of an entity, and entities of an article
+        Index("idx_entityextraction_entity_article", "entityid", "articleid"),
+        Index("idx_entityextraction_article", "articleid"),
+    )
+
+class EntityImportance(Base):
+    """Ranking score of an extracted entity (1 - distance, higher is more important)"""
+    __tablename__ = "entityimportance"
+    importanceid = Column(BigInteger, primary_key=True)
+    extractionid = Column(BigInteger, ForeignKey("entityextraction.entityextractionid", ondelete="CASCADE"))
+    importancescore = Column(Float)
+
+    __table_args__ = (
+        Index("idx_entityimportance_extraction", "extractionid"),
+    )
+
+class RelationshipMap(Base):
+    """Two ranked entities mentioned in the same sentence(s) of an article"""
+    __tablename__ = "relationshipmap"
+    relationshipid = Column(BigInteger, primary_key=True)
+    articleid = Column(BigInteger, ForeignKey("article.articleid", ondelete="CASCADE"))
+    # entitya_id < entityb_id, so each pair is stored once
+    entitya_id = Column(BigInteger, ForeignKey("entity.entityid"))
+    entityb_id = Column(BigInteger, ForeignKey("entity.entityid"))
+    # Number of sentences mentioning both
+    weight = Column(Integer)
+
+    __table_args__ = (
+        Index("idx_relationshipmap_article", "articleid"),
+        Index("idx_relationshipmap_pair", "entitya_id", "entityb_id"),
+    )
+
 # User Interactions
 class Annotation(Base):
     __tablename__ = "annotation"
@@ -78,14 +301,112 @@ class Annotation(Base):
     articleid = Column(BigInteger, ForeignKey("article.articleid"))
     note = Column(Text)
 
+    __table_args__ = (
+        Index("idx_annotation_article_account", "articleid", "accountid", unique=True),
+    )
+
+
+def article_content_hash(content):
+    """Hex SHA-256 of an article's text, the unique key of the Article table."""
+    return hashlib.sha256((content or "").encode("utf-8")).hexdigest()
+
+
+# Articles whose text is stored more than once, each with the oldest copy ("keep") it is merged into.
+# Only texts that still have a row without content_hash are considered, so this is cheap once merged.
+_DUPLICATE_ARTICLES = """(SELECT articleid, min(articleid) OVER (PARTITION BY content) AS keep FROM article
+    WHERE content IN (SELECT content FROM article WHERE content_hash IS NULL AND content IS NOT NULL)) d"""
+
+# Columns added after the first deployment; create_all() does not alter existing tables.
+# Each statement runs in its own transaction (see init_db()).
+MIGRATIONS = [
+    "ALTER TABLE article ADD COLUMN IF NOT EXISTS sourceid BIGINT REFERENCES source(sourceid)",
+    "ALTER TABLE article ADD COLUMN IF NOT EXISTS datepublished DATE",
+    "ALTER TABLE article ADD COLUMN IF NOT EXISTS normalized_link TEXT",
+    "ALTER TABLE article ADD COLUMN IF NOT EXISTS content_fingerprint VARCHAR(256)",
+    "CREATE UNIQUE INDEX IF NOT EXISTS idx_article_normalized_link ON article (normalized_link)",
+    "CREATE INDEX IF NOT EXISTS idx_article_source_created ON article (sourceid, created_at)",
+    "ALTER TABLE article ADD COLUMN IF NOT EXISTS content_hash VARCHAR(64)",
+    # Copies of the same text saved before content_hash existed are merged into the oldest article,
+    # so every text gets its hash and saving it again finds the existing row. Entity rows of the
+    # removed copies are dropped; they are written again when the article is saved.
+    f"UPDATE summary s SET articleid = d.keep FROM {_DUPLICATE_ARTICLES} WHERE s.articleid = d.articleid AND d.keep <> d.articleid",
+    f"UPDATE annotation n SET articleid = d.keep FROM {_DUPLICATE_ARTICLES} WHERE n.articleid = d.articleid AND d.keep <> d.articleid",
+    f"UPDATE analysis_result r SET articleid = d.keep FROM {_DUPLICATE_ARTICLES} WHERE r.articleid = d.articleid AND d.keep <> d.articleid",
+    f"DELETE FROM relationshipmap m USING {_DUPLICATE_ARTICLES} WHERE m.articleid = d.articleid AND d.keep <> d.articleid",
+    f"DELETE FROM entityextraction e USING {_DUPLICATE_ARTICLES} WHERE e.articleid = d.articleid AND d.keep <> d.articleid",
+    f"DELETE FROM article a USING {_DUPLICATE_ARTICLES} WHERE a.articleid = d.articleid AND d.keep <> d.articleid",
+    # Same digest as article_content_hash()
+    """UPDATE article SET content_hash = encode(sha256(convert_to(content, 'UTF8')), 'hex')
+       WHERE content_hash IS NULL AND content IS NOT NULL""",
+    "CREATE UNIQUE INDEX IF NOT EXISTS idx_article_content_hash ON article (content_hash)",
+    # The old lookup-then-insert save could store a row twice (double clicks, races); the newest row is kept
+    "DELETE FROM summary a USING summary b WHERE a.articleid = b.articleid AND a.accountid = b.accountid AND a.summaryid < b.summaryid",
+    "CREATE UNIQUE INDEX IF NOT EXISTS idx_summary_article_account ON summary (articleid, accountid)",
+    "DELETE FROM analysis_result a USING analysis_result b WHERE a.articleid = b.articleid AND a.resultid < b.resultid",
+    "CREATE UNIQUE INDEX IF NOT EXISTS idx_analysis_result_article ON analysis_result (articleid)",
+    "DELETE FROM annotation a USING annotation b WHERE a.articleid = b.articleid AND a.accountid = b.accountid AND a.annotationid < b.annotationid",
+    "CREATE UNIQUE INDEX IF NOT EXISTS idx_annotation_article_account ON annotation (articleid, accountid)",
+    "CREATE INDEX IF NOT EXISTS idx_summary_account_article ON summary (accountid, articleid)",
+    "CREATE INDEX IF NOT EXISTS idx_article_created ON article (created_at)",
+    "ALTER TABLE analysis_result ADD COLUMN IF NOT EXISTS graph_data BYTEA",
+    # Entity tables created from Entilytics.sql lack the upsert keys, indexes and weight
+    "ALTER TABLE relationshipmap ADD COLUMN IF NOT EXISTS weight INT",
+    "CREATE UNIQUE INDEX IF NOT EXISTS idx_entitytype_typename ON entitytype (typename)",
+    "CREATE UNIQUE INDEX IF NOT EXISTS idx_entity_name_type ON entity (name, entitytypeid)",
+    "CREATE INDEX IF NOT EXISTS idx_entity_type ON entity (entitytypeid)",
+    "CREATE INDEX IF NOT EXISTS idx_entityextraction_entity_article ON entityextraction (entityid, articleid)",
+    "CREATE INDEX IF NOT EXISTS idx_entityextraction_article ON entityextraction (articleid)",
+    "CREATE INDEX IF NOT EXISTS idx_entityimportance_extraction ON entityimportance (extractionid)",
+    "CREATE INDEX IF NOT EXISTS idx_relationshipmap_article ON relationshipmap (articleid)",
+    "CREATE INDEX IF NOT EXISTS idx_relationshipmap_pair ON relationshipmap (entitya_id, entityb_id)",
+    "CREATE INDEX IF NOT EXISTS idx_analysis_cache_created ON analysis_cache (created_at)",
+]
+
+# Trigram index that serves the sidebar's ILIKE '%term%' title search.
+# Opt-in with HISTORY_TRIGRAM_INDEX=1: pg_trgm must be allow-listed on Azure
+# (azure.extensions) before CREATE EXTENSION succeeds.
+HISTORY_TRIGRAM_INDEX = os.getenv("HISTORY_TRIGRAM_INDEX", "0") == "1"
+TRIGRAM_MIGRATIONS = [
+    "CREATE EXTENSION IF NOT EXISTS pg_trgm",
+    "CREATE INDEX IF NOT EXISTS idx_article_title_trgm ON article USING gin (title gin_trgm_ops)",
+]
+
 # Initialization logic
 def init_db():
-    """Verify and sync tables with Azure"""
+    """
+    Verify and sync tables with Azure.
+
+    Every migration runs in its own transaction, so one failure does not roll
+    back the others. Raises RuntimeError after the run if any of them failed:
+    the save upserts need the unique indexes, so a half-migrated database
+    must not go unnoticed.
+    """
     try:
         Base.metadata.create_all(bind=engine)
-        print("Database Models synced with Azure")
     except Exception as e:
         print(f"Connection/Migration Error: {e}")
+        raise
+
+    failed = []
+    for statement in MIGRATIONS:
+        try:
+            with engine.begin() as connection:
+                connection.execute(text(statement))
+        except Exception as e:
+            print(f"Migration failed: {statement.splitlines()[0]}\n  {e}")
+            failed.append(statement)
+    if failed:
+        raise RuntimeError(f"{len(failed)} of {len(MIGRATIONS)} migrations failed; see the errors above")
+    print("Database Models synced with Azure")
+
+    if HISTORY_TRIGRAM_INDEX:
+        # Separate transaction: search still works (unindexed) if the extension is not available
+        try:
+            with engine.begin() as connection:
+                for statement in TRIGRAM_MIGRATIONS:
+                    connection.execute(text(statement))
+        except Exception as e:
+            print(f"Trigram index not created: {e}")
 
 if __name__ == "__main__":
     init_db()
\ No newline at end of file
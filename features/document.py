@@ -0,0 +1,90 @@
+"""
+Document Module: Shared per-article preprocessing for the NLP pipeline
+
+The article is parsed and split into sentences once, and every stage
+(NER, ranking, summarization and relationship mapping) reads from the same
+AnalyzedDocument instead of running BeautifulSoup and sent_tokenize again.
+"""
+
+import sys
+import bisect
+from nltk.tokenize.punkt import PunktTokenizer
+from bs4 import BeautifulSoup
+from features.model_registry import register_model, get_model, nltk_resource_loader
+
+sys.dont_write_bytecode = True
+
+SENTENCE_TOKENIZER = 'punkt'
+
+
+def load_sentence_tokenizer():
+    """Same Punkt model sent_tokenize() uses, so spans match its output."""
+    # nltk requirement
+    nltk_resource_loader(('tokenizers/punkt_tab', 'punkt_tab'))()
+    return PunktTokenizer('english')
+
+
+# Loaded on first use (or by model_registry.warm_up())
+register_model(SENTENCE_TOKENIZER, load_sentence_tokenizer)
+
+
+class AnalyzedDocument:
+    """
+    Clean text, sentence boundaries and (lazily) sentence embeddings of one article.
+
+    Attributes:
+        clean_text: Article text with HTML tags removed.
+        sentences: Sentences in article order (same output as sent_tokenize).
+        sentence_spans: (start, end) character offsets of each sentence in clean_text.
+        sentence_embeddings: L2-normalized sentence vectors, filled in by the
+            first stage that needs them (see encode_sentences()).
+    """
+
+    def __init__(self, clean_text):
+        self.clean_text = clean_text
+        self.sentence_spans = list(get_model(SENTENCE_TOKENIZER).span_tokenize(clean_text))
+        self.sentences = [clean_text[start:end] for start, end in self.sentence_spans]
+        self._sentence_starts = [start for start, _ in self.sentence_spans]
+        self.sentence_embeddings = None
+
+    def sentence_index_at(self, offset):
+        """Return the index of the sentence containing a character offset, or None."""
+        position = bisect.bisect_right(self._sentence_starts, offset) - 1
+        if position >= 0 and offset < self.sentence_spans[position][1]:
+            return position
+        return None
+
+
+def clean_html(text):
+    """Strip HTML tags; separator=" " lets <p> tags get replaced by a space."""
+    soup = BeautifulSoup(text, "html.parser")
+    return soup.get_text(separator=" ")
+
+
+def build_document(text, strip_html=True):
+    """
+    Build the shared document for an article.
+
+    Args:
+        text: Raw article text (may contain HTML from RSS descriptions).
+        strip_html: Run BeautifulSoup first. Use False for text that is already clean.
+
+    Returns:
+        An AnalyzedDocument.
+    """
+    clean_text = clean_html(text) if strip_html else text
+    return AnalyzedDocument(clean_text)
+
+
+def text_of(text_or_document):
+    """Return the clean text of an AnalyzedDocument, or a plain string unchanged."""
+    if isinstance(text_or_document, AnalyzedDocument):
+        return text_or_document.clean_text
+    return text_or_document
+
+
+def as_document(text_or_document, strip_html=False):
+    """Return the given AnalyzedDocument, or build one from a plain string."""
+    if isinstance(text_or_document, AnalyzedDocument):
+        return text_or_document
+    return build_document(text_or_document, strip_html=strip_html)
@@ -0,0 +1,278 @@
+"""
+Embedding Cache Module: Content-addressed storage for sentence embeddings
+
+Entity names such as "Philippines" or "TSMC" repeat across most of the
+articles analyzed in a day. This module stores their BERT vectors so they
+are only encoded once.
+
+Tiers:
+    1. Memory: a bounded LRU dictionary of recently used vectors.
+    2. Disk: a memory-mapped float32 matrix (one row per vector) plus a
+       JSON key index mapping each key to its row. Both files survive
+       process restarts.
+
+Several processes (Solara workers, batch analysis workers) share the disk
+tier. Appends hold an exclusive lock on a lock file in the cache folder and
+reload the index from disk first, so each process appends after the rows
+the others have written instead of over them.
+
+Keys are content-addressed: a SHA-1 of the model name and the normalized
+text, so vectors from different models never mix.
+"""
+
+import os
+import sys
+import json
+import hashlib
+import threading
+import unicodedata
+from collections import OrderedDict
+from contextlib import contextmanager
+from pathlib import Path
+
+try:
+    import fcntl
+except ImportError:
+    # Windows: no advisory locks, so the folder should have a single writer process
+    fcntl = None
+
+import numpy as np
+
+sys.dont_write_bytecode = True
+
+# Default location of the on-disk tier (override with EMBEDDING_CACHE_DIR)
+DEFAULT_CACHE_DIR = Path(__file__).resolve().parent.parent / ".cache" / "embeddings"
+
+# Number of vectors kept in the in-memory LRU tier
+DEFAULT_MEMORY_ITEMS = 4096
+
+# Rows allocated the first time the disk matrix is created (doubles when full)
+INITIAL_DISK_ROWS = 1024
+
+
+def normalize_text(text: str) -> str:
+    """
+    Normalize a string before it is used as a cache key.
+
+    Applies Unicode NFKC normalization, trims the ends and collapses
+    internal whitespace so "Sony  Group" and "Sony Group" share a vector.
+    """
+    return " ".join(unicodedata.normalize("NFKC", text).split())
+
+
+def make_cache_key(model_name: str, text: str) -> str:
+    """Build the content-addressed key for a (model name, text) pair."""
+    payload = f"{model_name}\x00{normalize_text(text)}".encode("utf-8")
+    return hashlib.sha1(payload).hexdigest()
+
+
+class EmbeddingCache:
+    """
+    Two-tier (memory LRU + memory-mapped disk) cache of float32 embeddings.
+
+    Args:
+        model_name: Name of the encoder, part of every cache key.
+        dimension: Length of each embedding vector.
+        cache_dir: Folder for the disk tier. None uses EMBEDDING_CACHE_DIR
+            or DEFAULT_CACHE_DIR. Several processes may share the folder.
+        max_memory_items: Maximum number of vectors held in the LRU tier.
+    """
+
+    def __init__(self, model_name, dimension, cache_dir=None, max_memory_items=DEFAULT_MEMORY_ITEMS):
+        self.model_name = model_name
+        self.dimension = dimension
+        self.max_memory_items = max_memory_items
+
+        if cache_dir is None:
+            cache_dir = os.getenv("EMBEDDING_CACHE_DIR", DEFAULT_CACHE_DIR)
+        self.cache_dir = Path(cache_dir)
+        self.matrix_path = self.cache_dir / "embeddings.f32"
+        self.index_path = self.cache_dir / "index.json"
+        self.lock_path = self.cache_dir / "cache.lock"
+
+        self._lock = threading.Lock()
+        self._memory = OrderedDict()
+        self._index = {}
+        self._matrix = None
+        self._capacity = 0
+
+        self.hits = 0
+        self.misses = 0
+
+        self._load_disk_tier()
+
+    # Disk tier
+
+    def _load_disk_tier(self):
+        """Open the memory-mapped matrix and key index as they are on disk now."""
+        self._matrix = None
+        self._capacity = 0
+        self._index = {}
+        try:
+            if not (self.index_path.exists() and self.matrix_path.exists()):
+                return
+
+            with open(self.index_path, "r", encoding="utf-8") as index_file:
+                stored = json.load(index_file)
+
+            # Discard the files if they were written for a different vector size
+            if stored.get("dimension") != self.dimension:
+                print("Embedding cache dimension mismatch, starting a new cache")
+                return
+
+            rows = self.matrix_path.stat().st_size // (self.dimension * 4)
+            self._matrix = np.memmap(self.matrix_path, dtype=np.float32, mode="r+", shape=(rows, self.dimension))
+            self._capacity = rows
+            # Ignore index entries pointing past the end of a truncated matrix
+            self._index = {key: row for key, row in stored.get("keys", {}).items() if row < rows}
+        except Exception as e:
+            print(f"Embedding cache could not be loaded: {e}")
+            self._matrix = None
+            self._capacity = 0
+            self._index = {}
+
+    def _ensure_capacity(self, rows_needed):
+        """Grow the disk matrix (by doubling) so it can hold rows_needed rows."""
+        if rows_needed <= self._capacity:
+            return
+
+        new_capacity = max(self._capacity, INITIAL_DISK_ROWS)
+        while new_capacity < rows_needed:
+            new_capacity *= 2
+
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        if self._matrix is not None:
+            self._matrix.flush()
+            self._matrix = None
+
+        # Extend the file, then map the whole file again
+        with open(self.matrix_path, "ab") as matrix_file:
+            matrix_file.truncate(new_capacity * self.dimension * 4)
+
+        self._matrix = np.memmap(self.matrix_path, dtype=np.float32, mode="r+", shape=(new_capacity, self.dimension))
+        self._capacity = new_capacity
+
+    @contextmanager
+    def _disk_lock(self):
+        """Hold the exclusive lock on the disk tier shared by every process using the folder."""
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        with open(self.lock_path, "a") as lock_file:
+            if fcntl is not None:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def _write_disk_tier(self, new_entries):
+        """Append new vectors to the disk matrix, then atomically rewrite the index."""
+        with self._disk_lock():
+            # Other processes may have appended since this one last read the files
+            self._load_disk_tier()
+            new_entries = [(key, vector) for key, vector in new_entries if key not in self._index]
+            if not new_entries:
+                return
+
+            first_row = max(self._index.values(), default=-1) + 1
+            self._ensure_capacity(first_row + len(new_entries))
+
+            for offset, (key, vector) in enumerate(new_entries):
+                self._matrix[first_row + offset] = vector
+                self._index[key] = first_row + offset
+            self._matrix.flush()
+
+            # Vectors are flushed before the index so a crash never indexes an unwritten row
+            temp_path = self.index_path.with_suffix(f".{os.getpid()}.tmp")
+            with open(temp_path, "w", encoding="utf-8") as index_file:
+                json.dump({"dimension": self.dimension, "keys": self._index}, index_file)
+            os.replace(temp_path, self.index_path)
+
+    # Memory tier
+
+    def _remember(self, key, vector):
+        """Insert a vector into the LRU tier and evict the oldest entry if full."""
+        self._memory[key] = vector
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_memory_items:
+            self._memory.popitem(last=False)
+
+    def _lookup(self, key):
+        """Return the cached vector for key from memory, then disk, or None."""
+        vector = self._memory.get(key)
+        if vector is not None:
+            self._memory.move_to_end(key)
+            return vector
+
+        row = self._index.get(key)
+        if row is not None and self._matrix is not None:
+            # Copy out of the memmap so the LRU tier owns its data
+            vector = np.array(self._matrix[row], dtype=np.float32)
+            self._remember(key, vector)
+            return vector
+
+        return None
+
+    # Public API
+
+    def encode(self, texts, encoder):
+        """
+        Return embeddings for texts, encoding only the ones not cached yet.
+
+        Args:
+            texts: List of strings to embed.
+            encoder: Callable taking a list of strings and returning a 2D
+                array-like of embeddings (one batched call for all misses).
+
+        Returns:
+            A float32 numpy array of shape (len(texts), dimension) in the
+            same order as texts.
+        """
+        result = np.empty((len(texts), self.dimension), dtype=np.float32)
+        keys = [make_cache_key(self.model_name, text) for text in texts]
+
+        # Group repeated misses so each unique text is encoded once
+        missing = OrderedDict()
+        with self._lock:
+            for position, key in enumerate(keys):
+                vector = self._lookup(key)
+                if vector is None:
+                    missing.setdefault(key, []).append(position)
+                else:
+                    result[position] = vector
+            self.hits += len(keys) - sum(len(positions) for positions in missing.values())
+            self.misses += len(missing)
+
+        if not missing:
+            return result
+
+        # Encode outside the lock so slow model calls don't block cache readers
+        missing_texts = [texts[positions[0]] for positions in missing.values()]
+        encoded = np.asarray(encoder(missing_texts), dtype=np.float32).reshape(len(missing_texts), self.dimension)
+
+        new_entries = []
+        with self._lock:
+            for (key, positions), vector in zip(missing.items(), encoded):
+                result[positions] = vector
+                self._remember(key, vector.copy())
+                if key not in self._index:
+                    new_entries.append((key, vector))
+
+            if new_entries:
+                try:
+                    self._write_disk_tier(new_entries)
+                except Exception as e:
+                    # The memory tier still works if the disk is full or read-only
+                    print(f"Embedding cache could not be written: {e}")
+
+        return result
+
+    def stats(self):
+        """Return hit/miss counters and the size of each tier."""
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "memory_items": len(self._memory),
+                "disk_items": len(self._index),
+            }
@@ -0,0 +1,140 @@
+"""
+Entity Deduplication Module: Morphological-variant checks for extracted entities
+
+is_morphological_variant() is the reference check used by identify_entities().
+VariantIndex gives the same accept/reject decisions, but buckets the seen
+names so each candidate is only compared with plausible neighbours instead
+of every entity seen so far.
+
+Why the index is exact:
+    A candidate and a seen name are variants when one is a substring of the
+    other, their lengths differ by at most 3, and the shorter is at least
+    80% of the longer. For names shorter than 3 characters that can only
+    hold for equal strings. For longer names, a seen name containing the
+    candidate must contain the candidate's first 3 characters, and a seen
+    name contained in the candidate must start with one of the candidate's
+    3-grams, so the two n-gram lookups below never miss a match.
+"""
+
+import sys
+
+sys.dont_write_bytecode = True
+
+# Length of the character n-grams used as index keys
+NGRAM_SIZE = 3
+
+# Same limits as is_morphological_variant()
+MAX_LENGTH_DIFFERENCE = 3
+MIN_OVERLAP_RATIO = 0.80
+
+
+def is_morphological_variant(candidate_entity_name, seen_entity_list):
+    """
+    Check if candidate entity is a morphological variant of a seen entity.
+    (Words with the same structural base)
+
+    Args:
+        candidate_entity_name: New entity to check.
+        seen_entity_list: List of already-accepted entities.
+
+    Returns:
+        True if candidate is a variant of a seen entity, False otherwise.
+    """
+    candidate_lower = candidate_entity_name.lower().strip()
+
+    for seen_entity in seen_entity_list:
+        seen_lower = seen_entity.lower().strip()
+
+        # Skip if lengths differ too much
+        length_difference = abs(len(candidate_lower) - len(seen_lower))
+        if length_difference > 3:
+            continue
+
+        # Check substring containment
+        if candidate_lower in seen_lower or seen_lower in candidate_lower:
+            # Verify they share significant overlap (80%+ character match)
+            longer = max(candidate_lower, seen_lower, key=len)
+            shorter = min(candidate_lower, seen_lower, key=len)
+
+            # Count how many characters from the shorter string appear in the longer.
+            matching_chars = 0
+            for char in shorter:
+                if char in longer:
+                    matching_chars += 1
+
+            overlap_ratio = matching_chars / len(longer)
+            if overlap_ratio >= 0.80:
+                return True
+
+    return False
+
+
+def ngrams(text):
+    """Return the set of distinct character n-grams of text."""
+    return {text[i:i + NGRAM_SIZE] for i in range(len(text) - NGRAM_SIZE + 1)}
+
+
+def is_close_variant(candidate_lower, seen_lower):
+    """
+    Pairwise rule of is_morphological_variant() for two lowercased, stripped names.
+
+    When one name is a substring of the other, every character of the shorter
+    appears in the longer, so the character overlap is len(shorter).
+    """
+    if abs(len(candidate_lower) - len(seen_lower)) > MAX_LENGTH_DIFFERENCE:
+        return False
+    if not (candidate_lower in seen_lower or seen_lower in candidate_lower):
+        return False
+
+    longer = max(candidate_lower, seen_lower, key=len)
+    shorter = min(candidate_lower, seen_lower, key=len)
+    if not longer:
+        return True
+    return len(shorter) / len(longer) >= MIN_OVERLAP_RATIO
+
+
+class VariantIndex:
+    """
+    Set of accepted entity names with fast morphological-variant lookups.
+
+    VariantIndex().is_variant(name) returns the same result as
+    is_morphological_variant(name, names_added_so_far).
+    """
+
+    def __init__(self):
+        self._exact = set()
+        # n-gram -> names containing it (finds seen names that contain the candidate)
+        self._containing = {}
+        # first n-gram -> names starting with it (finds seen names inside the candidate)
+        self._starting = {}
+
+    def add(self, entity_name):
+        """Record an accepted entity name."""
+        name = entity_name.lower().strip()
+        if name in self._exact:
+            return
+        self._exact.add(name)
+
+        if len(name) >= NGRAM_SIZE:
+            for gram in ngrams(name):
+                self._containing.setdefault(gram, set()).add(name)
+            self._starting.setdefault(name[:NGRAM_SIZE], set()).add(name)
+
+    def is_variant(self, candidate_entity_name):
+        """Check the candidate against the plausible neighbours only."""
+        candidate = candidate_entity_name.lower().strip()
+        if candidate in self._exact:
+            return True
+
+        # Short names can only match an identical name
+        if len(candidate) < NGRAM_SIZE:
+            return False
+
+        neighbours = set(self._containing.get(candidate[:NGRAM_SIZE], ()))
+        for gram in ngrams(candidate):
+            neighbours.update(self._starting.get(gram, ()))
+
+        return any(is_close_variant(candidate, seen) for seen in neighbours)
+
+    def __len__(self):
+        return len(self._exact)
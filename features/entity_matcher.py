@@ -0,0 +1,188 @@
+"""
+Entity Matcher Module: Single-pass multi-entity search for relationship mapping
+
+All entity names of an article are compiled once into a case-insensitive
+Aho-Corasick automaton. Each sentence is then scanned once and every
+occurrence of every entity is reported, including overlapping ones
+(e.g. "Steve Jobs" and "Jobs"), instead of building one regex per
+(sentence, entity) pair.
+
+Matches follow the rule of the per-entity regex search it replaced in
+relationship_mapping.py: the entity must be a whole word/phrase, i.e. the
+regex r'\\b' + re.escape(entity) + r'\\b' with re.IGNORECASE.
+"""
+
+import sys
+from collections import deque
+
+sys.dont_write_bytecode = True
+
+
+# Characters that re.IGNORECASE treats as equal although their upper case has several characters
+EXTRA_CASE_FOLDS = {"\u1fd3": "\u0390", "\u1fe3": "\u03b0", "\ufb05": "\ufb06"}
+
+
+def fold_char(char):
+    """
+    Case-fold one character the way re.IGNORECASE compares it.
+
+    The lowercase form is mapped through its uppercase form once more, so
+    characters with several lowercase variants fold together ('ς' and 'σ',
+    'ſ' and 's', 'ı' and 'i'). Characters whose lowercase form has a
+    different length (e.g. 'İ') are kept as-is so character offsets in the
+    folded text match the original.
+    """
+    if char in EXTRA_CASE_FOLDS:
+        return EXTRA_CASE_FOLDS[char]
+    lower = char.lower()
+    if len(lower) != 1:
+        return char
+    folded = lower.upper().lower()
+    return folded if len(folded) == 1 else lower
+
+
+def fold_case(text):
+    """Case-fold text one character at a time with fold_char()."""
+    return "".join(fold_char(char) for char in text)
+
+
+def is_word_char(char):
+    """Same definition of a word character as the regex \\w class."""
+    return char.isalnum() or char == "_"
+
+
+def is_word_boundary(text, position):
+    """True where the regex \\b would match: between a word and a non-word character."""
+    before = position > 0 and is_word_char(text[position - 1])
+    after = position < len(text) and is_word_char(text[position])
+    return before != after
+
+
+class EntityMatcher:
+    """
+    Case-insensitive Aho-Corasick automaton over a list of entity names.
+
+    Args:
+        entities: Entity names to search for. Order is preserved in results.
+    """
+
+    def __init__(self, entities):
+        self.entities = list(entities)
+
+        # Trie transitions, failure links and the entity indices ending at each state
+        self._goto = [{}]
+        self._fail = [0]
+        self._output = [[]]
+
+        for entity_index, entity in enumerate(self.entities):
+            # An empty name is not a real entity, so it never matches
+            if entity:
+                self._add_pattern(fold_case(entity), entity_index)
+
+        self._build_failure_links()
+
+    def _add_pattern(self, pattern, entity_index):
+        """Insert one folded entity name into the trie."""
+        state = 0
+        for char in pattern:
+            next_state = self._goto[state].get(char)
+            if next_state is None:
+                next_state = len(self._goto)
+                self._goto[state][char] = next_state
+                self._goto.append({})
+                self._fail.append(0)
+                self._output.append([])
+            state = next_state
+        self._output[state].append(entity_index)
+
+    def _build_failure_links(self):
+        """Breadth-first pass that links each state to its longest proper suffix state."""
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, next_state in self._goto[state].items():
+                queue.append(next_state)
+
+                fallback = self._fail[state]
+                while fallback and char not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                link = self._goto[fallback].get(char, 0)
+                self._fail[next_state] = link if link != next_state else 0
+
+                # Every entity ending at the suffix state also ends here
+                self._output[next_state] = self._output[next_state] + self._output[self._fail[next_state]]
+
+    def find_all(self, text):
+        """
+        Find every whole-word occurrence of every entity in text.
+
+        Returns:
+            A list of (start, end, entity_index) tuples ordered by end offset.
+        """
+        matches = []
+        state = 0
+        for position, char in enumerate(fold_case(text)):
+            while state and char not in self._goto[state]:
+                state = self._fail[state]
+            state = self._goto[state].get(char, 0)
+
+            end = position + 1
+            for entity_index in self._output[state]:
+                start = end - len(self.entities[entity_index])
+                if is_word_boundary(text, start) and is_word_boundary(text, end):
+                    matches.append((start, end, entity_index))
+        return matches
+
+    def entities_in(self, text):
+        """
+        Return the entities that appear in text, in the order they were given.
+
+        Equivalent to testing each entity with the whole-word regex described above.
+        """
+        found_indices = {entity_index for _, _, entity_index in self.find_all(text)}
+        return [entity for index, entity in enumerate(self.entities) if index in found_indices]
+
+
+def find_entity_occurrences(document, entities, matcher=None):
+    """
+    Locate every entity occurrence in an AnalyzedDocument with one pass per sentence.
+
+    Sentences are stripped before matching, exactly like mapping() does.
+
+    Args:
+        document: AnalyzedDocument with sentences and sentence_spans.
+        entities: Entity names to look for.
+        matcher: Optional EntityMatcher already compiled for these entities.
+
+    Returns:
+        A list of dicts with keys: 'entity', 'sentence' (sentence index),
+        'start' and 'end' (character offsets in document.clean_text).
+    """
+    matcher = matcher or EntityMatcher(entities)
+    occurrences = []
+
+    for sentence_index, sentence in enumerate(document.sentences):
+        clean_sentence = sentence.strip()
+        if not clean_sentence:
+            continue
+
+        # Offset of the stripped sentence inside the document text
+        sentence_offset = document.sentence_spans[sentence_index][0] + (len(sentence) - len(sentence.lstrip()))
+
+        for start, end, entity_index in matcher.find_all(clean_sentence):
+            occurrences.append({
+                "entity": matcher.entities[entity_index],
+                "sentence": sentence_index,
+                "start": sentence_offset + start,
+                "end": sentence_offset + end,
+            })
+
+    return occurrences
+
+
+def group_by_sentence(occurrences):
+    """Map each sentence index to the set of entities found in it."""
+    sentence_entities = {}
+    for occurrence in occurrences:
+        sentence_entities.setdefault(occurrence["sentence"], set()).add(occurrence["entity"])
+    return sentence_entities
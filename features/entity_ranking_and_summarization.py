@@ -16,23 +16,20 @@ References:
 """
 
 from sentence_transformers import SentenceTransformer, util
-import nltk
-from nltk.tokenize import sent_tokenize # Split articles by sentence rather than using split('.')
 import sys
 sys.dont_write_bytecode = True
 import numpy as np
 # Used for calculating the manhattan distance from BERT vectors
 import torch 
 import torch.nn.functional as vector_math 
+from features.embedding_cache import EmbeddingCache
+from features.document import as_document, text_of
+from features.model_registry import register_model, get_model
 
-# Load a pre-trained BERT model (all-MiniLM-L6-v2 is fast and accurate)
-model = SentenceTransformer('all-MiniLM-L6-v2')
-
-# nltk requirement
-try:
-    nltk.data.find('tokenizers/punkt_tab')
-except LookupError:
-    nltk.download('punkt_tab', quiet=True)
+# Pre-trained BERT model (all-MiniLM-L6-v2 is fast and accurate)
+# Loaded on first use (or by model_registry.warm_up()) instead of at import
+MODEL_NAME = 'all-MiniLM-L6-v2'
+register_model(MODEL_NAME, lambda: SentenceTransformer(MODEL_NAME))
 
 DISTANCE_THRESHOLD = 0.45
 """
@@ -48,22 +45,20 @@ Reference:
     Peak performance values: Euclidean ~0.458-0.568, Manhattan ~0.455-0.596
 """
 
-def entity_ranking(article_description, entity_list):
-    """
-    Rank entities using Manhattan distance with threshold filtering.
+# Dimension of the all-MiniLM-L6-v2 sentence embeddings
+EMBEDDING_DIMENSION = 384
 
-    Args:
-        article_description: Full article text
-        entity_list: List of NER outputs from identify_entities()
-    
-    Returns a list of dictionaries with name and score values (entities meeting distance threshold)              
-    """
+# This is the standard Geometric Scaling for Manhattan distance in BERT research
+# Max Manhattan distance between L2-normalized vectors is 2 * sqrt(d)
+MANHATTAN_SCALING_FACTOR = 2 * np.sqrt(EMBEDDING_DIMENSION) # ~39.2
 
-    # Check if there are entities to rank
-    if not entity_list:
-        return []
-    
-    # Extract just the 'text' string from each Flair dictionary and remove repeated entities
+# Entity names repeat across articles, so their vectors are cached in memory and on disk
+# The disk index is opened on first use as well
+ENTITY_EMBEDDING_CACHE = 'entity-embedding-cache'
+register_model(ENTITY_EMBEDDING_CACHE, lambda: EmbeddingCache(MODEL_NAME, EMBEDDING_DIMENSION))
+
+def unique_entity_names(entity_list):
+    """Extract just the 'text' string from each Flair dictionary and remove repeated entities"""
     entity_names = []
     for entity in entity_list:
         # Extract the string from the Flair dict and strip trailing/leading punctuation and whitespace
@@ -71,107 +66,143 @@ def entity_ranking(article_description, entity_list):
 
         if name not in entity_names:
             entity_names.append(name)
+    return entity_names
 
-    # Encode the article and all entities into BERT vectors
-    # BERT can only compare with vectors
-    article_vector = model.encode(article_description, convert_to_tensor=True)
-    entity_vectors = model.encode(entity_names, convert_to_tensor=True)
+def rank_by_distance(entity_names, entity_vectors, article_vector):
+    """
+    Score L2-normalized entity vectors against the article vector and apply the threshold.
 
-    # Scales BERT vectors to unit length 
-    # This ensures distances remain consistent across different article lengths
-    article_vector = vector_math.normalize(article_vector.unsqueeze(0), p=2, dim=1)
-    entity_vectors = vector_math.normalize(entity_vectors, p=2, dim=1)
-
-    # Score using Manhattan distance
-    final_rankings = []
-    for index, entity_name in enumerate(entity_names):
-        # Calculate the Manhattan Distance between BERT vectors
-        raw_dist = torch.dist(entity_vectors[index], article_vector, p=1).item()
-
-        # This is the standard Geometric Scaling for Manhattan distance in BERT research
-        # Max Manhattan distance between L2-normalized vectors is 2 * sqrt(d)
-        # 384 is the dimension of the all-MiniLM-L6-v2 model
-        scaling_factor = 2 * np.sqrt(384) # ~39.2
-        # Scaling: Divide to get a 0.0-1.0 Distance Score
-        normalized_dist = raw_dist / scaling_factor
-
-        final_rankings.append({
-            "name": entity_name,
-            "distance": round(normalized_dist, 4) # lower is better
-        })
+    Returns a list of dictionaries with name and distance, closest first
+    """
+    # Calculate the Manhattan Distance between every entity vector and the article vector at once
+    raw_distances = (entity_vectors - article_vector).abs().sum(dim=1)
+
+    # Scaling: Divide to get a 0.0-1.0 Distance Score (lower is better)
+    distances = torch.round(raw_distances / MANHATTAN_SCALING_FACTOR, decimals=4)
 
     # Sort entities by distance in ascending order (closest first)
-    final_rankings.sort(key=lambda x: x['distance'])
+    # stable=True keeps the article order for entities with equal scores
+    order = torch.argsort(distances, stable=True)
 
     # Apply threshold filter: keep only entities within distance threshold
-    filtered_rankings = [ent for ent in final_rankings if ent['distance'] <= DISTANCE_THRESHOLD]
+    within_threshold = distances[order] <= DISTANCE_THRESHOLD
+    kept_order = order[within_threshold]
 
     # Make sure at least one entity is returned if any exist
-    if not filtered_rankings and final_rankings:
-        filtered_rankings = [final_rankings[0]]
+    if kept_order.numel() == 0:
+        kept_order = order[:1]
 
-    return filtered_rankings
+    # Sync the scores back to Python once instead of once per entity
+    kept_indices = kept_order.tolist()
+    kept_distances = distances[kept_order].tolist()
 
-def generate_summary(article_description, top_entities):
+    return [
+        {"name": entity_names[index], "distance": round(distance, 4)}
+        for index, distance in zip(kept_indices, kept_distances)
+    ]
 
+def entity_ranking_many(requests):
     """
-    Generate summary using Manhattan distance with threshold filtering.
+    entity_ranking() for several articles with shared encoder calls.
 
     Args:
-        article_description: Full article text
-        top_entities: Top-ranked entity names from ranking
+        requests: List of (article_description, entity_list) pairs
     
-    Returns the summary and sentence count
+    Returns one ranking list per request, in the same order
     """
+    rankings = [[] for _ in requests]
+
+    # Check which articles have entities to rank
+    pending = []
+    for request_index, (article_description, entity_list) in enumerate(requests):
+        if entity_list:
+            pending.append((request_index, text_of(article_description), unique_entity_names(entity_list)))
+
+    if not pending:
+        return rankings
+
+    # Encode all articles in one call, and every distinct entity name in one cache lookup
+    # BERT can only compare with vectors
+    model = get_model(MODEL_NAME)
+    article_vectors = model.encode([article_text for _, article_text, _ in pending], convert_to_tensor=True)
+
+    all_names = list(dict.fromkeys(name for _, _, names in pending for name in names))
+    # Entity vectors come from the cache; only unseen names go through the model
+    name_vectors = get_model(ENTITY_EMBEDDING_CACHE).encode(
+        all_names,
+        lambda names: model.encode(names, convert_to_numpy=True)
+    )
+    name_vectors = torch.from_numpy(name_vectors).to(article_vectors.device)
+    name_rows = {name: row for row, name in enumerate(all_names)}
+
+    # Scales BERT vectors to unit length 
+    # This ensures distances remain consistent across different article lengths
+    article_vectors = vector_math.normalize(article_vectors, p=2, dim=1)
+    name_vectors = vector_math.normalize(name_vectors, p=2, dim=1)
+
+    for position, (request_index, _, entity_names) in enumerate(pending):
+        entity_vectors = name_vectors[[name_rows[name] for name in entity_names]]
+        rankings[request_index] = rank_by_distance(entity_names, entity_vectors, article_vectors[position].unsqueeze(0))
 
-    # Split into sentences
-    sentences = sent_tokenize(article_description)
+    return rankings
 
-    # If already short, return as is
-    if len(sentences) <= 3:
-        return {
-            'summary': article_description,
-            'sentence_count': len(sentences),
-        }
+def entity_ranking(article_description, entity_list):
+    """
+    Rank entities using Manhattan distance with threshold filtering.
+
+    Args:
+        article_description: Full article text or its AnalyzedDocument
+        entity_list: List of NER outputs from identify_entities()
     
-    # If there are no entities to focus on, return the original article
-    if not top_entities:
-        return {
-            'summary': article_description,
-            'sentence_count': len(sentences),
-        }
-
-    # Create a single string of the top entity names
-    entity_focus_string = ", ".join([ent['name'] for ent in top_entities])
-
-    # Encode the entity string into BERT vectors (Text to Numbers)
-    entities_embedding = model.encode(entity_focus_string, convert_to_tensor=True)
-    entities_embedding = vector_math.normalize(entities_embedding.unsqueeze(0), p=2, dim=1)
-
-    # Store results
-    scored = []
-
-    # Loop through each sentence with its position
-    for i, sentence in enumerate(sentences):
-        # Encode the sentence
-        sentence_embedding = model.encode(sentence, convert_to_tensor=True)
-        sentence_embedding = vector_math.normalize(sentence_embedding.unsqueeze(0), p=2, dim=1)
-
-        # Calculate the Manhattan Distance between BERT vectors
-        raw_dist = torch.dist(sentence_embedding, entities_embedding, p=1).item()
-
-        # This is the standard Geometric Scaling for Manhattan distance in BERT research
-        # Max Manhattan distance between L2-normalized vectors is 2 * sqrt(d)
-        # 384 is the dimension of the all-MiniLM-L6-v2 model
-        scaling_factor = 2 * np.sqrt(384) # This is ~19.6
-        # Scaling: Divide to get a 0.0-1.0 Distance Score
-        normalized_dist = raw_dist / scaling_factor
-
-        scored.append({
-            'text': sentence,          
-            'index': i, # Keep the position in the article
-            'distance': normalized_dist    
-        })
+    Returns a list of dictionaries with name and score values (entities meeting distance threshold)              
+    """
+    return entity_ranking_many([(article_description, entity_list)])[0]
+
+def encode_sentences_many(documents):
+    """
+    Encode the sentences of several AnalyzedDocuments in one batched call.
+
+    The L2-normalized matrix of each document is stored on it so later
+    stages reuse it instead of encoding the same sentences again.
+    """
+    missing = [document for document in documents if document.sentence_embeddings is None]
+    all_sentences = [sentence for document in missing for sentence in document.sentences]
+
+    if all_sentences:
+        sentence_embeddings = get_model(MODEL_NAME).encode(all_sentences, convert_to_tensor=True)
+        sentence_embeddings = vector_math.normalize(sentence_embeddings, p=2, dim=1)
+
+        # Split the shared matrix back into one block per document
+        start = 0
+        for document in missing:
+            end = start + len(document.sentences)
+            document.sentence_embeddings = sentence_embeddings[start:end]
+            start = end
+
+    return [document.sentence_embeddings for document in documents]
+
+def encode_sentences(document):
+    """
+    Encode every sentence of an AnalyzedDocument in one batched call.
+
+    The L2-normalized matrix is stored on the document so later stages
+    reuse it instead of encoding the same sentences again.
+    """
+    return encode_sentences_many([document])[0]
+
+def select_sentences(sentences, sentence_embeddings, entities_embedding):
+    """Keep the sentences within the distance threshold of the entity vector, in article order"""
+    # Calculate the Manhattan Distance between every sentence vector and the entity vector at once
+    raw_distances = (sentence_embeddings - entities_embedding).abs().sum(dim=1)
+
+    # Scaling: Divide to get a 0.0-1.0 Distance Score
+    normalized_distances = (raw_distances / MANHATTAN_SCALING_FACTOR).tolist()
+
+    # Store results, keeping the position of each sentence in the article
+    scored = [
+        {'text': sentence, 'index': i, 'distance': normalized_distances[i]}
+        for i, sentence in enumerate(sentences)
+    ]
     
     # Apply threshold filter: keep only sentence within distance threshold
     filtered_sentences = [s for s in scored if s['distance'] <= DISTANCE_THRESHOLD]
@@ -188,6 +219,66 @@ def generate_summary(article_description, top_entities):
         'sentence_count': len(filtered_sentences),
     }
 
+def generate_summary_many(requests):
+    """
+    generate_summary() for several articles with shared encoder calls.
+
+    Args:
+        requests: List of (article_description, top_entities) pairs
+    
+    Returns one summary dict per request, in the same order
+    """
+    summaries = [None] * len(requests)
+
+    pending = []
+    for request_index, (article_description, top_entities) in enumerate(requests):
+        # Split into sentences (already done if a shared document was passed in)
+        document = as_document(article_description)
+
+        # If already short, or there are no entities to focus on, return the original article
+        if len(document.sentences) <= 3 or not top_entities:
+            summaries[request_index] = {
+                'summary': document.clean_text,
+                'sentence_count': len(document.sentences),
+            }
+            continue
+
+        # Create a single string of the top entity names
+        entity_focus_string = ", ".join([ent['name'] for ent in top_entities])
+        pending.append((request_index, document, entity_focus_string))
+
+    if not pending:
+        return summaries
+
+    # Encode every entity string in one call (Text to Numbers)
+    entities_embeddings = get_model(MODEL_NAME).encode([focus for _, _, focus in pending], convert_to_tensor=True)
+    entities_embeddings = vector_math.normalize(entities_embeddings, p=2, dim=1)
+
+    # Encode every sentence of every article in one batched forward pass
+    sentence_embeddings = encode_sentences_many([document for _, document, _ in pending])
+
+    for position, (request_index, document, _) in enumerate(pending):
+        summaries[request_index] = select_sentences(
+            document.sentences,
+            sentence_embeddings[position],
+            entities_embeddings[position].unsqueeze(0)
+        )
+
+    return summaries
+
+def generate_summary(article_description, top_entities):
+
+    """
+    Generate summary using Manhattan distance with threshold filtering.
+
+    Args:
+        article_description: Full article text or its AnalyzedDocument
+        top_entities: Top-ranked entity names from ranking
+    
+    Returns the summary and sentence count
+    """
+    return generate_summary_many([(article_description, top_entities)])[0]
+
 # Testing
 if __name__ == "__main__":
     article_text = """TOKYO, Japan — In a historic move that could reshape the global semiconductor industry, the Japanese government announced a $15 billion subsidy package on Thursday to support the construction of a massive new chip manufacturing plant in Hokkaido. The facility will be jointly operated by Taiwan Semiconductor Manufacturing Company (TSMC) and local tech conglomerate Sony Group. Prime Minister Fumio Kishida hailed the agreement as a critical step toward securing Japan's technological independence. During a press conference in Tokyo, Kishida emphasized that global supply chain disruptions over the past three years made this domestic initiative an absolute necessity. The new plant, expected to begin full operations by 2028, will focus on producing advanced 12-nanometer logic chips used in electric vehicles and artificial intelligence servers. TSMC Chairman Mark Liu expressed his deep gratitude for the swift approval process and highlighted the strong engineering talent pool available in the northern island of Hokkaido. However, the ambitious project has not been without its critics. Environmental groups, including the Tokyo-based Green Earth Alliance, have raised concerns about the enormous water and electricity requirements of the proposed facility. In response, Sony Group CEO Kenichiro Yoshida assured the public that the plant would run entirely on renewable energy sources, primarily sourced from nearby offshore wind farms. The economic impact of this joint venture is expected to be staggering. Local officials project the creation of over 8,000 direct high-tech jobs, with tens of thousands of additional positions generated in supporting industries across the region. Financial markets reacted positively to the news, with shares of both TSMC and Sony surging on the Nikkei index shortly after the announcement. Meanwhile, geopolitical analysts view the collaboration as a strategic counterweight to China's growing dominance in the microchip sector. United States Secretary of Commerce Gina Raimondo issued a statement from Washington praising the alliance, noting that it aligns perfectly with America's own CHIPS Act goals. As construction crews prepare to break ground next month, the world will be watching closely to see if this multi-billion dollar gamble pays off."""
@@ -0,0 +1,299 @@
+"""
+Entity Store Module: Write saved analyses into the normalized entity tables
+
+The saved analysis keeps its rankings and entity list as JSON text in
+AnalysisResult, which can only be searched by loading and parsing every
+row. The same results are also written to the tables from Entilytics.sql:
+
+    EntityType        - NER labels (PER, ORG, LOC, MISC)
+    Entity            - one row per distinct (name, type)
+    EntityExtraction  - entity found in an article: first offset, mentions
+    EntityImportance  - ranking score of an extraction (1 - distance)
+    RelationshipMap   - ranked entities sharing sentences, with the count
+
+so questions such as "which articles mention X" or "which entities appeared
+together most this week" are indexed queries.
+
+Every table is written with one multi-row INSERT, so storing an article
+costs a fixed number of statements however many entities it has. Saves
+hand the work to a background thread (submit_article_entities) so the
+save itself stays a single round-trip. A write that fails is queued again
+after ENTITY_WRITE_RETRY_DELAY seconds, up to ENTITY_WRITE_ATTEMPTS times,
+unless a newer save of the same article has been submitted meanwhile.
+"""
+
+import os
+import sys
+import threading
+import traceback
+from itertools import combinations
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import func
+from sqlalchemy.orm import aliased
+from sqlalchemy.dialects.postgresql import insert
+
+from features.database import (
+    session_scope, Article, EntityType, Entity, EntityExtraction, EntityImportance, RelationshipMap
+)
+from features.document import build_document
+from features.entity_matcher import find_entity_occurrences, group_by_sentence
+
+sys.dont_write_bytecode = True
+
+# Label stored for entities that come without one
+DEFAULT_ENTITY_TYPE = "MISC"
+# Entity.name is VARCHAR(255)
+MAX_ENTITY_NAME_LENGTH = 255
+# Tries per saved article before its entity rows are given up, and seconds before the first retry (doubled each time)
+ENTITY_WRITE_ATTEMPTS = int(os.getenv("ENTITY_WRITE_ATTEMPTS", "3"))
+ENTITY_WRITE_RETRY_DELAY = float(os.getenv("ENTITY_WRITE_RETRY_DELAY", "30"))
+
+
+def entity_name(entity):
+    """Name of a Flair entity dict as used by the ranking (see unique_entity_names())."""
+    return entity['text'].strip(".,!?'\" ")[:MAX_ENTITY_NAME_LENGTH]
+
+
+def entity_rows(document, all_entities, rankings):
+    """
+    Turn one analysis into the rows of the normalized tables (no database access).
+
+    Args:
+        document: AnalyzedDocument of the article text.
+        all_entities: Output of identify_entities().
+        rankings: Output of entity_ranking().
+
+    Returns:
+        A dict with:
+            'types': {name: label},
+            'extractions': {name: (first character offset, number of mentions)},
+            'importance': {name: score} for ranked entities,
+            'relationships': {(name_a, name_b): number of shared sentences}, name_a < name_b.
+    """
+    types = {}
+    spans = {}
+    for entity in all_entities:
+        name = entity_name(entity)
+        if name and name not in types:
+            types[name] = entity.get('label') or DEFAULT_ENTITY_TYPE
+            spans[name] = entity.get('start', 0)
+
+    importance = {}
+    for item in rankings:
+        name = item['name'][:MAX_ENTITY_NAME_LENGTH]
+        if name in types:
+            importance[name] = round(1 - item['distance'], 4)
+
+    occurrences = find_entity_occurrences(document, list(types))
+
+    extractions = {}
+    for occurrence in occurrences:
+        name = occurrence["entity"]
+        first, count = extractions.get(name, (occurrence["start"], 0))
+        extractions[name] = (min(first, occurrence["start"]), count + 1)
+    # NER found it, so it is mentioned at least once even if the normalized name no longer matches the text
+    for name, start in spans.items():
+        extractions.setdefault(name, (start, 1))
+
+    # Same pairs as the relationship map: ranked entities in the same sentence
+    relationships = {}
+    for found in group_by_sentence(occurrences).values():
+        ranked = sorted(name for name in found if name in importance)
+        for pair in combinations(ranked, 2):
+            relationships[pair] = relationships.get(pair, 0) + 1
+
+    return {
+        "types": types,
+        "extractions": extractions,
+        "importance": importance,
+        "relationships": relationships,
+    }
+
+
+def upsert_returning(db, model, rows, key_columns, returning):
+    """
+    Insert rows, or touch the existing ones on a key conflict, and return every row's ids.
+
+    DO UPDATE (instead of DO NOTHING) makes RETURNING include rows that already existed.
+    """
+    if not rows:
+        return []
+    statement = insert(model).values(rows)
+    first_key = key_columns[0]
+    statement = statement.on_conflict_do_update(
+        index_elements=[getattr(model, column) for column in key_columns],
+        set_={first_key: getattr(statement.excluded, first_key)}
+    ).returning(*returning)
+    return db.execute(statement).all()
+
+
+def store_article_entities(db, article_id, document, all_entities, rankings):
+    """
+    Replace the entity rows of one article.
+
+    Args:
+        db: Session from session_scope(); the caller commits.
+        article_id: The saved Article.
+        document: AnalyzedDocument of the article text.
+        all_entities: Output of identify_entities().
+        rankings: Output of entity_ranking().
+    """
+    rows = entity_rows(document, all_entities, rankings)
+    types = rows["types"]
+
+    # Ids of the labels and entities, created if new
+    type_ids = {
+        typename: type_id for type_id, typename in upsert_returning(
+            db, EntityType,
+            [{"typename": typename} for typename in sorted(set(types.values()))],
+            ["typename"], [EntityType.entitytypeid, EntityType.typename]
+        )
+    }
+    entity_ids = {
+        name: entity_id for entity_id, name in upsert_returning(
+            db, Entity,
+            [{"name": name, "entitytypeid": type_ids[label]} for name, label in types.items()],
+            ["name", "entitytypeid"], [Entity.entityid, Entity.name]
+        )
+    }
+
+    # Re-saving an article replaces its rows; importance rows go with the extractions (ON DELETE CASCADE)
+    db.query(RelationshipMap).filter(RelationshipMap.articleid == article_id).delete(synchronize_session=False)
+    db.query(EntityExtraction).filter(EntityExtraction.articleid == article_id).delete(synchronize_session=False)
+
+    if not entity_ids:
+        return
+
+    extraction_ids = dict((entity_id, extraction_id) for extraction_id, entity_id in db.execute(
+        insert(EntityExtraction).values([
+            {"articleid": article_id, "entityid": entity_ids[name], "position": position, "frequency": frequency}
+            for name, (position, frequency) in rows["extractions"].items()
+        ]).returning(EntityExtraction.entityextractionid, EntityExtraction.entityid)
+    ).all())
+
+    if rows["importance"]:
+        db.execute(insert(EntityImportance).values([
+            {"extractionid": extraction_ids[entity_ids[name]], "importancescore": score}
+            for name, score in rows["importance"].items()
+        ]))
+
+    if rows["relationships"]:
+        relationship_rows = []
+        for (name_a, name_b), weight in rows["relationships"].items():
+            first, second = sorted((entity_ids[name_a], entity_ids[name_b]))
+            relationship_rows.append({"articleid": article_id, "entitya_id": first, "entityb_id": second, "weight": weight})
+        db.execute(insert(RelationshipMap).values(relationship_rows))
+
+
+def write_article_entities(article_id, text, all_entities, rankings):
+    """
+    Store the entity rows of one saved article in their own transaction.
+
+    Raises whatever the database raised; submit_article_entities() retries it.
+    """
+    document = build_document(text, strip_html=False)
+    with session_scope() as db:
+        store_article_entities(db, article_id, document, all_entities, rankings)
+
+
+# One writer thread: saves of the same article are applied in order
+_entity_writer = ThreadPoolExecutor(max_workers=1, thread_name_prefix="entity-writer")
+# article id -> number of the newest submitted save, so a retry never overwrites a newer one
+_latest_writes = {}
+_writes_lock = threading.Lock()
+entity_write_stats = {"written": 0, "retried": 0, "failed": 0}
+
+
+def _write_with_retry(article_id, write_number, attempt, args):
+    """Run write_article_entities() and queue another try if it fails."""
+    with _writes_lock:
+        if _latest_writes.get(article_id) != write_number:
+            # A newer save of this article is queued and will write the current rows
+            return False
+
+    try:
+        write_article_entities(article_id, *args)
+    except Exception as e:
+        if attempt < ENTITY_WRITE_ATTEMPTS:
+            delay = ENTITY_WRITE_RETRY_DELAY * 2 ** (attempt - 1)
+            print(f"Entity tables not updated for article {article_id} (attempt {attempt}), retrying in {delay:.0f}s: {e}")
+            entity_write_stats["retried"] += 1
+            timer = threading.Timer(
+                delay, _entity_writer.submit, args=(_write_with_retry, article_id, write_number, attempt + 1, args)
+            )
+            timer.daemon = True
+            timer.start()
+        else:
+            print(f"Entity tables not updated for article {article_id} after {attempt} attempts:\n{traceback.format_exc()}")
+            entity_write_stats["failed"] += 1
+            with _writes_lock:
+                if _latest_writes.get(article_id) == write_number:
+                    del _latest_writes[article_id]
+        return False
+
+    entity_write_stats["written"] += 1
+    with _writes_lock:
+        if _latest_writes.get(article_id) == write_number:
+            del _latest_writes[article_id]
+    return True
+
+
+def submit_article_entities(article_id, text, all_entities, rankings):
+    """
+    Queue write_article_entities() in the background and return the Future.
+
+    The Future resolves to True once the rows are written, or False if this
+    attempt failed (a retry may still be queued) or a newer save replaced it.
+    """
+    with _writes_lock:
+        write_number = _latest_writes.get(article_id, 0) + 1
+        _latest_writes[article_id] = write_number
+    return _entity_writer.submit(_write_with_retry, article_id, write_number, 1, (text, all_entities, rankings))
+
+
+def articles_mentioning(name, limit=50):
+    """
+    Articles that mention an entity, newest first.
+
+    Returns:
+        A list of (articleid, title, created_at, frequency).
+    """
+    with session_scope() as db:
+        return db.query(
+            Article.articleid, Article.title, Article.created_at, EntityExtraction.frequency
+        ).join(
+            EntityExtraction, EntityExtraction.articleid == Article.articleid
+        ).join(
+            Entity, Entity.entityid == EntityExtraction.entityid
+        ).filter(
+            Entity.name == name
+        ).order_by(Article.created_at.desc()).limit(limit).all()
+
+
+def top_cooccurring(days=7, limit=20):
+    """
+    Entity pairs mentioned together most often in articles of the last days.
+
+    Returns:
+        A list of (entity name, entity name, articles, shared sentences), most articles first.
+    """
+    since = datetime.now(timezone.utc) - timedelta(days=days)
+    entity_a, entity_b = aliased(Entity), aliased(Entity)
+    articles = func.count(RelationshipMap.articleid.distinct())
+
+    with session_scope() as db:
+        return db.query(
+            entity_a.name, entity_b.name, articles, func.sum(RelationshipMap.weight)
+        ).join(
+            Article, Article.articleid == RelationshipMap.articleid
+        ).join(
+            entity_a, entity_a.entityid == RelationshipMap.entitya_id
+        ).join(
+            entity_b, entity_b.entityid == RelationshipMap.entityb_id
+        ).filter(
+            Article.created_at >= since
+        ).group_by(
+            entity_a.name, entity_b.name
+        ).order_by(articles.desc()).limit(limit).all()
@@ -0,0 +1,313 @@
+"""
+Feed Ingestion Module: Concurrent RSS fetching with timeouts and conditional GET
+
+feedparser.parse(url) downloads one feed at a time with no timeout, so a
+single slow server stalls the caller. Here feeds are downloaded through one
+pooled requests.Session on a thread pool, every download has a connect,
+read and total time limit, and the ETag / Last-Modified of each feed is
+remembered so an unchanged feed is answered by a 304 and served from memory.
+
+Every fetch returns a result dict instead of raising:
+    {
+        "url": feed URL,
+        "status": "ok", "not_modified", "timeout" or "error",
+        "articles": list of article dicts (cached articles on 304),
+        "error": error message or None,
+        "elapsed": seconds spent on the request,
+    }
+"""
+
+import os
+import sys
+import time
+import socket
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import feedparser
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.connection import HTTPConnection, HTTPSConnection
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+
+sys.dont_write_bytecode = True
+
+# Feeds downloaded at the same time (also the size of the connection pool)
+FEED_FETCH_WORKERS = int(os.getenv("FEED_FETCH_WORKERS", "8"))
+# Seconds allowed to open the connection, to wait for each read, and for the whole download
+FEED_CONNECT_TIMEOUT = float(os.getenv("FEED_CONNECT_TIMEOUT", "5"))
+FEED_READ_TIMEOUT = float(os.getenv("FEED_READ_TIMEOUT", "10"))
+FEED_TOTAL_TIMEOUT = float(os.getenv("FEED_TOTAL_TIMEOUT", "15"))
+# Feeds larger than this are cut off instead of filling memory
+FEED_MAX_BYTES = int(os.getenv("FEED_MAX_BYTES", str(5 * 1024 * 1024)))
+
+USER_AGENT = "EntiLytics/1.0 (+feed ingestion)"
+CHUNK_SIZE = 64 * 1024
+
+
+class FeedTimeout(Exception):
+    """The feed did not finish downloading within FEED_TOTAL_TIMEOUT."""
+
+
+# Download running on the current thread; the connection that carries it registers here
+_current_download = threading.local()
+
+
+class _TrackedConnectionMixin:
+    """Records the connection on the current download before sending the request."""
+
+    def request(self, *args, **kwargs):
+        download = getattr(_current_download, "state", None)
+        if download is not None:
+            download["connection"] = self
+        return super().request(*args, **kwargs)
+
+
+class _TrackedHTTPConnection(_TrackedConnectionMixin, HTTPConnection):
+    pass
+
+
+class _TrackedHTTPSConnection(_TrackedConnectionMixin, HTTPSConnection):
+    pass
+
+
+class _TrackedHTTPConnectionPool(HTTPConnectionPool):
+    ConnectionCls = _TrackedHTTPConnection
+
+
+class _TrackedHTTPSConnectionPool(HTTPSConnectionPool):
+    ConnectionCls = _TrackedHTTPSConnection
+
+
+class TrackingAdapter(HTTPAdapter):
+    """HTTPAdapter whose connections can be shut down by the total-timeout watchdog."""
+
+    def init_poolmanager(self, *args, **kwargs):
+        super().init_poolmanager(*args, **kwargs)
+        self.poolmanager.pool_classes_by_scheme = {
+            "http": _TrackedHTTPConnectionPool,
+            "https": _TrackedHTTPSConnectionPool,
+        }
+
+
+def abort_download(download, expired):
+    """
+    Shut down the socket of a download when its time limit has passed.
+
+    Closing the response from another thread does not wake a read that is
+    blocked on the socket; shutting the socket down does. The connection is
+    known as soon as the request is sent, so a server that trickles the
+    status line or headers is cut off too, not only a slow body.
+    """
+    expired.set()
+    sock = getattr(download.get("connection"), "sock", None)
+    response = download.get("response")
+    if sock is None and response is not None:
+        # urllib3 keeps the connection on the raw response; http.client keeps the socket behind its file object
+        sock = getattr(getattr(response.raw, "_connection", None), "sock", None)
+        if sock is None:
+            sock = getattr(getattr(getattr(getattr(response.raw, "_fp", None), "fp", None), "raw", None), "_sock", None)
+    if sock is not None:
+        try:
+            sock.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+
+
+def articles_from_feed(feed, rss_url):
+    """
+    Convert parsed feed entries to the article dicts used by the app.
+
+    Args:
+        feed: feedparser result.
+        rss_url: The RSS feed URL, stored as the article source.
+
+    Returns:
+        List of dictionaries with article info
+    """
+    return [
+        {
+            'title': entry.get('title', 'No Title'),
+            'description': entry.get('description', ''),
+            'link': entry.get('link', ''),
+            'published': entry.get('published', 'Unknown date'),
+            'source': rss_url
+        }
+        for entry in feed.entries
+    ]
+
+
+class FeedCache:
+    """ETag, Last-Modified and last parsed articles of every feed fetched by this process."""
+
+    def __init__(self):
+        self._entries = {}
+        self._lock = threading.Lock()
+
+    def get(self, url):
+        with self._lock:
+            return self._entries.get(url)
+
+    def store(self, url, etag, last_modified, articles):
+        with self._lock:
+            self._entries[url] = {
+                "etag": etag,
+                "last_modified": last_modified,
+                "articles": articles,
+                "fetched_at": time.time(),
+            }
+
+    def conditional_headers(self, url):
+        """If-None-Match / If-Modified-Since headers for a feed seen before."""
+        entry = self.get(url)
+        headers = {}
+        if entry:
+            if entry["etag"]:
+                headers["If-None-Match"] = entry["etag"]
+            if entry["last_modified"]:
+                headers["If-Modified-Since"] = entry["last_modified"]
+        return headers
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+class FeedFetcher:
+    """Downloads feeds concurrently through one pooled HTTP session."""
+
+    def __init__(self, max_workers=FEED_FETCH_WORKERS, connect_timeout=FEED_CONNECT_TIMEOUT,
+                 read_timeout=FEED_READ_TIMEOUT, total_timeout=FEED_TOTAL_TIMEOUT, cache=None):
+        self.connect_timeout = connect_timeout
+        self.read_timeout = read_timeout
+        self.total_timeout = total_timeout
+        self.cache = cache or FeedCache()
+
+        # Keep-alive connections are reused across feeds on the same host
+        self.session = requests.Session()
+        adapter = TrackingAdapter(pool_connections=max_workers, pool_maxsize=max_workers)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self.session.headers["User-Agent"] = USER_AGENT
+
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="feed-fetch")
+
+    def _download(self, url, headers):
+        """GET the feed, enforcing the total time limit and size limit while streaming."""
+        deadline = time.monotonic() + self.total_timeout
+        # The clock is only checked between chunks, and a server that sends a few bytes
+        # per read timeout can hold the status line, headers or one chunk open
+        # indefinitely; the watchdog runs from before the request and cuts it off
+        download = {}
+        expired = threading.Event()
+        watchdog = threading.Timer(self.total_timeout, abort_download, args=(download, expired))
+        watchdog.daemon = True
+        watchdog.start()
+        _current_download.state = download
+        response = None
+        try:
+            try:
+                response = self.session.get(
+                    url,
+                    headers=headers,
+                    timeout=(self.connect_timeout, self.read_timeout),
+                    stream=True
+                )
+                download["response"] = response
+                if response.status_code == 304:
+                    return response, b""
+                response.raise_for_status()
+
+                body = bytearray()
+                for chunk in response.iter_content(CHUNK_SIZE):
+                    body.extend(chunk)
+                    if time.monotonic() > deadline:
+                        raise FeedTimeout(f"download exceeded {self.total_timeout}s")
+                    if len(body) > FEED_MAX_BYTES:
+                        break
+            except requests.RequestException:
+                # The request or read failed because the watchdog shut the socket
+                if expired.is_set():
+                    raise FeedTimeout(f"download exceeded {self.total_timeout}s")
+                raise
+            if expired.is_set():
+                raise FeedTimeout(f"download exceeded {self.total_timeout}s")
+            return response, bytes(body)
+        finally:
+            _current_download.state = None
+            watchdog.cancel()
+            if response is not None:
+                response.close()
+
+    def fetch(self, url):
+        """Fetch and parse one feed. Never raises; see the module docstring for the result format."""
+        start = time.perf_counter()
+        result = {"url": url, "status": "ok", "articles": [], "error": None, "elapsed": 0.0}
+
+        try:
+            response, body = self._download(url, self.cache.conditional_headers(url))
+            cached = self.cache.get(url)
+            if response.status_code == 304 and cached is None:
+                # The entry was cleared after the headers were built: ask for the full feed
+                response, body = self._download(url, {})
+                if response.status_code == 304:
+                    raise ValueError("server answered 304 to a request without conditional headers")
+
+            if response.status_code == 304:
+                # Unchanged since the last fetch: reuse the parsed articles
+                result["status"] = "not_modified"
+                result["articles"] = cached["articles"]
+            else:
+                # feedparser looks up headers by lowercase name
+                headers = {name.lower(): value for name, value in response.headers.items()}
+                feed = feedparser.parse(body, response_headers=headers)
+                if feed.bozo:  # bozo = feed has errors
+                    print(f"Warning: Feed may have issues: {url}")
+                result["articles"] = articles_from_feed(feed, url)
+                self.cache.store(
+                    url,
+                    response.headers.get("ETag"),
+                    response.headers.get("Last-Modified"),
+                    result["articles"]
+                )
+        except (FeedTimeout, requests.Timeout) as e:
+            result["status"] = "timeout"
+            result["error"] = str(e)
+            print(f"Timed out fetching RSS feed {url}: {e}")
+        except Exception as e:
+            result["status"] = "error"
+            result["error"] = str(e)
+            print(f"Error fetching RSS feed {url}: {e}")
+
+        result["elapsed"] = round(time.perf_counter() - start, 3)
+        return result
+
+    def fetch_many(self, urls):
+        """
+        Fetch several feeds concurrently.
+
+        Returns:
+            A dict of url -> result, in the order of urls. A slow feed only
+            delays the overall call up to its own time limit.
+        """
+        urls = list(dict.fromkeys(urls))
+        futures = {url: self._executor.submit(self.fetch, url) for url in urls}
+        return {url: future.result() for url, future in futures.items()}
+
+    def submit(self, url):
+        """Start fetching one feed in the background and return the Future."""
+        return self._executor.submit(self.fetch, url)
+
+
+# Shared by the UI and scripts in this process so the cache and connections are reused
+feed_fetcher = FeedFetcher()
+
+
+def fetch_feed(url):
+    """Fetch one feed with the shared fetcher."""
+    return feed_fetcher.fetch(url)
+
+
+def fetch_feeds(urls):
+    """Fetch several feeds concurrently with the shared fetcher."""
+    return feed_fetcher.fetch_many(urls)
@@ -0,0 +1,378 @@
+"""
+Feed Poller Module: Ingest tracked feeds in the background
+
+Every feed in the Source table is polled on its own schedule, and new
+items are stored in the Article table. The user then browses the
+ingested articles instead of waiting on a live fetch. Items are dropped
+when their link is already stored (after normalize_link()) or when their
+text is a near-duplicate of a stored article (content_fingerprint()).
+Syndicated wire copies published by several feeds are therefore stored,
+and analyzed, only once.
+
+Scheduling:
+    Each feed starts at FEED_POLL_INTERVAL. When a poll brings nothing
+    new, the interval grows by FEED_POLL_BACKOFF up to FEED_POLL_MAX_INTERVAL.
+    As soon as a new item arrives, the interval returns to the base value.
+    Every delay is spread by +/- FEED_POLL_JITTER so the feeds don't all
+    hit the network at the same moment.
+
+Every app process starts the poller, but only the process holding the
+FEED_POLLER_LOCK_KEY advisory lock in Postgres polls. The others retry
+every FEED_POLLER_LOCK_RETRY seconds and take over when that process stops.
+
+Run standalone:
+    python -m features.feed_poller
+"""
+
+import os
+import sys
+import time
+import heapq
+import random
+import threading
+from datetime import datetime, timedelta, timezone
+from email.utils import parsedate_to_datetime
+
+from sqlalchemy import text
+from sqlalchemy.dialects.postgresql import insert
+
+from features.database import engine, session_scope, Source, Article, article_content_hash
+from features.document import clean_html
+from features.feed_ingestion import fetch_feeds
+from features.article_fingerprint import normalize_link, content_fingerprint, FingerprintIndex
+
+sys.dont_write_bytecode = True
+
+# Seconds between polls of a feed that keeps publishing
+FEED_POLL_INTERVAL = float(os.getenv("FEED_POLL_INTERVAL", "900"))
+# Upper limit for feeds that have not changed for a while
+FEED_POLL_MAX_INTERVAL = float(os.getenv("FEED_POLL_MAX_INTERVAL", "3600"))
+# Interval multiplier after a poll without new items
+FEED_POLL_BACKOFF = float(os.getenv("FEED_POLL_BACKOFF", "1.5"))
+# Random spread of each delay, as a fraction of it
+FEED_POLL_JITTER = float(os.getenv("FEED_POLL_JITTER", "0.1"))
+# Days of stored articles kept in the link and fingerprint indexes
+FINGERPRINT_WINDOW_DAYS = int(os.getenv("FINGERPRINT_WINDOW_DAYS", "7"))
+# Postgres advisory lock held by the one process that polls (any fixed 64-bit number)
+FEED_POLLER_LOCK_KEY = int(os.getenv("FEED_POLLER_LOCK_KEY", "720531"))
+# Seconds between attempts to take the lock while another process polls
+FEED_POLLER_LOCK_RETRY = float(os.getenv("FEED_POLLER_LOCK_RETRY", "60"))
+# Skip items whose cleaned text is shorter than this (headline-only entries)
+MIN_ARTICLE_CHARACTERS = 100
+
+
+def jittered(seconds):
+    """Delay spread by +/- FEED_POLL_JITTER."""
+    return seconds * random.uniform(1 - FEED_POLL_JITTER, 1 + FEED_POLL_JITTER)
+
+
+def parse_published_date(published):
+    """RSS published string to a date, or None if it can't be parsed."""
+    try:
+        return parsedate_to_datetime(published).date()
+    except (TypeError, ValueError, IndexError):
+        return None
+
+
+def get_or_create_source(url, name=None):
+    """
+    Return the sourceid of a feed URL, registering it for polling if new.
+
+    Args:
+        url: The RSS feed URL.
+        name: Display name; defaults to the URL.
+    """
+    try:
+        with session_scope() as db:
+            source = db.query(Source).filter(Source.url == url).first()
+            if source is None:
+                source = Source(name=name or url, url=url)
+                db.add(source)
+                db.flush()
+            return source.sourceid
+    except Exception as e:
+        print(f"Failed to register feed {url}: {e}")
+        return None
+
+
+def load_source_articles(url, limit=100):
+    """
+    Ingested articles of a tracked feed, newest first, in the format of fetch_rss_articles().
+
+    Returns an empty list if the feed is not tracked yet.
+    """
+    with session_scope() as db:
+        rows = db.query(Article.title, Article.content, Article.normalized_link, Article.datepublished).join(
+            Source, Article.sourceid == Source.sourceid
+        ).filter(Source.url == url).order_by(Article.created_at.desc()).limit(limit).all()
+
+    return [
+        {
+            'title': title,
+            'description': content,
+            'link': link or '',
+            'published': published.isoformat() if published else 'Unknown date',
+            'source': url
+        }
+        for title, content, link, published in rows
+    ]
+
+
+class FeedPoller:
+    """Polls every Source on its own schedule and stores new, non-duplicate items."""
+
+    def __init__(self):
+        self._fingerprints = FingerprintIndex()
+        # normalized link -> time.time() it was stored or seen
+        self._seen_links = {}
+        # Connection holding the advisory lock while this process is the one polling
+        self._lock_connection = None
+        # Min-heap of (next poll time, sourceid)
+        self._schedule = []
+        self._intervals = {}
+        self._stop = threading.Event()
+        self._thread = None
+        self.stats = {"polls": 0, "stored": 0, "duplicate_links": 0, "duplicate_content": 0}
+
+    def load_recent_articles(self):
+        """Fill the dedup indexes with the articles stored in the last FINGERPRINT_WINDOW_DAYS."""
+        since = datetime.now(timezone.utc) - timedelta(days=FINGERPRINT_WINDOW_DAYS)
+        with session_scope() as db:
+            rows = db.query(
+                Article.articleid, Article.normalized_link, Article.content_fingerprint, Article.created_at
+            ).filter(Article.created_at >= since).all()
+
+        for article_id, link, fingerprint, created_at in rows:
+            added_at = created_at.timestamp()
+            if link:
+                self._seen_links[link] = max(added_at, self._seen_links.get(link, added_at))
+            if fingerprint:
+                self._fingerprints.add(fingerprint, article_id, added_at)
+
+    def expire_old_entries(self):
+        """Drop links and fingerprints older than FINGERPRINT_WINDOW_DAYS so the indexes stay bounded."""
+        before = time.time() - FINGERPRINT_WINDOW_DAYS * 86400
+        self._seen_links = {link: added_at for link, added_at in self._seen_links.items() if added_at >= before}
+        self._fingerprints.expire(before)
+
+    def refresh_sources(self):
+        """Schedule feeds added to the Source table since the last check."""
+        with session_scope() as db:
+            sources = db.query(Source.sourceid, Source.url).all()
+
+        now = time.monotonic()
+        urls = {}
+        for source_id, url in sources:
+            urls[source_id] = url
+            if source_id not in self._intervals:
+                self._intervals[source_id] = FEED_POLL_INTERVAL
+                # New feeds start soon, spread out so they are not fetched in one burst
+                heapq.heappush(self._schedule, (now + jittered(5), source_id))
+        return urls
+
+    def ingest(self, source_id, articles):
+        """
+        Store the new items of one feed in a single transaction.
+
+        The dedup indexes are only updated once the transaction has committed.
+
+        Returns:
+            The number of articles stored.
+        """
+        # Items of this batch, so a feed listing the same story twice stores it once
+        batch_links = set()
+        batch_fingerprints = FingerprintIndex()
+        stored_items = []
+        try:
+            with session_scope() as db:
+                for article in articles:
+                    link = normalize_link(article.get('link'))
+                    if link and (link in self._seen_links or link in batch_links):
+                        self.stats["duplicate_links"] += 1
+                        continue
+
+                    content = clean_html(article.get('description', ''))
+                    if len(content) < MIN_ARTICLE_CHARACTERS:
+                        continue
+
+                    fingerprint = content_fingerprint(content)
+                    if self._fingerprints.find(fingerprint) is not None or batch_fingerprints.find(fingerprint) is not None:
+                        # Same story from another feed; keep the copy already stored
+                        self.stats["duplicate_content"] += 1
+                        if link:
+                            batch_links.add(link)
+                        continue
+
+                    # Another process (or a user save) may store the same link or text first; the unique indexes decide
+                    statement = insert(Article).values(
+                        title=article.get('title', 'No Title'),
+                        content=content,
+                        sourceid=source_id,
+                        datepublished=parse_published_date(article.get('published')),
+                        normalized_link=link or None,
+                        content_fingerprint=fingerprint,
+                        content_hash=article_content_hash(content)
+                    ).on_conflict_do_nothing().returning(Article.articleid)
+                    article_id = db.execute(statement).scalar()
+
+                    if link:
+                        batch_links.add(link)
+                    if article_id is not None:
+                        batch_fingerprints.add(fingerprint, article_id)
+                        stored_items.append((fingerprint, article_id))
+        except Exception as e:
+            print(f"Feed ingestion failed for source {source_id}: {e}")
+            return 0
+
+        now = time.time()
+        for link in batch_links:
+            self._seen_links[link] = now
+        for fingerprint, article_id in stored_items:
+            self._fingerprints.add(fingerprint, article_id, now)
+
+        self.stats["stored"] += len(stored_items)
+        return len(stored_items)
+
+    def poll_due(self):
+        """Fetch every feed whose time has come and reschedule it."""
+        self.expire_old_entries()
+        urls = self.refresh_sources()
+        now = time.monotonic()
+
+        due = []
+        while self._schedule and self._schedule[0][0] <= now:
+            _, source_id = heapq.heappop(self._schedule)
+            if source_id in urls:
+                due.append(source_id)
+        if not due:
+            return
+
+        # All due feeds are downloaded concurrently
+        results = fetch_feeds([urls[source_id] for source_id in due])
+        for source_id in due:
+            result = results[urls[source_id]]
+            stored = self.ingest(source_id, result["articles"]) if result["status"] == "ok" else 0
+            self.stats["polls"] += 1
+
+            # Active feeds are polled at the base rate, quiet ones back off
+            if stored:
+                self._intervals[source_id] = FEED_POLL_INTERVAL
+            else:
+                self._intervals[source_id] = min(self._intervals[source_id] * FEED_POLL_BACKOFF, FEED_POLL_MAX_INTERVAL)
+            heapq.heappush(self._schedule, (time.monotonic() + jittered(self._intervals[source_id]), source_id))
+
+    def seconds_until_next_poll(self):
+        if not self._schedule:
+            return FEED_POLL_INTERVAL
+        return max(0.0, self._schedule[0][0] - time.monotonic())
+
+    def hold_poll_lock(self):
+        """
+        Take or confirm the advisory lock that lets this process poll.
+
+        The lock lives on one dedicated connection. If that connection drops,
+        Postgres releases the lock and another process may take it, so the
+        lock is checked again before every poll.
+
+        Returns:
+            True while this process holds the lock.
+        """
+        try:
+            if self._lock_connection is None:
+                connection = engine.connect()
+                acquired = connection.execute(
+                    text("SELECT pg_try_advisory_lock(:key)"), {"key": FEED_POLLER_LOCK_KEY}
+                ).scalar()
+                # Session-level locks outlive the transaction; don't sit idle inside one
+                connection.commit()
+                if not acquired:
+                    connection.close()
+                    return False
+                self._lock_connection = connection
+                return True
+
+            held = self._lock_connection.execute(
+                text(
+                    "SELECT count(*) FROM pg_locks WHERE locktype = 'advisory' AND granted "
+                    "AND pid = pg_backend_pid() "
+                    "AND classid::bigint = CAST(:key AS bigint) >> 32 "
+                    "AND objid::bigint = CAST(:key AS bigint) & 4294967295 AND objsubid = 1"
+                ),
+                {"key": FEED_POLLER_LOCK_KEY}
+            ).scalar()
+            self._lock_connection.commit()
+            if held:
+                return True
+        except Exception as e:
+            print(f"Feed poller lock check failed: {e}")
+        self.release_poll_lock()
+        return False
+
+    def release_poll_lock(self):
+        """Give up the advisory lock so another process can poll."""
+        connection, self._lock_connection = self._lock_connection, None
+        if connection is None:
+            return
+        try:
+            connection.execute(text("SELECT pg_advisory_unlock(:key)"), {"key": FEED_POLLER_LOCK_KEY})
+            connection.commit()
+            connection.close()
+        except Exception:
+            # Never hand a connection that may still hold the lock back to the pool
+            connection.invalidate()
+
+    def run(self):
+        """Poll while this process holds the advisory lock, until stop() is called."""
+        polling = False
+        try:
+            while not self._stop.is_set():
+                if not self.hold_poll_lock():
+                    polling = False
+                    self._stop.wait(FEED_POLLER_LOCK_RETRY)
+                    continue
+
+                if not polling:
+                    # Another process may have stored articles while this one waited
+                    try:
+                        self.load_recent_articles()
+                    except Exception as e:
+                        print(f"Could not load recent articles for deduplication: {e}")
+                    polling = True
+
+                try:
+                    self.poll_due()
+                except Exception as e:
+                    print(f"Feed poll failed: {e}")
+                # Wake up for the next due feed, or at least once a minute to pick up new sources
+                self._stop.wait(min(self.seconds_until_next_poll(), 60))
+        finally:
+            self.release_poll_lock()
+
+    def start(self):
+        """Run the poller in a daemon thread (once)."""
+        if self._thread is None:
+            self._thread = threading.Thread(target=self.run, name="feed-poller", daemon=True)
+            self._thread.start()
+        return self._thread
+
+    def stop(self):
+        self._stop.set()
+
+
+# One poller per process; started by start_feed_poller()
+feed_poller = FeedPoller()
+
+
+def start_feed_poller():
+    """
+    Start the shared poller in the background unless FEED_POLLER_ENABLED=0.
+
+    Safe to call from every app process: only the one holding the advisory lock polls.
+    """
+    if os.getenv("FEED_POLLER_ENABLED", "1") != "1":
+        return None
+    return feed_poller.start()
+
+
+if __name__ == "__main__":
+    feed_poller.run()
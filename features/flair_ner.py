@@ -1,30 +1,43 @@
-import nltk
+import os
 import sys
+import functools
 from flair.data import Sentence
 from flair.nn import Classifier
 from nltk.stem import WordNetLemmatizer
 from nltk import pos_tag, word_tokenize
 from nltk.corpus import wordnet
+from features.document import as_document, text_of
+from features.entity_dedup import VariantIndex, is_morphological_variant
+from features.model_registry import register_model, get_model, nltk_resource_loader
 
 sys.dont_write_bytecode = True
 
 # Download WordNet data if not already present on the current environment.
-# This check runs once and is skipped on subsequent startups.
-try:
-    nltk.data.find('corpora/wordnet')
-    nltk.data.find('taggers/averaged_perceptron_tagger_eng')
-except LookupError:
-    nltk.download('wordnet', quiet=True)
-    nltk.download('averaged_perceptron_tagger_eng', quiet=True)
-
-# Load the ner-fast model: a BiLSTM NER model with a Softmax output layer.
+# This check runs on first use (or warm-up) and is skipped on subsequent startups.
+NORMALIZATION_DATA = 'nltk-normalization-data'
+register_model(NORMALIZATION_DATA, nltk_resource_loader(
+    ('corpora/wordnet', 'wordnet'),
+    ('taggers/averaged_perceptron_tagger_eng', 'averaged_perceptron_tagger_eng'),
+    ('tokenizers/punkt_tab', 'punkt_tab'),
+))
+
+# The ner-fast model: a BiLSTM NER model with a Softmax output layer.
 # This is the non-CRF alternative provided by Flair, suited for environments
 # where raw BiLSTM feature output is preferred over global sequence smoothing.
-tagger = Classifier.load('ner-fast')
+# Loaded on first use (or by model_registry.warm_up()) instead of at import.
+NER_MODEL_NAME = 'ner-fast'
+register_model(NER_MODEL_NAME, lambda: Classifier.load(NER_MODEL_NAME))
 
 # Initialize the WordNet Lemmatizer for morphological normalization.
 lemmatizer = WordNetLemmatizer()
 
+# Number of sentences the tagger processes per forward pass in sentence mode.
+# Larger batches are faster on long articles but use more memory.
+NER_MINI_BATCH_SIZE = int(os.getenv("NER_MINI_BATCH_SIZE", "32"))
+
+# Maximum number of distinct entity strings remembered by normalize_entity().
+NORMALIZE_CACHE_SIZE = int(os.getenv("NORMALIZE_CACHE_SIZE", "10000"))
+
 def get_wordnet_pos(nltk_pos_tag):
     """
     Convert NLTK POS tag to WordNet POS tag for accurate lemmatization.
@@ -47,6 +60,7 @@ def get_wordnet_pos(nltk_pos_tag):
         return wordnet.NOUN  # Default to noun
 
 
+@functools.lru_cache(maxsize=NORMALIZE_CACHE_SIZE)
 def normalize_entity(text: str) -> str:
     """
     Converts an extracted entity string to a standardized base form.
@@ -54,12 +68,17 @@ def normalize_entity(text: str) -> str:
     Applies POS-aware lemmatization to reduce inflected forms to base form.
     Proper nouns (NNP/NNPS) are preserved as-is to keep entity names intact.
 
+    Results are memoized in a bounded, thread-safe LRU because the same
+    surface strings recur within and across articles (see
+    normalization_cache_stats()).
+
     Args:
         text: The raw entity string as extracted by the NER model.
 
     Returns:
         A string with each word reduced to its base form using POS tags.
     """
+    get_model(NORMALIZATION_DATA)
     tokens = word_tokenize(text)
     tagged_tokens = pos_tag(tokens)
 
@@ -77,81 +96,138 @@ def normalize_entity(text: str) -> str:
     return " ".join(normalized_words)
 
 
-def is_morphological_variant(candidate_entity_name, seen_entity_list):
+def normalization_cache_stats():
     """
-    Check if candidate entity is a morphological variant of a seen entity.
-    (Words with the same structural base)
-    
+    Returns the normalize_entity() cache counters.
+
+    Returns:
+        A dict with keys: 'hits', 'misses', 'size', 'max_size'.
+    """
+    info = normalize_entity.cache_info()
+    return {
+        "hits": info.hits,
+        "misses": info.misses,
+        "size": info.currsize,
+        "max_size": info.maxsize
+    }
+
+
+def predict_spans_many(texts, by_sentence=True, mini_batch_size=NER_MINI_BATCH_SIZE):
+    """
+    Runs the tagger over several articles in shared forward passes.
+
     Args:
-        candidate_entity_name: New entity to check.
-        seen_entity_list: List of already-accepted entities.
-        
+        texts: Article texts or AnalyzedDocuments.
+        by_sentence: If True, each sentence is tagged as its own Flair
+            Sentence and the list is predicted in mini-batches. If False,
+            each article is tagged as one long sequence.
+        mini_batch_size: Sentences per forward pass.
+
     Returns:
-        True if candidate is a variant of a seen entity, False otherwise.
+        One list of (start_offset, end_offset, span) tuples per article, in document order.
     """
-    candidate_lower = candidate_entity_name.lower().strip()
-    
-    for seen_entity in seen_entity_list:
-        seen_lower = seen_entity.lower().strip()
-        
-        # Skip if lengths differ too much
-        length_difference = abs(len(candidate_lower) - len(seen_lower))
-        if length_difference > 3:
+    tagger = get_model(NER_MODEL_NAME)
+
+    # (article index, start offset) of every Flair sentence, so spans can be mapped back
+    flair_sentences = []
+    sentence_owners = []
+    for article_index, text in enumerate(texts):
+        if not by_sentence:
+            flair_sentences.append(Sentence(text_of(text)))
+            sentence_owners.append((article_index, 0))
             continue
-        
-        # Check substring containment
-        if candidate_lower in seen_lower or seen_lower in candidate_lower:
-            # Verify they share significant overlap (80%+ character match)
-            longer = max(candidate_lower, seen_lower, key=len)
-            shorter = min(candidate_lower, seen_lower, key=len)
-            
-            # Count how many characters from the shorter string appear in the longer.
-            matching_chars = 0
-            for char in shorter:
-                if char in longer:
-                    matching_chars += 1
-            
-            overlap_ratio = matching_chars / len(longer)
-            if overlap_ratio >= 0.80:
-                return True
-    
-    return False
 
+        document = as_document(text)
+        for (start, _), sentence_text in zip(document.sentence_spans, document.sentences):
+            if sentence_text.strip():
+                flair_sentences.append(Sentence(sentence_text))
+                sentence_owners.append((article_index, start))
 
-def identify_entities(text: str) -> list:
-    """
-    Extracts named entities from the given text using the Flair NER model.
+    spans = [[] for _ in texts]
+    if not flair_sentences:
+        return spans
 
-    Applies morphological normalization and deduplication to prevent 
-    variant entities from being counted separately.
+    # Sentences from every article share the same mini-batches
+    tagger.predict(flair_sentences, mini_batch_size=mini_batch_size)
+
+    for (article_index, offset), sentence in zip(sentence_owners, flair_sentences):
+        for span in sentence.get_spans('ner'):
+            spans[article_index].append((offset + span.start_position, offset + span.end_position, span))
+    return spans
+
+
+def predict_spans(text, by_sentence=True, mini_batch_size=NER_MINI_BATCH_SIZE):
+    """
+    Runs the tagger and returns the NER spans with document character offsets.
 
     Args:
-        text: The full article text to analyze.
+        text: The full article text or its AnalyzedDocument.
+        by_sentence: If True, each sentence is tagged as its own Flair
+            Sentence and the list is predicted in mini-batches. If False,
+            the whole article is tagged as one long sequence.
+        mini_batch_size: Sentences per forward pass in sentence mode.
 
     Returns:
-        A list of dicts with keys: 'text', 'label', 'confidence'.
-        Deduplicated by morphological variant matching.
+        A list of (start_offset, end_offset, span) tuples in document order.
     """
-    sentence = Sentence(text)
-    tagger.predict(sentence)
+    return predict_spans_many([text], by_sentence, mini_batch_size)[0]
 
-    entity_results = []
-    seen_entity_names = []
 
-    if not sentence.get_spans('ner'):
-        return entity_results
+def deduplicate_spans(spans):
+    """
+    Normalizes span texts and drops morphological variants of earlier entities.
+
+    Returns:
+        A list of dicts with keys: 'text', 'label', 'confidence', 'start', 'end'.
+    """
+    entity_results = []
+    # Buckets accepted names so each candidate is only compared with plausible neighbours
+    seen_entity_names = VariantIndex()
 
-    for entity_span in sentence.get_spans('ner'):
+    for start, end, entity_span in spans:
         entity_label = entity_span.get_label('ner')
         normalized_entity_name = normalize_entity(entity_span.text)
 
         # Skip if this entity or a morphological variant was already added
-        if not is_morphological_variant(normalized_entity_name, seen_entity_names):
+        if not seen_entity_names.is_variant(normalized_entity_name):
             entity_results.append({
                 "text": normalized_entity_name,
                 "label": entity_label.value,
-                "confidence": round(entity_label.score, 2)
+                "confidence": round(entity_label.score, 2),
+                "start": start,
+                "end": end
             })
-            seen_entity_names.append(normalized_entity_name)
+            seen_entity_names.add(normalized_entity_name)
+
+    return entity_results
+
+
+def identify_entities(text, by_sentence=True, mini_batch_size=NER_MINI_BATCH_SIZE) -> list:
+    """
+    Extracts named entities from the given text using the Flair NER model.
+
+    Applies morphological normalization and deduplication to prevent 
+    variant entities from being counted separately.
+
+    Args:
+        text: The full article text (or its AnalyzedDocument) to analyze.
+        by_sentence: Tag sentence by sentence in mini-batches (default) instead
+            of as one long sequence. Keeps memory flat on long articles.
+        mini_batch_size: Sentences per forward pass in sentence mode.
+
+    Returns:
+        A list of dicts with keys: 'text', 'label', 'confidence', 'start', 'end'
+        ('start'/'end' are character offsets of the first mention in the article).
+        Deduplicated by morphological variant matching.
+    """
+    return deduplicate_spans(predict_spans(text, by_sentence, mini_batch_size))
+
+
+def identify_entities_many(texts, by_sentence=True, mini_batch_size=NER_MINI_BATCH_SIZE) -> list:
+    """
+    identify_entities() for several articles, tagged in shared forward passes.
 
-    return entity_results
\ No newline at end of file
+    Returns:
+        One entity list per article, in the same order as texts.
+    """
+    return [deduplicate_spans(spans) for spans in predict_spans_many(texts, by_sentence, mini_batch_size)]
@@ -0,0 +1,184 @@
+"""
+Graph Template Module: Render the relationship map from one precompiled HTML template
+
+pyvis builds a Network object, renders it through Jinja and is then patched
+with several string replacements for every graph. Here the page is written
+once: the template is split at its placeholders when the module is imported,
+and rendering joins the fixed parts with the graph's id and its payload JSON.
+The browser builds the vis.js nodes, edges and hover texts from the compact
+payload of build_graph(), so every evidence sentence is sent only once.
+"""
+
+import re
+import sys
+import json
+import uuid
+
+sys.dont_write_bytecode = True
+
+# Placeholders replaced per graph: a unique element id and the build_graph() payload
+GRAPH_ID = "__GRAPH_ID__"
+GRAPH_DATA = "__GRAPH_DATA__"
+
+TEMPLATE = """<html style="height: 100%;">
+<head>
+<meta charset="utf-8">
+<link rel="stylesheet" href="https://cdnjs.cloudflare.com/ajax/libs/vis-network/9.1.2/dist/dist/vis-network.min.css" integrity="sha512-WgxfT5LWjfszlPHXRmBWHkV2eceiWTOBvrKCNbdgDYTHrT2AeLCGbF4sZlZw3UMN3WtL0tGUoIAKsu8mllg/XA==" crossorigin="anonymous" referrerpolicy="no-referrer" />
+<script src="https://cdnjs.cloudflare.com/ajax/libs/vis-network/9.1.2/dist/vis-network.min.js" integrity="sha512-LnvoEWDFrqGHlHmDD2101OrLcbsfkrzoSpvtSQtxK3RMnRV0eOkhhBN2dXHKRrUU8p2DGRTk35n4O8nWSVe1mQ==" crossorigin="anonymous" referrerpolicy="no-referrer"></script>
+<link href="https://cdn.jsdelivr.net/npm/bootstrap@5.0.0-beta3/dist/css/bootstrap.min.css" rel="stylesheet" integrity="sha384-eOJMYsd53ii+scO/bJGFsiCZc+5NDVN2yr8+0RDqr0Ql0h+rP48ckxlpbzKgwra6" crossorigin="anonymous" />
+<style type="text/css">
+  #__GRAPH_ID__ {
+    width: 100%;
+    height: 100%;
+    background-color: white;
+    border: 1px solid lightgray;
+    position: relative;
+    float: left;
+  }
+</style>
+</head>
+<body style="margin: 0; padding: 0; height: 100%;">
+<div class="card" style="width: 100%; height: 100%;">
+  <div id="__GRAPH_ID__" class="card-body"></div>
+</div>
+
+<div id="customModal" style="display:none; position:fixed; z-index:9999; left:0; top:0; width:100%; height:100%; background-color:rgba(0,0,0,0.7); font-family: 'Roboto Mono', monospace; backdrop-filter: blur(2px);">
+  <div style="background-color:white; margin:8% auto; padding:30px; border-radius:2px; width:65%; max-height:75%; overflow-y:auto; position:relative; box-shadow: 0 20px 40px rgba(0,0,0,0.4); border-left: 5px solid #1C6EA4;">
+    <span id="closeModal" style="position:absolute; right:25px; top:15px; cursor:pointer; font-size:30px; color:#1C6EA4; font-weight:bold;">&times;</span>
+    <h3 id="modalTitle" style="color:#1C6EA4; border-bottom:1px solid #eee; padding-bottom:15px; margin-top:0; font-size: 1.4rem; letter-spacing: -0.5px;">Details</h3>
+    <div id="modalContentWrapper" style="padding: 10px 0;">
+      <pre id="modalContent" style="white-space: pre-wrap; word-wrap: break-word; font-size: 14px; line-height: 1.8; color: #333; text-align: justify; margin: 0; font-family: 'Roboto Mono', monospace;"></pre>
+    </div>
+  </div>
+</div>
+
+<script type="text/javascript">
+  var graph = __GRAPH_DATA__;
+
+  // Hover and modal texts are built here from the shared sentence list
+  function evidenceText(heading, indices, separator) {
+    return heading + indices.map(function (i) { return graph.sentences[i]; }).join(separator);
+  }
+
+  var nodes = new vis.DataSet(graph.nodes.map(function (node) {
+    var item = {
+      id: node.id,
+      label: node.label || node.id,
+      title: evidenceText("Occurrences:\\n", node.evidence, "\\n\\n"),
+      color: "#1C6EA4",
+      shape: "box",
+      font: {size: 25, face: "Roboto Mono", color: "#ffffff"}
+    };
+    // Node standing for the entities collapsed by the level-of-detail pass
+    if (node.members) {
+      item.title = "Entities:\\n" + node.members.join("\\n") + "\\n\\n" + item.title;
+      item.color = "#6C8EAD";
+    }
+    // Precomputed layout: start here instead of at random positions
+    if (node.x !== undefined) {
+      item.x = node.x;
+      item.y = node.y;
+    }
+    return item;
+  }));
+  var edges = new vis.DataSet(graph.edges.map(function (edge) {
+    return {
+      from: edge.from,
+      to: edge.to,
+      value: 2,
+      title: evidenceText("Found in:\\n", edge.evidence, "\\n"),
+      color: "#113F67"
+    };
+  }));
+
+  var options = {
+    configure: {enabled: false},
+    edges: {color: {inherit: true}, smooth: {enabled: true, type: "dynamic"}},
+    interaction: {dragNodes: true, hideEdgesOnDrag: false, hideNodesOnDrag: false},
+    physics: {
+      enabled: true,
+      // Force the nodes to spread out neatly
+      barnesHut: {
+        avoidOverlap: 0,
+        centralGravity: 0.3,
+        damping: 0.09,
+        gravitationalConstant: -8000,
+        springConstant: 0.001,
+        springLength: 250
+      },
+      // Graphs with precomputed positions only need a short settle
+      stabilization: {enabled: true, fit: true, iterations: graph.stabilization_iterations || 1000, onlyDynamicEdges: false, updateInterval: 50}
+    }
+  };
+
+  var network = new vis.Network(document.getElementById("__GRAPH_ID__"), {nodes: nodes, edges: edges}, options);
+
+  var modal = document.getElementById("customModal");
+  network.on("click", function (params) {
+    var title = "";
+    var content = "";
+    if (params.nodes.length > 0) {
+      var nodeData = nodes.get(params.nodes[0]);
+      title = "Entity: " + nodeData.label;
+      content = nodeData.title;
+    } else if (params.edges.length > 0) {
+      var edgeData = edges.get(params.edges[0]);
+      title = "Relationship: " + nodes.get(edgeData.from).label + " & " + nodes.get(edgeData.to).label;
+      content = edgeData.title;
+    } else {
+      return;
+    }
+    document.getElementById("modalTitle").innerText = title;
+    document.getElementById("modalContent").innerText = content;
+    modal.style.display = "block";
+  });
+
+  document.getElementById("closeModal").onclick = function () {
+    modal.style.display = "none";
+  };
+  window.onclick = function (event) {
+    if (event.target == modal) {
+      modal.style.display = "none";
+    }
+  };
+</script>
+</body>
+</html>
+"""
+
+
+def compile_template(template):
+    """
+    Split a template at its placeholders.
+
+    Returns:
+        A list of strings where every odd item is a placeholder name.
+    """
+    return re.split(f"({GRAPH_ID}|{GRAPH_DATA})", template)
+
+
+# Compiled once per process
+_TEMPLATE_PARTS = compile_template(TEMPLATE)
+
+
+def script_json(value):
+    """JSON that is safe inside a <script> element (no "</script>" or "<!--" in strings)."""
+    return json.dumps(value, separators=(",", ":")).replace("<", "\\u003c")
+
+
+def render_graph_document(graph):
+    """
+    Interactive HTML page of a build_graph() payload.
+
+    Args:
+        graph: The payload (sentences, nodes, edges).
+
+    Returns:
+        The HTML document for an iframe's srcdoc.
+    """
+    values = {
+        # Unique per graph so several maps on one page don't collide
+        GRAPH_ID: f"graph_{uuid.uuid4().hex[:8]}",
+        GRAPH_DATA: script_json(graph),
+    }
+    return "".join(values[part] if index % 2 else part for index, part in enumerate(_TEMPLATE_PARTS))
@@ -0,0 +1,39 @@
+"""
+Inference Module: Choose between in-process and served model inference
+
+INFERENCE_MODE=local (default) runs the models inside this process, as
+before. INFERENCE_MODE=served sends every request to the shared inference
+server (features/inference_server.py), so app processes never import
+Flair or torch and all Solara workers share one set of loaded models.
+
+Callers import the pipeline functions from here instead of the feature
+modules; the signatures are the same in both modes.
+"""
+
+import os
+import sys
+
+sys.dont_write_bytecode = True
+
+INFERENCE_MODE = os.getenv("INFERENCE_MODE", "local").lower()
+
+if INFERENCE_MODE not in ("local", "served"):
+    raise RuntimeError(f"INFERENCE_MODE must be 'local' or 'served', got '{INFERENCE_MODE}'")
+
+
+def local_pipeline_version():
+    """Models and threshold used by the in-process pipeline."""
+    from features.flair_ner import NER_MODEL_NAME
+    from features.entity_ranking_and_summarization import MODEL_NAME, DISTANCE_THRESHOLD
+    return f"{NER_MODEL_NAME}|{MODEL_NAME}|{DISTANCE_THRESHOLD}"
+
+
+if INFERENCE_MODE == "served":
+    from features.inference_client import (
+        identify_entities, entity_ranking, generate_summary,
+        pipeline_version
+    )
+else:
+    from features.flair_ner import identify_entities
+    from features.entity_ranking_and_summarization import entity_ranking, generate_summary
+    pipeline_version = local_pipeline_version
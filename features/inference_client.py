@@ -0,0 +1,95 @@
+"""
+Inference Client Module: Send pipeline requests to the local inference server
+
+Same function signatures as the in-process pipeline, so callers only switch
+imports (see features/inference.py). Each thread keeps its own connection
+because a multiprocessing Connection is not safe to share between threads.
+"""
+
+import sys
+import threading
+from multiprocessing.connection import Client
+
+from features.document import as_document
+from features.inference_server import INFERENCE_SOCKET, read_authkey
+
+sys.dont_write_bytecode = True
+
+_local = threading.local()
+
+
+class InferenceServerError(RuntimeError):
+    """Raised when the inference server is unreachable or a request fails on it."""
+
+
+def _connection():
+    """Return this thread's connection, opening it on first use."""
+    connection = getattr(_local, "connection", None)
+    if connection is None:
+        try:
+            # Read on every connect: a restarted server writes a new key
+            connection = Client(INFERENCE_SOCKET, family="AF_UNIX", authkey=read_authkey(INFERENCE_SOCKET))
+        except (OSError, EOFError) as e:
+            raise InferenceServerError(
+                f"Inference server not reachable at {INFERENCE_SOCKET} "
+                f"(start it with: python -m features.inference_server): {e}"
+            ) from e
+        _local.connection = connection
+    return connection
+
+
+def _close_connection():
+    connection = getattr(_local, "connection", None)
+    _local.connection = None
+    if connection is not None:
+        try:
+            connection.close()
+        except OSError:
+            pass
+
+
+def call(operation, args=()):
+    """
+    Run one operation on the server and return its result.
+
+    Reconnects once if the server was restarted since the last call.
+    """
+    for attempt in range(2):
+        try:
+            connection = _connection()
+            connection.send((operation, args))
+            status, payload = connection.recv()
+            break
+        except (OSError, EOFError) as e:
+            _close_connection()
+            if attempt == 1:
+                raise InferenceServerError(f"Inference request '{operation}' failed: {e}") from e
+
+    if status != "ok":
+        raise InferenceServerError(payload)
+    return payload
+
+
+def identify_entities(text) -> list:
+    """identify_entities() run on the inference server."""
+    return call("identify_entities", (as_document(text),))
+
+
+def entity_ranking(article_description, entity_list):
+    """entity_ranking() run on the inference server."""
+    return call("entity_ranking", (as_document(article_description), entity_list))
+
+
+def generate_summary(article_description, top_entities):
+    """generate_summary() run on the inference server."""
+    return call("generate_summary", (as_document(article_description), top_entities))
+
+
+def pipeline_version():
+    """Pipeline version of the models loaded by the server."""
+    return call("pipeline_version")
+
+
+def server_stats():
+    """Batch counts and average batch size per operation."""
+    return call("stats")
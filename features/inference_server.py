@@ -0,0 +1,256 @@
+"""
+Inference Server Module: One local process that owns the NLP models
+
+Each Solara worker process otherwise loads its own copy of the Flair tagger
+and the SentenceTransformer, and runs one forward pass per request. With
+INFERENCE_MODE=served the app processes send their requests here instead
+(see features/inference.py). The server loads the models once and groups
+concurrent requests from every session into shared forward passes.
+
+Micro-batching:
+    Requests for the same operation wait up to INFERENCE_MAX_WAIT_MS for
+    others to arrive, then up to INFERENCE_MAX_BATCH of them run through
+    the *_many() batch functions in one call.
+
+Access:
+    multiprocessing connections unpickle what the other side sends, so only
+    processes of the same user may connect. The socket lives in a private
+    (0700) directory, and clients must know the authkey: INFERENCE_AUTHKEY
+    if set, otherwise a random key the server writes to a 0600 file next to
+    the socket on every start.
+
+Run:
+    python -m features.inference_server
+"""
+
+import os
+import sys
+import time
+import queue
+import stat
+import secrets
+import tempfile
+import threading
+from pathlib import Path
+from concurrent.futures import Future
+from multiprocessing.connection import Listener
+
+sys.dont_write_bytecode = True
+
+
+def default_socket_path():
+    """Socket in the user's runtime directory, or in a per-user folder under the temp directory."""
+    runtime_dir = os.getenv("XDG_RUNTIME_DIR")
+    folder = Path(runtime_dir) / "entilytics" if runtime_dir else Path(tempfile.gettempdir()) / f"entilytics-{os.getuid()}"
+    return str(folder / "inference.sock")
+
+
+# Unix socket shared by the server and every app process; its directory must be private
+INFERENCE_SOCKET = os.getenv("INFERENCE_SOCKET") or default_socket_path()
+# Shared secret checked when a client connects; without it the server generates one
+INFERENCE_AUTHKEY = os.getenv("INFERENCE_AUTHKEY")
+# File holding the generated key (readable by the owner only)
+AUTHKEY_FILE_NAME = "authkey"
+
+# Maximum number of requests combined into one batch call
+INFERENCE_MAX_BATCH = int(os.getenv("INFERENCE_MAX_BATCH", "16"))
+# How long the first request of a batch waits for others to arrive
+INFERENCE_MAX_WAIT_MS = float(os.getenv("INFERENCE_MAX_WAIT_MS", "10"))
+
+
+class MicroBatcher:
+    """
+    Collects requests for one operation and runs them together.
+
+    submit() is called from many connection threads; a single batch thread
+    takes whatever has queued up (up to max_batch) and calls
+    batch_function(list_of_args) once, which must return one result per item.
+    """
+
+    def __init__(self, name, batch_function, max_batch=INFERENCE_MAX_BATCH, max_wait_ms=INFERENCE_MAX_WAIT_MS):
+        self.name = name
+        self.batch_function = batch_function
+        self.max_batch = max_batch
+        self.max_wait = max_wait_ms / 1000
+
+        self._requests = queue.Queue()
+        self._batches = 0
+        self._items = 0
+        self._thread = threading.Thread(target=self._work, name=f"batch-{name}", daemon=True)
+        self._thread.start()
+
+    def submit(self, args):
+        """Queue one request and block until its batch has run."""
+        future = Future()
+        self._requests.put((args, future))
+        return future.result()
+
+    def _collect(self):
+        """Block for the first request, then gather more until the batch is full or the wait ends."""
+        batch = [self._requests.get()]
+        deadline = time.monotonic() + self.max_wait
+        while len(batch) < self.max_batch:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._requests.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _work(self):
+        while True:
+            batch = self._collect()
+            try:
+                results = self.batch_function([args for args, _ in batch])
+                for (_, future), result in zip(batch, results):
+                    future.set_result(result)
+            except Exception as e:
+                # One failed forward pass fails every request that shared it
+                print(f"Inference batch '{self.name}' failed: {e}")
+                for _, future in batch:
+                    future.set_exception(e)
+            self._batches += 1
+            self._items += len(batch)
+
+    def stats(self):
+        """Number of batches run and the average batch size"""
+        return {
+            "batches": self._batches,
+            "requests": self._items,
+            "average_batch": round(self._items / self._batches, 2) if self._batches else 0.0,
+        }
+
+
+def build_batchers():
+    """One MicroBatcher per pipeline operation, backed by the feature modules' batch functions."""
+    from features.flair_ner import identify_entities_many
+    from features.entity_ranking_and_summarization import entity_ranking_many, generate_summary_many
+
+    return {
+        # Requests are (document,) tuples; every request uses the default sentence-mode settings
+        "identify_entities": MicroBatcher("identify_entities", lambda items: identify_entities_many([item[0] for item in items])),
+        "entity_ranking": MicroBatcher("entity_ranking", entity_ranking_many),
+        "generate_summary": MicroBatcher("generate_summary", generate_summary_many),
+    }
+
+
+def check_private_directory(folder):
+    """
+    Raise PermissionError unless folder is a directory owned by this user with no group/other access.
+
+    Otherwise another local user could replace the socket or read the key file.
+    """
+    info = os.lstat(folder)
+    if not stat.S_ISDIR(info.st_mode):
+        raise PermissionError(f"{folder} is not a directory")
+    if info.st_uid != os.getuid() or info.st_mode & 0o077:
+        raise PermissionError(f"{folder} must be owned by this user with mode 0700")
+
+
+def prepare_socket_directory(socket_path):
+    """Create the socket's directory with mode 0700 (if missing) and check that it is private."""
+    folder = os.path.dirname(os.path.abspath(socket_path))
+    os.makedirs(folder, mode=0o700, exist_ok=True)
+    check_private_directory(folder)
+    return folder
+
+
+def authkey_path(socket_path):
+    return os.path.join(os.path.dirname(os.path.abspath(socket_path)), AUTHKEY_FILE_NAME)
+
+
+def create_authkey(socket_path):
+    """Return INFERENCE_AUTHKEY, or write a new random key to a 0600 file for the clients."""
+    if INFERENCE_AUTHKEY:
+        return INFERENCE_AUTHKEY.encode("utf-8")
+
+    key = secrets.token_hex(32)
+    path = authkey_path(socket_path)
+    temp_path = f"{path}.{os.getpid()}.tmp"
+    descriptor = os.open(temp_path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+    with os.fdopen(descriptor, "w", encoding="utf-8") as key_file:
+        key_file.write(key)
+    # Replaced atomically so a connecting client never reads a partial key
+    os.replace(temp_path, path)
+    return key.encode("utf-8")
+
+
+def read_authkey(socket_path):
+    """Authkey used by clients: INFERENCE_AUTHKEY, or the key file written by the running server."""
+    if INFERENCE_AUTHKEY:
+        return INFERENCE_AUTHKEY.encode("utf-8")
+
+    check_private_directory(os.path.dirname(os.path.abspath(socket_path)))
+    with open(authkey_path(socket_path), "r", encoding="utf-8") as key_file:
+        return key_file.read().strip().encode("utf-8")
+
+
+def serve_connection(connection, batchers, pipeline_version):
+    """
+    Answer requests from one app process until it disconnects.
+
+    Requests are (operation, args) tuples. Replies are ("ok", result) or
+    ("error", message).
+    """
+    try:
+        while True:
+            try:
+                operation, args = connection.recv()
+            except EOFError:
+                return
+
+            try:
+                if operation == "pipeline_version":
+                    reply = ("ok", pipeline_version)
+                elif operation == "stats":
+                    reply = ("ok", {name: batcher.stats() for name, batcher in batchers.items()})
+                elif operation in batchers:
+                    reply = ("ok", batchers[operation].submit(args))
+                else:
+                    reply = ("error", f"Unknown operation '{operation}'")
+            except Exception as e:
+                reply = ("error", str(e))
+
+            connection.send(reply)
+    finally:
+        connection.close()
+
+
+def serve(socket_path=INFERENCE_SOCKET):
+    """Load the models, then accept app connections on the Unix socket forever."""
+    from features.model_registry import warm_up
+    from features.inference import local_pipeline_version
+
+    # Load everything before accepting requests so the first user doesn't pay for it
+    print(f"Model load times: {warm_up()}")
+    batchers = build_batchers()
+    pipeline_version = local_pipeline_version()
+
+    prepare_socket_directory(socket_path)
+    authkey = create_authkey(socket_path)
+
+    # A socket file left behind by a previous run would make bind() fail
+    if os.path.exists(socket_path):
+        os.remove(socket_path)
+
+    with Listener(socket_path, family="AF_UNIX", authkey=authkey) as listener:
+        print(f"Inference server listening on {socket_path}")
+        while True:
+            try:
+                connection = listener.accept()
+            except Exception as e:
+                # A client with the wrong authkey must not stop the server
+                print(f"Rejected inference connection: {e}")
+                continue
+            threading.Thread(
+                target=serve_connection,
+                args=(connection, batchers, pipeline_version),
+                name="inference-connection",
+                daemon=True
+            ).start()
+
+
+if __name__ == "__main__":
+    serve()
@@ -0,0 +1,128 @@
+"""
+Model Registry Module: Lazy loading and warm-up of NLP models
+
+Feature modules register a loader for each heavy resource (Flair tagger,
+SentenceTransformer, NLTK data) instead of loading it at import time.
+A resource is loaded the first time get_model() asks for it, or ahead of
+time by warm_up(). Importing ui/logic.py or an evaluation script no longer
+pays the model-load cost.
+
+Load durations are recorded so cold-start cost can be monitored.
+"""
+
+import sys
+import time
+import threading
+import nltk
+
+sys.dont_write_bytecode = True
+
+_loaders = {}
+_models = {}
+_load_seconds = {}
+
+# One lock per resource so a slow Flair load doesn't block the MiniLM load
+_load_locks = {}
+_registry_lock = threading.Lock()
+
+_warm_up_thread = None
+
+
+def register_model(name, loader):
+    """
+    Register how to load a resource. Nothing is loaded yet.
+
+    Args:
+        name: Unique resource name, e.g. 'ner-fast'.
+        loader: Callable with no arguments that returns the loaded resource.
+    """
+    with _registry_lock:
+        _loaders[name] = loader
+        _load_locks.setdefault(name, threading.Lock())
+
+
+def get_model(name):
+    """
+    Return a registered resource, loading it on first use.
+
+    Concurrent callers wait for a single load instead of loading twice.
+    """
+    model = _models.get(name)
+    if model is not None:
+        return model
+
+    if name not in _loaders:
+        raise KeyError(f"Model '{name}' is not registered")
+
+    with _load_locks[name]:
+        # Another thread may have finished loading while we waited
+        if name in _models:
+            return _models[name]
+
+        start = time.perf_counter()
+        model = _loaders[name]()
+        _load_seconds[name] = time.perf_counter() - start
+        _models[name] = model
+        print(f"Loaded {name} in {_load_seconds[name]:.2f}s")
+        return model
+
+
+def is_loaded(name):
+    """True if the resource has already been loaded."""
+    return name in _models
+
+
+def warm_up(names=None):
+    """
+    Load resources ahead of the first request.
+
+    Args:
+        names: Resource names to load. None loads every registered resource.
+
+    Returns:
+        A dict of resource name -> load time in seconds.
+    """
+    for name in list(names or _loaders):
+        try:
+            get_model(name)
+        except Exception as e:
+            # A failed warm-up is retried on first use
+            print(f"Warm-up failed for {name}: {e}")
+    return load_times()
+
+
+def start_background_warm_up(names=None):
+    """
+    Run warm_up() once in a daemon thread and return immediately.
+
+    Later calls are ignored while (or after) the first warm-up runs.
+    """
+    global _warm_up_thread
+    with _registry_lock:
+        if _warm_up_thread is not None:
+            return _warm_up_thread
+        _warm_up_thread = threading.Thread(target=warm_up, args=(names,), name="model-warm-up", daemon=True)
+        _warm_up_thread.start()
+        return _warm_up_thread
+
+
+def load_times():
+    """Return a dict of resource name -> seconds it took to load."""
+    return dict(_load_seconds)
+
+
+def nltk_resource_loader(*resources):
+    """
+    Build a loader that makes sure the given NLTK data packages are installed.
+
+    Args:
+        resources: (path, package) pairs, e.g. ('corpora/wordnet', 'wordnet').
+    """
+    def load():
+        for path, package in resources:
+            try:
+                nltk.data.find(path)
+            except LookupError:
+                nltk.download(package, quiet=True)
+        return True
+    return load
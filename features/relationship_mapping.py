@@ -1,52 +1,92 @@
 import networkx as nx
-import nltk
-from pyvis.network import Network
 from itertools import combinations
-from nltk.tokenize import sent_tokenize # Split articles by sentence rather than using split('.')
-import uuid
-import re # regex
+import os
+import json
+import math
+import zlib
 import sys
-import textwrap
 sys.dont_write_bytecode = True
-from bs4 import BeautifulSoup
-
-# nltk requirement
-try:
-    nltk.data.find('tokenizers/punkt_tab')
-except LookupError:
-    nltk.download('punkt_tab', quiet=True)
-
-def contains_entity(sentence: str, entity: str) -> bool:
-    # Match entity as a whole word/phrase, case-insensitive
-    pattern = r'\b' + re.escape(entity) + r'\b'
-    return re.search(pattern, sentence, flags=re.IGNORECASE) is not None
-
-def mapping(article, entities):
+from features.document import as_document
+from features.entity_matcher import EntityMatcher
+from features.graph_template import render_graph_document
+
+# Bump when the payload layout below changes
+GRAPH_FORMAT_VERSION = 2
+
+# Level of detail: limits that keep dense graphs drawable in the browser
+# Strongest edges kept in the whole graph
+GRAPH_MAX_EDGES = int(os.getenv("GRAPH_MAX_EDGES", "60"))
+# Strongest edges kept per entity
+GRAPH_MAX_EDGES_PER_NODE = int(os.getenv("GRAPH_MAX_EDGES_PER_NODE", "6"))
+# In graphs with more than GRAPH_COLLAPSE_MIN_NODES entities, entities with fewer
+# than GRAPH_COLLAPSE_BELOW_DEGREE remaining edges are merged into one node
+GRAPH_COLLAPSE_MIN_NODES = int(os.getenv("GRAPH_COLLAPSE_MIN_NODES", "20"))
+GRAPH_COLLAPSE_BELOW_DEGREE = int(os.getenv("GRAPH_COLLAPSE_BELOW_DEGREE", "2"))
+
+# Layout computed here and shipped with the graph
+# Pixels between connected nodes (same as the browser's spring length)
+GRAPH_SPRING_LENGTH = 250
+# Physics iterations the browser still runs from the shipped positions
+GRAPH_STABILIZATION_ITERATIONS = int(os.getenv("GRAPH_STABILIZATION_ITERATIONS", "100"))
+
+# Id of the node that stands for the collapsed entities
+COLLAPSED_NODE_ID = "__collapsed__"
+
+def build_graph(article, entities, level_of_detail=True):
+    """
+    Relationship map of an article as a compact payload (no HTML).
+
+    Every sentence that mentions an entity is stored once; nodes and edges
+    refer to their evidence by index into that list.
+
+    Args:
+        article: AnalyzedDocument or article text.
+        entities: Ranked entity names (the nodes).
+        level_of_detail: Prune and collapse dense graphs (simplify_graph())
+            and precompute node positions (add_layout()).
+
+    Returns:
+        {
+            "version": GRAPH_FORMAT_VERSION,
+            "sentences": [evidence sentence, ...],
+            "nodes": [{"id": name, "evidence": [sentence index, ...], "x": px, "y": px}, ...],
+            "edges": [{"from": name, "to": name, "weight": shared sentences,
+                       "evidence": [sentence index, ...]}, ...],
+            "stabilization_iterations": physics iterations for the browser,
+        }
+        The collapsed node, if any, also has "label" and "members" (entity names).
+    """
     # NetworkX Graph manages the logic and brain of the connections
     graph = nx.Graph()
 
-    # BeautifulSoup strips tags and fix spacing
-    # separator=" " let <p> tags get replaced by a space
-    soup = BeautifulSoup(article, "html.parser")
-    clean_text = soup.get_text(separator=" ")
+    # Reuse the shared document's sentences; a plain string is cleaned
+    # with BeautifulSoup and split into sentences here
+    document = as_document(article, strip_html=True)
+    sentences = document.sentences
 
-    # Split into sentences
-    sentences = sent_tokenize(clean_text)
+    # Sentences that mention at least one entity, each stored once
+    evidence_sentences = []
     
     # Track sentences for each individual entity
     entity_sentences = {e: [] for e in entities}
+
+    # Compile all entity names once; each sentence is then scanned in a single pass
+    matcher = EntityMatcher(entities)
     
     for sentence in sentences:
         clean_s = sentence.strip() # Remove extra spaces/newlines
         if not clean_s: continue   # Skip empty strings
 
-        # Collect sentences where each entity appears
-        for e in entities:
-          if contains_entity(clean_s, e):
-              entity_sentences[e].append(clean_s)
-        
         # Add the entities that are found from the current sentence
-        found = [e for e in entities if contains_entity(clean_s, e)]
+        found = matcher.entities_in(clean_s)
+        if not found: continue
+
+        sentence_index = len(evidence_sentences)
+        evidence_sentences.append(clean_s)
+
+        # Collect sentences where each entity appears
+        for e in found:
+            entity_sentences[e].append(sentence_index)
         
         # Create connection if 2 or more entities appear
         if len(found) > 1:
@@ -57,129 +97,134 @@ def mapping(article, entities):
                 
                 if graph.has_edge(u, v):
                     # Append the new sentence to the evidence list
-                    graph[u][v]['evidence'].append(clean_s)
+                    graph[u][v]['evidence'].append(sentence_index)
                 else:
                     # Create an edge and
                     # start a new list to store the sentence as evidence
-                    # weight = how strong the connection is
-                    # anything after u and v are custom attributes
-                    graph.add_edge(u, v, weight=1, evidence=[clean_s])
-
-    # Interactive Visualization using PyVis
-    net = Network(height="100%", width="100%", bgcolor="white", font_color="#ffffff", notebook=True, cdn_resources='remote')
-    # net.from_nx(graph) automatic creation with default style 
-
-    # Force the nodes to spread out neatly
-    net.barnes_hut(
-        gravity=-8000, # Pushes nodes away from each other
-        central_gravity=0.3, # Keeps the cluster centered
-        spring_length=250 # Controls the length of the lines
-    )
+                    graph.add_edge(u, v, evidence=[sentence_index])
+
+    payload = {
+        "version": GRAPH_FORMAT_VERSION,
+        "sentences": evidence_sentences,
+        "nodes": [{"id": e, "evidence": entity_sentences[e]} for e in entities],
+        # weight = how strong the connection is (number of shared sentences)
+        "edges": [
+            {"from": u, "to": v, "weight": len(data['evidence']), "evidence": data['evidence']}
+            for u, v, data in graph.edges(data=True)
+        ],
+    }
+    if not level_of_detail:
+        return payload
+    return add_layout(simplify_graph(payload))
+
+def simplify_graph(graph, max_edges=GRAPH_MAX_EDGES, max_edges_per_node=GRAPH_MAX_EDGES_PER_NODE,
+                   collapse_min_nodes=GRAPH_COLLAPSE_MIN_NODES, collapse_below_degree=GRAPH_COLLAPSE_BELOW_DEGREE):
+    """
+    Level of detail for dense graphs.
 
-    # Add nodes and the edge connecting them
-    # (ID, Visible text, Shows when hovered, Color of the circle)
-    for entity in entities:
-        node_evidence = "Occurrences:\n" + "\n\n".join(entity_sentences[entity])
-        net.add_node(entity, label=entity, title=node_evidence, color="#1C6EA4", shape="box", font={'size': 25, 'face': 'Roboto Mono', 'color': '#ffffff'})
+    A graph with at most max_edges edges and at most collapse_min_nodes nodes
+    is drawable as it is and returned unchanged. Otherwise edges are taken
+    strongest first (most shared sentences) while neither end has
+    max_edges_per_node edges yet, up to max_edges in total. In graphs with
+    more than collapse_min_nodes nodes, nodes left with fewer than
+    collapse_below_degree edges are merged into one node; their edges to the
+    remaining nodes are merged too.
 
-    # Iterate through the NetworkX edges to build the Pyvis map
-    for u, v, data in graph.edges(data=True): # True gives the custom attributes from graph
-        # title is an attribute Pyvis uses for the hover tooltip
-        hover_text = "Found in:\n" + "\n".join(data['evidence'])
-        
-        # (Nodes to connect, line thickness, Shows when hovered, Color of the line)
-        net.add_edge(u, v, 
-                    value=2,
-                    title=hover_text,      
-                    color="#113F67")
-
-    # Generate the html string
-    html_string = net.generate_html() 
-
-    modal_html = """
-    <div id="customModal" style="display:none; position:fixed; z-index:9999; left:0; top:0; width:100%; height:100%; background-color:rgba(0,0,0,0.7); font-family: 'Roboto Mono', monospace; backdrop-filter: blur(2px);">
-      <div style="background-color:white; margin:8% auto; padding:30px; border-radius:2px; width:65%; max-height:75%; overflow-y:auto; position:relative; box-shadow: 0 20px 40px rgba(0,0,0,0.4); border-left: 5px solid #1C6EA4;">
-        <span id="closeModal" style="position:absolute; right:25px; top:15px; cursor:pointer; font-size:30px; color:#1C6EA4; font-weight:bold;">&times;</span>
-        
-        <h3 id="modalTitle" style="color:#1C6EA4; border-bottom:1px solid #eee; padding-bottom:15px; margin-top:0; font-size: 1.4rem; letter-spacing: -0.5px;">Details</h3>
-        
-        <div id="modalContentWrapper" style="padding: 10px 0;">
-            <pre id="modalContent" style="
-                white-space: pre-wrap; 
-                word-wrap: break-word; 
-                font-size: 14px; 
-                line-height: 1.8; 
-                color: #333; 
-                text-align: justify; 
-                margin: 0;
-                font-family: 'Roboto Mono', monospace;
-            "></pre>
-        </div>
-      </div>
-    </div>
-
-    <script type="text/javascript">
-      network.on("click", function (params) {
-        if (params.nodes.length > 0 || params.edges.length > 0) {
-          var content = "";
-          var title = "";
-          
-          if (params.nodes.length > 0) {
-            var nodeData = nodes.get(params.nodes[0]);
-            title = "Entity: " + nodeData.label;
-            content = nodeData.title;
-          } else if (params.edges.length > 0) {
-            var edgeData = edges.get(params.edges[0]);
-            var connection = nodes.get(edgeData.from).label + " & " + nodes.get(edgeData.to).label;
-            title = "Relationship: " + connection;
-            content = edgeData.title; 
-          }
-          
-          document.getElementById('modalTitle').innerText = title;
-          document.getElementById('modalContent').innerText = content;
-          document.getElementById('customModal').style.display = "block";
-        }
-      });
-
-      document.getElementById('closeModal').onclick = function() {
-        document.getElementById('customModal').style.display = "none";
-      }
-      
-      window.onclick = function(event) {
-        if (event.target == document.getElementById('customModal')) {
-          document.getElementById('customModal').style.display = "none";
-        }
-      }
-    </script>
+    Args:
+        graph: A build_graph() payload.
+
+    Returns:
+        A new payload; sentences are shared with the input.
     """
-    # Inject before </body>
-    html_string = html_string.replace('</body>', modal_html + '</body>')
-
-    # Give unique ID to each graphs
-    unique_id = f"graph_{uuid.uuid4().hex[:8]}"
-    html_string = re.sub(r'\bmynetwork\b', unique_id, html_string)
-
-    # Remove white space at the top of the graph
-    html_string = re.sub(r'<center>\s*<h1></h1>\s*</center>', '', html_string)
-    # Replace the height in the CSS style block
-    html_string = html_string.replace(
-        'height: 500px;',
-        'height: 100%;'
-    )
-    html_string = html_string.replace(
-        '<body>',
-        '<body style="margin: 0; padding: 0; height: 100%;">'
-    )
-    html_string = html_string.replace(
-        '<html>',
-        '<html style="height: 100%;">'
-    )
-    html_string = html_string.replace(
-        '<div class="card" style="width: 100%">',
-        '<div class="card" style="width: 100%; height: 100%;">'
-    )
+    # Ordinary articles keep every relationship
+    if len(graph["edges"]) <= max_edges and len(graph["nodes"]) <= collapse_min_nodes:
+        return graph
+
+    # Strongest first; names break ties so the result doesn't depend on sentence order
+    ranked_edges = sorted(graph["edges"], key=lambda edge: (-edge["weight"], edge["from"], edge["to"]))
+
+    degree = {node["id"]: 0 for node in graph["nodes"]}
+    edges = []
+    for edge in ranked_edges:
+        if len(edges) >= max_edges:
+            break
+        if degree[edge["from"]] >= max_edges_per_node or degree[edge["to"]] >= max_edges_per_node:
+            continue
+        edges.append(edge)
+        degree[edge["from"]] += 1
+        degree[edge["to"]] += 1
+
+    nodes = graph["nodes"]
+    collapsed = []
+    if len(nodes) > collapse_min_nodes:
+        collapsed = [node for node in nodes if degree[node["id"]] < collapse_below_degree]
+
+    # Merging a single node would only rename it
+    if len(collapsed) > 1:
+        collapsed_ids = {node["id"] for node in collapsed}
+        nodes = [node for node in nodes if node["id"] not in collapsed_ids]
+        nodes.append({
+            "id": COLLAPSED_NODE_ID,
+            "label": f"+{len(collapsed)} more",
+            "members": [node["id"] for node in collapsed],
+            "evidence": sorted({index for node in collapsed for index in node["evidence"]}),
+        })
+
+        # Point edges of collapsed nodes at the merged node; one edge per remaining neighbour
+        merged = {}
+        for edge in edges:
+            u = COLLAPSED_NODE_ID if edge["from"] in collapsed_ids else edge["from"]
+            v = COLLAPSED_NODE_ID if edge["to"] in collapsed_ids else edge["to"]
+            if u == v:
+                continue
+            key = tuple(sorted((u, v)))
+            if key in merged:
+                evidence = sorted(set(merged[key]["evidence"]) | set(edge["evidence"]))
+                merged[key] = {**merged[key], "weight": len(evidence), "evidence": evidence}
+            else:
+                merged[key] = {**edge, "from": key[0], "to": key[1]}
+        edges = list(merged.values())
+
+    return {**graph, "nodes": nodes, "edges": edges}
+
+def add_layout(graph, iterations=GRAPH_STABILIZATION_ITERATIONS):
+    """
+    Add precomputed x/y positions to the nodes of a payload.
+
+    The browser starts from these positions and only runs `iterations`
+    physics steps instead of settling the layout from random positions.
+    """
+    layout = nx.Graph()
+    layout.add_nodes_from(node["id"] for node in graph["nodes"])
+    layout.add_edges_from((edge["from"], edge["to"]) for edge in graph["edges"])
+
+    # Fixed seed: the same article always gets the same picture
+    positions = nx.spring_layout(layout, seed=7, scale=GRAPH_SPRING_LENGTH * math.sqrt(max(len(graph["nodes"]), 1)))
+
+    nodes = []
+    for node in graph["nodes"]:
+        x, y = positions[node["id"]]
+        nodes.append({**node, "x": round(float(x)), "y": round(float(y))})
+    return {**graph, "nodes": nodes, "stabilization_iterations": iterations}
+
+def pack_graph(graph):
+    """Compressed JSON of a build_graph() payload, for storage."""
+    return zlib.compress(json.dumps(graph, separators=(",", ":")).encode("utf-8"))
+
+def unpack_graph(data):
+    """Inverse of pack_graph()."""
+    return json.loads(zlib.decompress(data).decode("utf-8"))
 
-    return html_string
+def render_graph_html(graph):
+    """
+    Interactive HTML document of a build_graph() payload, for the result view's iframe.
+    """
+    # Filled into the precompiled vis.js page; nodes, edges and hover texts are built in the browser
+    return render_graph_document(graph)
+
+def mapping(article, entities):
+    """Relationship map of an article as a complete HTML document."""
+    return render_graph_html(build_graph(article, entities))
 
 # Simple demo to run the module directly
 if __name__ == "__main__":
@@ -0,0 +1,201 @@
+"""
+Result Cache Module: Skip re-running the NLP pipeline on articles seen before
+
+Popular wire stories are analyzed many times a day, by the same user
+re-opening an RSS item or by different users. The full pipeline output is
+cached under a hash of the cleaned article text plus the pipeline version,
+so a change of model or threshold never serves stale results.
+
+Tiers:
+    1. Memory: a bounded LRU of recent results in this process.
+    2. Database: the analysis_cache table in the existing Postgres database,
+       shared by every app process. Rows are purged by age in a background
+       thread: rows of the running pipeline version after
+       ANALYSIS_CACHE_TTL_DAYS, rows of any other version (which may still be
+       in use during a rolling deploy or by a batch run) after
+       ANALYSIS_CACHE_OTHER_VERSION_DAYS.
+
+Every reader gets its own deep copy of a cached result, so one session
+changing its result cannot change what other sessions are served.
+"""
+
+import os
+import sys
+import copy
+import json
+import time
+import hashlib
+import threading
+from collections import OrderedDict
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import and_, or_
+from sqlalchemy.dialects.postgresql import insert
+
+from features.database import session_scope, AnalysisCache
+from features.inference import pipeline_version
+
+sys.dont_write_bytecode = True
+
+# Bump when pipeline logic changes in a way that alters results
+PIPELINE_REVISION = 4
+
+
+# Number of results kept in the in-process tier
+MEMORY_CACHE_SIZE = 256
+
+# Database rows older than this many days are deleted (0 keeps them)
+ANALYSIS_CACHE_TTL_DAYS = float(os.getenv("ANALYSIS_CACHE_TTL_DAYS", "30"))
+# Shorter limit for rows of other pipeline versions; processes still running them keep working meanwhile
+ANALYSIS_CACHE_OTHER_VERSION_DAYS = float(os.getenv("ANALYSIS_CACHE_OTHER_VERSION_DAYS", "7"))
+# Seconds between two purges of the database tier by one process
+ANALYSIS_CACHE_PURGE_INTERVAL = float(os.getenv("ANALYSIS_CACHE_PURGE_INTERVAL", "3600"))
+
+_memory_cache = OrderedDict()
+_memory_lock = threading.Lock()
+
+_pipeline_version = None
+_last_purge = None
+
+
+def current_pipeline_version():
+    """
+    Revision plus the models and threshold that produce the results.
+
+    Resolved on first use, since in served mode the inference server
+    reports which models it has loaded.
+    """
+    global _pipeline_version
+    if _pipeline_version is None:
+        _pipeline_version = f"r{PIPELINE_REVISION}|{pipeline_version()}"
+    return _pipeline_version
+
+
+def analysis_cache_key(clean_text):
+    """Content hash of the cleaned article text and the pipeline version."""
+    payload = f"{current_pipeline_version()}\x00{clean_text}".encode("utf-8")
+    return hashlib.sha256(payload).hexdigest()
+
+
+def _remember(key, result):
+    """Insert a private copy of a result into the LRU tier and evict the oldest entry if full."""
+    result = copy.deepcopy(result)
+    with _memory_lock:
+        _memory_cache[key] = result
+        _memory_cache.move_to_end(key)
+        while len(_memory_cache) > MEMORY_CACHE_SIZE:
+            _memory_cache.popitem(last=False)
+
+
+def peek_cached_analysis(key):
+    """Return a copy of a result from the memory tier only (no database round-trip), or None."""
+    with _memory_lock:
+        result = _memory_cache.get(key)
+        if result is None:
+            return None
+        _memory_cache.move_to_end(key)
+    return copy.deepcopy(result)
+
+
+def get_cached_analysis(key):
+    """
+    Return a cached pipeline result from memory, then the database, or None.
+
+    Returns:
+        A dict with keys: 'original-text', 'summary', 'graph', 'all_entities', 'rankings'.
+        The caller owns the dict and may change it.
+    """
+    result = peek_cached_analysis(key)
+    if result is not None:
+        return result
+
+    try:
+        with session_scope() as db:
+            row = db.query(AnalysisCache).filter(
+                AnalysisCache.content_hash == key,
+                AnalysisCache.pipeline_version == current_pipeline_version()
+            ).first()
+            if row is None:
+                return None
+            result = json.loads(row.result_json)
+    except Exception as e:
+        print(f"Analysis cache read failed: {e}")
+        return None
+
+    _remember(key, result)
+    return result
+
+
+def store_analysis(key, result):
+    """
+    Save a pipeline result in both tiers.
+
+    Args:
+        key: Value from analysis_cache_key().
+        result: The analysis dict without the article title.
+    """
+    _remember(key, result)
+
+    try:
+        with session_scope() as db:
+            # Single round-trip; another process may have stored the same article already
+            statement = insert(AnalysisCache).values(
+                content_hash=key,
+                pipeline_version=current_pipeline_version(),
+                result_json=json.dumps(result)
+            ).on_conflict_do_nothing(index_elements=[AnalysisCache.content_hash])
+            db.execute(statement)
+    except Exception as e:
+        print(f"Analysis cache write failed: {e}")
+
+    _purge_if_due()
+
+
+def purge_analysis_cache():
+    """
+    Delete database rows past their age limit.
+
+    Rows of the running pipeline version expire after ANALYSIS_CACHE_TTL_DAYS,
+    rows of other versions after ANALYSIS_CACHE_OTHER_VERSION_DAYS. Other
+    versions are never deleted on sight: during a rolling deploy or a batch run
+    with other models, processes on different versions share the table.
+
+    Returns:
+        The number of rows deleted.
+    """
+    now = datetime.now(timezone.utc)
+    conditions = []
+    if ANALYSIS_CACHE_TTL_DAYS > 0:
+        conditions.append(AnalysisCache.created_at < now - timedelta(days=ANALYSIS_CACHE_TTL_DAYS))
+    if ANALYSIS_CACHE_OTHER_VERSION_DAYS > 0:
+        conditions.append(and_(
+            AnalysisCache.pipeline_version != current_pipeline_version(),
+            AnalysisCache.created_at < now - timedelta(days=ANALYSIS_CACHE_OTHER_VERSION_DAYS)
+        ))
+    if not conditions:
+        return 0
+
+    with session_scope() as db:
+        return db.query(AnalysisCache).filter(or_(*conditions)).delete(synchronize_session=False)
+
+
+def _purge():
+    try:
+        deleted = purge_analysis_cache()
+        if deleted:
+            print(f"Analysis cache: purged {deleted} stale results")
+    except Exception as e:
+        print(f"Analysis cache purge failed: {e}")
+
+
+def _purge_if_due():
+    """Start _purge() in the background at most once per ANALYSIS_CACHE_PURGE_INTERVAL in this process."""
+    global _last_purge
+    now = time.monotonic()
+    with _memory_lock:
+        if _last_purge is not None and now - _last_purge < ANALYSIS_CACHE_PURGE_INTERVAL:
+            return
+        _last_purge = now
+
+    # The analysis worker that stored the result doesn't wait for the DELETE
+    threading.Thread(target=_purge, name="analysis-cache-purge", daemon=True).start()
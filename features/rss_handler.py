@@ -1,6 +1,5 @@
 # features/rss_handler.py
-import feedparser
-from datetime import datetime
+from features.feed_ingestion import fetch_feed
 
 import sys
 sys.dont_write_bytecode = True
@@ -8,6 +7,9 @@ sys.dont_write_bytecode = True
 def fetch_rss_articles(rss_url):
     """
     Fetch articles from an RSS feed.
+
+    Uses the shared feed fetcher, so the download has a time limit and an
+    unchanged feed is served from the conditional-GET cache.
     
     Args:
         rss_url: The RSS feed URL
@@ -17,37 +19,15 @@ def fetch_rss_articles(rss_url):
     """
     
     print(f"Fetching RSS feed from: {rss_url}")
-    
-    try:
-        # Parse the RSS feed
-        feed = feedparser.parse(rss_url)
-        
-        # Check if feed loaded successfully
-        if feed.bozo:  # bozo = feed has errors
-            print("Warning: Feed may have issues")
-        
-        articles = []
-        
-        # Get articles
-        for entry in feed.entries:
-            
-            # Extract article info
-            article = {
-                'title': entry.get('title', 'No Title'),
-                'description': entry.get('description', ''),
-                'link': entry.get('link', ''),
-                'published': entry.get('published', 'Unknown date'),
-                'source': rss_url
-            }
-            
-            articles.append(article)
-        
+
+    result = fetch_feed(rss_url)
+    articles = result["articles"]
+
+    if result["status"] == "not_modified":
+        print(f"Feed unchanged, reused {len(articles)} cached articles")
+    elif result["status"] == "ok":
         print(f"Fetched {len(articles)} articles")
-        return articles
-        
-    except Exception as e:
-        print(f"Error fetching RSS feed: {e}")
-        return []
+    return articles
 
 
 # Test function
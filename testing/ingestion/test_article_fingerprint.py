@@ -0,0 +1,74 @@
+"""
+Article Fingerprint Test: link normalization and wire-copy detection
+
+Syndicated copies (new dateline, appended credits, a changed word) must be
+found in the FingerprintIndex; a different story on the same topic must not.
+Fingerprints older than the expiry time are forgotten, newer ones are kept.
+Run directly: python testing/ingestion/test_article_fingerprint.py
+"""
+
+import sys
+from pathlib import Path
+
+sys.dont_write_bytecode = True
+
+base_path = Path(__file__).parent
+sys.path.append(str(base_path.parent.parent))
+
+from features.article_fingerprint import normalize_link, content_fingerprint, FingerprintIndex
+
+WIRE_STORY = (
+    "MANILA (Reuters) - The Philippine central bank kept its key interest rate unchanged on Thursday, "
+    "citing easing inflation and steady growth in the economy, while signalling it could cut rates later "
+    "this year if price pressures continue to cool across the region and global conditions allow it to do so."
+)
+
+SYNDICATED_COPIES = [
+    WIRE_STORY.replace("MANILA (Reuters) - ", "MANILA, Oct 17 (Reuters) - "),
+    WIRE_STORY + " Reporting by Karen Lema; Editing by John Doe.",
+    WIRE_STORY.replace("Thursday", "Friday"),
+]
+
+DIFFERENT_STORY = (
+    "The Philippine central bank raised its key interest rate on Thursday, citing rising inflation and weak "
+    "growth in the economy, while signalling it could raise rates again later this year if price pressures "
+    "continue to build across the region."
+)
+
+
+def test_normalize_link():
+    assert normalize_link("HTTP://www.Example.com/news/story/?utm_source=rss&id=3&fbclid=x#top") == \
+        "https://example.com/news/story?id=3"
+    assert normalize_link("https://example.com/news/story?id=3") == normalize_link("http://example.com/news/story/?id=3")
+    assert normalize_link("https://example.com/a?b=2&a=1") == normalize_link("https://example.com/a?a=1&b=2")
+    assert normalize_link("https://example.com/a") != normalize_link("https://example.com/b")
+    assert normalize_link("") == ""
+
+
+def test_wire_copies_are_found():
+    index = FingerprintIndex()
+    index.add(content_fingerprint(WIRE_STORY), 1)
+
+    for copy in SYNDICATED_COPIES:
+        assert index.find(content_fingerprint(copy)) == 1, copy
+    assert index.find(content_fingerprint(DIFFERENT_STORY)) is None
+    assert content_fingerprint("") == ""
+
+
+def test_old_fingerprints_expire():
+    index = FingerprintIndex()
+    index.add(content_fingerprint(WIRE_STORY), 1, added_at=100.0)
+    index.add(content_fingerprint(DIFFERENT_STORY), 2, added_at=200.0)
+
+    assert index.expire(150.0) == 1
+    assert len(index) == 1
+    assert index.find(content_fingerprint(SYNDICATED_COPIES[0])) is None
+    assert index.find(content_fingerprint(DIFFERENT_STORY)) == 2
+    assert index.expire(150.0) == 0
+
+
+if __name__ == "__main__":
+    test_normalize_link()
+    test_wire_copies_are_found()
+    test_old_fingerprints_expire()
+    print("Article fingerprint: links normalized, wire copies matched, different story kept")
@@ -0,0 +1,166 @@
+"""
+Feed Ingestion Test: concurrency, time limits and conditional GET
+
+A local HTTP stub server plays these feeds:
+    /fast     - answers immediately and supports ETag / If-None-Match (304)
+    /slow     - waits longer than the test's total time limit
+    /drip     - sends one body byte at a time, well inside the read timeout
+    /slowhead - sends the status line, then one header byte at a time
+    /down     - returns HTTP 500
+
+Checks that the feeds are fetched concurrently, the slow and dripping
+feeds time out without delaying the others, the fast feed is served from cache after a
+304, and a broken feed is reported instead of raising. A 304 that arrives after
+the cache entry is gone is answered by refetching the full feed.
+Run directly: python testing/ingestion/test_feed_ingestion.py
+"""
+
+import sys
+import time
+import threading
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from pathlib import Path
+
+sys.dont_write_bytecode = True
+
+base_path = Path(__file__).parent
+sys.path.append(str(base_path.parent.parent))
+
+from features.feed_ingestion import FeedCache, FeedFetcher
+
+ETAG = '"feed-v1"'
+SLOW_SECONDS = 3
+TOTAL_TIMEOUT = 1
+
+FEED_XML = b"""<?xml version="1.0"?>
+<rss version="2.0"><channel><title>Stub</title>
+<item><title>First story</title><link>http://stub/1</link><description>One.</description></item>
+<item><title>Second story</title><link>http://stub/2</link><description>Two.</description></item>
+</channel></rss>"""
+
+
+class StubFeedHandler(BaseHTTPRequestHandler):
+    requests_seen = []
+
+    def do_GET(self):
+        self.requests_seen.append((self.path, self.headers.get("If-None-Match")))
+
+        if self.path == "/fast":
+            if self.headers.get("If-None-Match") == ETAG:
+                self.send_response(304)
+                self.end_headers()
+                return
+            self.send_response(200)
+            self.send_header("Content-Type", "application/rss+xml")
+            self.send_header("ETag", ETAG)
+            self.end_headers()
+            self.wfile.write(FEED_XML)
+        elif self.path == "/slow":
+            # Trickle the body so each read is fast but the whole download is not
+            self.send_response(200)
+            self.send_header("Content-Type", "application/rss+xml")
+            self.end_headers()
+            for _ in range(SLOW_SECONDS * 4):
+                try:
+                    self.wfile.write(b" " * 70000)
+                    self.wfile.flush()
+                except OSError:
+                    return
+                time.sleep(0.25)
+        elif self.path == "/drip":
+            # Never fills a read chunk, but every byte arrives before the read timeout
+            self.send_response(200)
+            self.send_header("Content-Type", "application/rss+xml")
+            self.send_header("Content-Length", "100000")
+            self.end_headers()
+            for _ in range(SLOW_SECONDS * 10):
+                try:
+                    self.wfile.write(b" ")
+                    self.wfile.flush()
+                except OSError:
+                    return
+                time.sleep(0.1)
+        elif self.path == "/slowhead":
+            # The response never gets past its headers, so no body chunk is ever read
+            self.wfile.write(b"HTTP/1.1 200 OK\r\nX-Padding: ")
+            for _ in range(SLOW_SECONDS * 10):
+                try:
+                    self.wfile.write(b"x")
+                    self.wfile.flush()
+                except OSError:
+                    return
+                time.sleep(0.1)
+        else:
+            self.send_response(500)
+            self.end_headers()
+
+    def log_message(self, format, *args):
+        pass
+
+
+class EvictedCache(FeedCache):
+    """Still sends the stored ETag, but the entry is gone when the 304 arrives."""
+
+    def conditional_headers(self, url):
+        return {"If-None-Match": ETAG}
+
+    def get(self, url):
+        return None
+
+
+def start_stub_server():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StubFeedHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}"
+
+
+def test_feed_ingestion():
+    server, base_url = start_stub_server()
+    try:
+        fetcher = FeedFetcher(max_workers=4, read_timeout=2, total_timeout=TOTAL_TIMEOUT)
+        fast, slow, drip, down = f"{base_url}/fast", f"{base_url}/slow", f"{base_url}/drip", f"{base_url}/down"
+        slowhead = f"{base_url}/slowhead"
+
+        start = time.perf_counter()
+        results = fetcher.fetch_many([slow, drip, slowhead, fast, down])
+        elapsed = time.perf_counter() - start
+
+        assert results[fast]["status"] == "ok", results[fast]
+        assert [a["title"] for a in results[fast]["articles"]] == ["First story", "Second story"]
+        assert results[fast]["articles"][0]["source"] == fast
+        assert results[slow]["status"] == "timeout", results[slow]
+        assert results[drip]["status"] == "timeout", results[drip]
+        assert results[drip]["elapsed"] < TOTAL_TIMEOUT + 1, results[drip]
+        # Headers trickled within the read timeout are cut off at the total limit too
+        assert results[slowhead]["status"] == "timeout", results[slowhead]
+        assert results[slowhead]["elapsed"] < TOTAL_TIMEOUT + 1, results[slowhead]
+        assert results[down]["status"] == "error", results[down]
+        # The slow feed is cut off at its own limit and does not serialize the others
+        assert elapsed < SLOW_SECONDS, elapsed
+        assert results[fast]["elapsed"] < TOTAL_TIMEOUT, results[fast]
+
+        # Second fetch sends the stored ETag and reuses the cached articles on 304
+        again = fetcher.fetch(fast)
+        assert again["status"] == "not_modified", again
+        assert again["articles"] == results[fast]["articles"]
+        assert (("/fast", ETAG) in StubFeedHandler.requests_seen)
+    finally:
+        server.shutdown()
+
+
+def test_not_modified_without_cache_entry():
+    server, base_url = start_stub_server()
+    try:
+        fetcher = FeedFetcher(max_workers=1, read_timeout=2, total_timeout=TOTAL_TIMEOUT, cache=EvictedCache())
+        result = fetcher.fetch(f"{base_url}/fast")
+        assert result["status"] == "ok", result
+        assert [a["title"] for a in result["articles"]] == ["First story", "Second story"]
+    finally:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    test_feed_ingestion()
+    test_not_modified_without_cache_entry()
+    print("Feed ingestion: concurrent fetch, timeouts, error and 304 cache behave as expected")
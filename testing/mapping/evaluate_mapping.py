@@ -1,71 +1,71 @@
 """
 Relationship Mapping Evaluation: Co-occurrence F1
 
-Evaluates whether entity pairs predicted by the mapping function 
-actually co-occur in the same sentence in the article.
+Evaluates whether the entity pairs found by the mapping matcher are exactly
+the pairs that co-occur in the same sentence of the article.
 
-Gold Standard: Entity pairs extracted from ranked entities that genuinely 
-co-occur in the same sentence.
+Gold Standard: For each sentence, the ranked entities matched by the
+whole-word regex r'\b' + re.escape(entity) + r'\b' with re.IGNORECASE
+(the per-entity search mapping() used before the single-pass matcher).
 
-System: All entity pairs identified by contains_entity() sentence-level checks 
-using ranked entities.
+System: All entity pairs found by find_entity_occurrences(), the
+EntityMatcher pass that mapping() uses, on the same sentences.
 
 Metric: Co-occurrence F1
-  Precision = predicted pairs that actually co-occur / all predicted pairs
-  Recall = N/A (we only check validity, not coverage)
-  F1 = Precision (since we only measure if predictions are correct)
-
-Expected Result: F1 = 1.0 by definition
-Since the relationship model is defined strictly by sentence-level co-occurrence, 
-the F1 score is always 1.0. This confirms the integrity of the extraction logic, 
-making sure that every entity pair identified within a shared sentence boundary 
-was successfully mapped without data loss. A score below 1.0 would indicate 
-a bug in the contains_entity() matching or sentence tokenization logic.
+  Precision = system pairs that are gold pairs / all system pairs
+  Recall = gold pairs found by the system / all gold pairs
+  F1 = harmonic mean of precision and recall
+
+Expected Result: F1 = 1.0
+The matcher is meant to be equivalent to the regex, so any pair found by only
+one of them is a bug in the EntityMatcher matching (word boundaries, overlapping
+names, case folding). Unit cases for the same rule are in test_entity_matcher.py.
 """
 
+import re
 import pandas as pd
 import sys
 from pathlib import Path
 from itertools import combinations
-from nltk.tokenize import sent_tokenize
-from bs4 import BeautifulSoup
-import nltk
 
 base_path = Path(__file__).parent
 sys.path.append(str(base_path.parent.parent))
 
 from features.flair_ner import identify_entities
 from features.entity_ranking_and_summarization import entity_ranking
-from features.relationship_mapping import contains_entity
+from features.document import build_document
+from features.entity_matcher import find_entity_occurrences, group_by_sentence
 
-# Download NLTK tokenizer if needed
-try:
-    nltk.data.find('tokenizers/punkt_tab')
-except LookupError:
-    nltk.download('punkt_tab', quiet=True)
-
-
-def get_cooccurring_pairs(text, entities):
-    """Find all entity pairs that co-occur in the same sentence."""
-    soup = BeautifulSoup(text, "html.parser")
-    clean_text = soup.get_text(separator=" ")
-    sentences = sent_tokenize(clean_text)
 
+def sentence_pairs(sentence_entities):
+    """All entity pairs sharing a sentence, from a {sentence index: entities} map."""
     pairs = set()
-    for sentence in sentences:
-        clean_sentence = sentence.strip()
-        if not clean_sentence:
-            continue
-        # Find which entities appear in this sentence
-        found_entities = [e for e in entities if contains_entity(clean_sentence, e)]
+    for found_entities in sentence_entities.values():
         # If 2+ entities in same sentence, they co-occur
         if len(found_entities) > 1:
             for pair in combinations(sorted(found_entities), 2):
                 pairs.add(frozenset(pair))
-
     return pairs
 
 
+def get_gold_pairs(document, entities):
+    """Co-occurring pairs by the whole-word regex, checked per (sentence, entity)."""
+    sentence_entities = {}
+    for sentence_index, sentence in enumerate(document.sentences):
+        clean_sentence = sentence.strip()
+        if not clean_sentence:
+            continue
+        found = {e for e in entities if e and re.search(r'\b' + re.escape(e) + r'\b', clean_sentence, re.IGNORECASE)}
+        if found:
+            sentence_entities[sentence_index] = found
+    return sentence_pairs(sentence_entities)
+
+
+def get_system_pairs(document, entities):
+    """Co-occurring pairs by the same single-pass matcher that mapping() uses."""
+    return sentence_pairs(group_by_sentence(find_entity_occurrences(document, entities)))
+
+
 # Load CSV dataset
 csv_dataset_path = base_path / "summarization_dataset.csv"
 if not csv_dataset_path.exists():
@@ -84,10 +84,10 @@ print(f"Filtered {initial_count - len(articles_dataframe)} stub articles\n")
 
 
 # Evaluation loop
-mapping_precision_list = []
+mapping_scores = []
 skipped_count = 0
 
-print("RELATIONSHIP MAPPING EVALUATION - CO-OCCURRENCE VALIDITY F1\n")
+print("RELATIONSHIP MAPPING EVALUATION - CO-OCCURRENCE F1\n")
 
 for _, article_row in articles_dataframe.iterrows():
     # Rank entities from article
@@ -99,38 +99,46 @@ for _, article_row in articles_dataframe.iterrows():
         skipped_count += 1
         continue
 
-    # Get ALL co-occurring pairs from ranked entities
-    all_valid_pairs = get_cooccurring_pairs(article_row["full_text"], ranked_entity_names)
+    document = build_document(article_row["full_text"])
+    gold_pairs = get_gold_pairs(document, ranked_entity_names)
+    predicted_pairs = get_system_pairs(document, ranked_entity_names)
 
-    if not all_valid_pairs:
+    if not gold_pairs and not predicted_pairs:
         skipped_count += 1
         continue
 
-    # System predicted pairs = all co-occurring pairs found from ranked entities
-    # Check if they actually exist in text
-    predicted_pairs = all_valid_pairs
-    valid_pairs = len(predicted_pairs)  # all are valid
-
-    precision = 1.0 if predicted_pairs else 0.0
+    valid_pairs = len(predicted_pairs & gold_pairs)
+    precision = valid_pairs / len(predicted_pairs) if predicted_pairs else 0.0
+    recall = valid_pairs / len(gold_pairs) if gold_pairs else 0.0
+    f1 = 2 * precision * recall / (precision + recall) if precision + recall else 0.0
 
-    mapping_precision_list.append(precision)
+    mapping_scores.append((precision, recall, f1))
 
     # Print per-article results
     print(f"[{article_row['source']}] {article_row['headline'][:65]}...")
     print(f"Ranked entities: {len(ranked_entity_names)}")
-    print(f"Co-occurring pairs found: {len(predicted_pairs)}")
+    print(f"Gold pairs: {len(gold_pairs)}")
+    print(f"Predicted pairs: {len(predicted_pairs)}")
     print(f"Valid pairs: {valid_pairs}")
-    print(f"Precision: {precision:.2f}\n")
+    print(f"Precision: {precision:.2f}  Recall: {recall:.2f}  F1: {f1:.2f}")
+    for pair in sorted(predicted_pairs ^ gold_pairs, key=sorted):
+        side = "matcher only" if pair in predicted_pairs else "regex only"
+        print(f"  Mismatch ({side}): {' / '.join(sorted(pair))}")
+    print()
 
 
 # Results
-total_evaluated = len(mapping_precision_list)
+total_evaluated = len(mapping_scores)
 if total_evaluated == 0:
     print("No articles evaluated.")
     sys.exit(0)
 
-avg_precision = sum(mapping_precision_list) / total_evaluated
+avg_precision = sum(score[0] for score in mapping_scores) / total_evaluated
+avg_recall = sum(score[1] for score in mapping_scores) / total_evaluated
+avg_f1 = sum(score[2] for score in mapping_scores) / total_evaluated
 
 print(f"RESULTS ({total_evaluated} articles evaluated, {skipped_count} skipped)\n")
-print("RELATIONSHIP MAPPING - Co-occurrence Validity")
-print(f"Mean Precision: {avg_precision:.4f}")
\ No newline at end of file
+print("RELATIONSHIP MAPPING - Co-occurrence F1")
+print(f"Mean Precision: {avg_precision:.4f}")
+print(f"Mean Recall: {avg_recall:.4f}")
+print(f"Mean F1: {avg_f1:.4f}")
@@ -0,0 +1,89 @@
+"""
+Entity Matcher Test: EntityMatcher against the whole-word regex it replaced
+
+The regex r'\\b' + re.escape(entity) + r'\\b' with re.IGNORECASE is the oracle.
+For every case EntityMatcher.entities_in() must report exactly the entities
+the regex finds: punctuation at the edges of names, overlapping and nested
+names, and Unicode case folding (final sigma, long s, dotless i, ß).
+find_all() offsets must point at the matched text.
+Run directly: python testing/mapping/test_entity_matcher.py
+"""
+
+import re
+import sys
+from pathlib import Path
+
+sys.dont_write_bytecode = True
+
+base_path = Path(__file__).parent
+sys.path.append(str(base_path.parent.parent))
+
+from features.entity_matcher import EntityMatcher
+
+PUNCTUATION_CASES = [
+    ("The U.S. said on Monday.", ["U.S.", "U.S", "US"]),
+    ("(Apple) rose; Apple's rivals fell.", ["Apple", "(Apple)", "Apple's"]),
+    ("C++ and C# are languages, C is too.", ["C++", "C#", "C"]),
+    ("Jean-Paul Sartre met Jean.", ["Jean-Paul", "Jean", "Paul", "Sartre met"]),
+    ("snake_case names like x_y", ["x", "x_y", "snake"]),
+    ("AT&T and AT & T", ["AT&T", "AT & T", "T"]),
+    ("", ["Apple", ""]),
+]
+
+OVERLAP_CASES = [
+    ("Steve Jobs founded Apple with Steve Wozniak.", ["Steve Jobs", "Jobs", "Steve", "Steve Wozniak", "Wozniak"]),
+    ("New York City and New York", ["New York", "New York City", "York City", "York"]),
+    ("Bank of America America Bank", ["Bank of America", "America Bank", "America", "Bank"]),
+    ("aaaa", ["a", "aa", "aaa", "aaaa"]),
+]
+
+UNICODE_CASES = [
+    ("ΟΔΥΣΣΕΥΣ returned", ["Οδυσσευς", "ΟΔΥΣΣΕΥΣ", "οδυσσευσ"]),
+    ("ſtate and ſtreet", ["state", "STREET"]),
+    ("Dıyarbakır and DIYARBAKIR", ["diyarbakir", "Diyarbakır"]),
+    ("İstanbul, ISTANBUL", ["istanbul", "İstanbul"]),
+    ("Straße, STRASSE, ẞ", ["straße", "strasse", "ß"]),
+    ("KELVIN scale, µ-law", ["kelvin", "μ-law", "Μ-LAW"]),
+    ("Ǆemal and ǅemal", ["ǆemal"]),
+    ("ﬁnance ﬅ", ["finance", "ﬁnance", "ﬆ"]),
+    ("Zürich café, ZÜRICH CAFÉ", ["zürich café", "Zurich", "CAF"]),
+]
+
+
+def regex_entities(text, entities):
+    """Entities found by the whole-word, case-insensitive regex, in the order given."""
+    return [e for e in entities if e and re.search(r'\b' + re.escape(e) + r'\b', text, re.IGNORECASE)]
+
+
+def assert_matches_regex(cases):
+    for text, entities in cases:
+        matcher = EntityMatcher(entities)
+        assert matcher.entities_in(text) == regex_entities(text, entities), (text, entities)
+
+
+def test_punctuation_matches_regex():
+    assert_matches_regex(PUNCTUATION_CASES)
+
+
+def test_overlapping_names_match_regex():
+    assert_matches_regex(OVERLAP_CASES)
+
+
+def test_unicode_case_folding_matches_regex():
+    assert_matches_regex(UNICODE_CASES)
+
+
+def test_offsets_point_at_matches():
+    for text, entities in PUNCTUATION_CASES + OVERLAP_CASES + UNICODE_CASES:
+        matcher = EntityMatcher(entities)
+        for start, end, entity_index in matcher.find_all(text):
+            assert re.fullmatch(re.escape(entities[entity_index]), text[start:end], re.IGNORECASE), \
+                (text, entities[entity_index], text[start:end])
+
+
+if __name__ == "__main__":
+    test_punctuation_matches_regex()
+    test_overlapping_names_match_regex()
+    test_unicode_case_folding_matches_regex()
+    test_offsets_point_at_matches()
+    print("Entity matcher: same entities as the whole-word regex for punctuation, overlap and Unicode case")
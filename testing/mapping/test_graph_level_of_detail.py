@@ -0,0 +1,87 @@
+"""
+Graph Level-of-Detail Test: pruning, collapsing and precomputed layout
+
+A near-complete co-occurrence graph must come out with at most
+GRAPH_MAX_EDGES edges, at most GRAPH_MAX_EDGES_PER_NODE edges per entity
+(the merged node excepted), its weakly connected entities merged into one
+node, and a position for every node. Small and mid-size graphs (such as
+8 fully connected entities) must pass through unchanged.
+Run directly: python testing/mapping/test_graph_level_of_detail.py
+"""
+
+import sys
+from pathlib import Path
+from itertools import combinations
+
+sys.dont_write_bytecode = True
+
+base_path = Path(__file__).parent
+sys.path.append(str(base_path.parent.parent))
+
+from features.relationship_mapping import (
+    simplify_graph, add_layout, COLLAPSED_NODE_ID,
+    GRAPH_MAX_EDGES, GRAPH_MAX_EDGES_PER_NODE
+)
+
+
+def payload(names, pairs):
+    """build_graph()-style payload where every pair shares one sentence per unit of weight."""
+    sentences, edges = [], []
+    evidence = {name: [] for name in names}
+    for (u, v), weight in pairs.items():
+        indices = list(range(len(sentences), len(sentences) + weight))
+        sentences.extend(f"{u} and {v} ({i})." for i in indices)
+        evidence[u].extend(indices)
+        evidence[v].extend(indices)
+        edges.append({"from": u, "to": v, "weight": weight, "evidence": indices})
+    nodes = [{"id": name, "evidence": evidence[name]} for name in names]
+    return {"version": 2, "sentences": sentences, "nodes": nodes, "edges": edges}
+
+
+def test_dense_graph_is_pruned_and_collapsed():
+    names = [f"Entity {i:02d}" for i in range(35)]
+    # Complete graph; pairs of low-numbered entities are the strongest
+    pairs = {(u, v): 1 + (3 if int(u[-2:]) < 10 and int(v[-2:]) < 10 else 0) for u, v in combinations(names, 2)}
+    graph = add_layout(simplify_graph(payload(names, pairs)))
+
+    assert len(graph["edges"]) <= GRAPH_MAX_EDGES
+    degree = {}
+    for edge in graph["edges"]:
+        for name in (edge["from"], edge["to"]):
+            degree[name] = degree.get(name, 0) + 1
+    assert all(count <= GRAPH_MAX_EDGES_PER_NODE for name, count in degree.items() if name != COLLAPSED_NODE_ID)
+
+    # The strongest pairs survive
+    kept = {(edge["from"], edge["to"]) for edge in graph["edges"]}
+    assert ("Entity 00", "Entity 01") in kept
+
+    merged = [node for node in graph["nodes"] if node["id"] == COLLAPSED_NODE_ID]
+    assert len(merged) == 1 and len(merged[0]["members"]) > 1
+    assert len(graph["nodes"]) + len(merged[0]["members"]) - 1 == len(names)
+
+    assert all("x" in node and "y" in node for node in graph["nodes"])
+    assert graph["stabilization_iterations"] < 1000
+
+
+def test_small_graph_is_unchanged():
+    names = ["Apple", "Microsoft", "Bill Gates"]
+    graph = payload(names, {("Apple", "Microsoft"): 1, ("Bill Gates", "Microsoft"): 2})
+    simplified = simplify_graph(graph)
+    assert simplified["nodes"] == graph["nodes"]
+    assert sorted(map(str, simplified["edges"])) == sorted(map(str, graph["edges"]))
+
+
+def test_mid_size_graph_keeps_every_edge():
+    names = [f"Entity {i}" for i in range(8)]
+    # Complete graph: every entity has 7 edges, more than GRAPH_MAX_EDGES_PER_NODE
+    graph = payload(names, {pair: 1 for pair in combinations(names, 2)})
+    laid_out = add_layout(simplify_graph(graph))
+    assert len(laid_out["edges"]) == 28
+    assert [node["id"] for node in laid_out["nodes"]] == names
+
+
+if __name__ == "__main__":
+    test_dense_graph_is_pruned_and_collapsed()
+    test_small_graph_is_unchanged()
+    test_mid_size_graph_keeps_every_edge()
+    print("Graph level of detail: dense graph pruned, collapsed and laid out; small and mid-size graphs unchanged")
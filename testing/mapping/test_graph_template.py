@@ -0,0 +1,55 @@
+"""
+Graph Template Test: relationship map rendering from the precompiled template
+
+The rendered page must carry the graph payload, a fresh element id per
+render, and no text that could close the <script> element early.
+Run directly: python testing/mapping/test_graph_template.py
+"""
+
+import re
+import sys
+import json
+from pathlib import Path
+
+sys.dont_write_bytecode = True
+
+base_path = Path(__file__).parent
+sys.path.append(str(base_path.parent.parent))
+
+from features.graph_template import render_graph_document, GRAPH_ID, GRAPH_DATA
+
+GRAPH = {
+    "version": 1,
+    "sentences": [
+        "Apple and Microsoft compete in the PC market.",
+        "A headline quoting </script><script>alert(1)</script> in the text.",
+    ],
+    "nodes": [{"id": "Apple", "evidence": [0, 1]}, {"id": "Microsoft", "evidence": [0]}],
+    "edges": [{"from": "Apple", "to": "Microsoft", "weight": 1, "evidence": [0]}],
+}
+
+
+def test_payload_and_id_are_injected():
+    html = render_graph_document(GRAPH)
+    assert GRAPH_ID not in html and GRAPH_DATA not in html
+
+    # The payload round-trips through the page unchanged
+    payload = re.search(r"var graph = (.*);\n", html).group(1)
+    assert json.loads(payload) == GRAPH
+
+    # Style, container and script all use the same id, and each render gets a new one
+    graph_ids = set(re.findall(r"graph_[0-9a-f]{8}", html))
+    assert len(graph_ids) == 1
+    assert graph_ids.isdisjoint(re.findall(r"graph_[0-9a-f]{8}", render_graph_document(GRAPH)))
+
+
+def test_sentences_cannot_close_the_script():
+    html = render_graph_document(GRAPH)
+    assert html.count("</script>") == 2  # vis.js include and the page script
+    assert "alert(1)" in html
+
+
+if __name__ == "__main__":
+    test_payload_and_id_are_injected()
+    test_sentences_cannot_close_the_script()
+    print("Graph template: payload injected, ids unique, script-safe")
@@ -0,0 +1,82 @@
+"""
+Embedding Cache Test: several writers sharing one disk tier
+
+Two EmbeddingCache instances on the same folder stand in for two processes
+(Solara workers, batch analysis workers). They store vectors in turn, and
+a fresh cache opened afterwards must return every vector under its own key.
+A spawn pool like the one of batch_analysis.py then writes concurrently.
+Run directly: python testing/ranking/test_embedding_cache.py
+"""
+
+import sys
+import tempfile
+from multiprocessing import get_context
+from pathlib import Path
+
+import numpy as np
+
+sys.dont_write_bytecode = True
+
+base_path = Path(__file__).parent
+sys.path.append(str(base_path.parent.parent))
+
+from features.embedding_cache import EmbeddingCache
+
+DIMENSION = 4
+VECTORS = {"alpha": 1.0, "beta": 2.0, "gamma": 3.0}
+WORKERS = 2
+WORDS_PER_WORKER = 40
+
+
+def constant_encoder(texts):
+    """Encode each test word as a vector filled with its number."""
+    return np.array([[VECTORS[text]] * DIMENSION for text in texts], dtype=np.float32)
+
+
+def numbered_encoder(texts):
+    """Encode "word-<n>" as a vector filled with n."""
+    return np.array([[float(text.split("-")[1])] * DIMENSION for text in texts], dtype=np.float32)
+
+
+def write_words(cache_dir, worker):
+    """Store this worker's words one at a time, like a batch worker ranking articles."""
+    cache = EmbeddingCache("test-model", DIMENSION, cache_dir=cache_dir)
+    for number in range(worker, WORKERS * WORDS_PER_WORKER, WORKERS):
+        cache.encode([f"word-{number}"], numbered_encoder)
+
+
+def failing_encoder(texts):
+    raise AssertionError(f"Expected cache hits, encoder called for {texts}")
+
+
+def test_two_writers_share_disk_tier():
+    with tempfile.TemporaryDirectory() as cache_dir:
+        first = EmbeddingCache("test-model", DIMENSION, cache_dir=cache_dir)
+        second = EmbeddingCache("test-model", DIMENSION, cache_dir=cache_dir)
+
+        # Interleaved writes: each instance still holds the index it loaded at start
+        first.encode(["alpha"], constant_encoder)
+        second.encode(["beta"], constant_encoder)
+        first.encode(["gamma"], constant_encoder)
+
+        fresh = EmbeddingCache("test-model", DIMENSION, cache_dir=cache_dir)
+        assert fresh.stats()["disk_items"] == 3, fresh.stats()
+        vectors = fresh.encode(["alpha", "beta", "gamma"], failing_encoder)
+        assert vectors.tolist() == [[1.0] * DIMENSION, [2.0] * DIMENSION, [3.0] * DIMENSION], vectors
+
+
+def test_spawn_workers_share_disk_tier():
+    with tempfile.TemporaryDirectory() as cache_dir:
+        with get_context("spawn").Pool(WORKERS) as pool:
+            pool.starmap(write_words, [(cache_dir, worker) for worker in range(WORKERS)])
+
+        words = [f"word-{number}" for number in range(WORKERS * WORDS_PER_WORKER)]
+        fresh = EmbeddingCache("test-model", DIMENSION, cache_dir=cache_dir)
+        assert fresh.stats()["disk_items"] == len(words), fresh.stats()
+        assert np.array_equal(fresh.encode(words, failing_encoder), numbered_encoder(words))
+
+
+if __name__ == "__main__":
+    test_two_writers_share_disk_tier()
+    test_spawn_workers_share_disk_tier()
+    print("Embedding cache: interleaved and concurrent writers keep every vector under its own key")
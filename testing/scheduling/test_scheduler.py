@@ -0,0 +1,138 @@
+"""
+Scheduler Test: fairness, replacement, back-pressure and prefetch preemption
+
+Drives ui/scheduler.py with small blocking tasks instead of the NLP pipeline:
+    - sessions are served in round-robin order and get their queue positions
+    - a new submit from a session cancels its running and queued analyses
+    - a full queue refuses new work without cancelling the refused session's job,
+      while a session may still replace its own queued job
+    - a user job arriving while a prefetch holds the only worker cancels the prefetch
+    - cancel_analysis() stops a session's analysis but not its prefetch jobs
+Run directly: python testing/scheduling/test_scheduler.py
+"""
+
+import sys
+import threading
+from pathlib import Path
+
+sys.dont_write_bytecode = True
+
+base_path = Path(__file__).parent
+sys.path.append(str(base_path.parent.parent / "ui"))
+
+from scheduler import AnalysisScheduler
+
+WAIT = 5
+
+
+def blocking_task(started, release):
+    """Task that signals when it runs, then waits for release or cancellation."""
+    def task(job):
+        started.set()
+        while not release.wait(0.01):
+            if job.cancelled:
+                return
+    return task
+
+
+def recording_task(order, name, done):
+    def task(job):
+        order.append(name)
+        done.set()
+    return task
+
+
+def occupy_worker(scheduler, session_id="busy"):
+    """Submit a job that holds the only worker until the returned event is set."""
+    started, release = threading.Event(), threading.Event()
+    job = scheduler.submit(session_id, blocking_task(started, release))
+    assert started.wait(WAIT)
+    return job, release
+
+
+def test_sessions_are_served_round_robin():
+    scheduler = AnalysisScheduler(max_workers=1, max_queue=10)
+    _, release = occupy_worker(scheduler)
+
+    order, positions = [], {}
+    done = {name: threading.Event() for name in ("a", "b", "c")}
+    for name in ("a", "b"):
+        scheduler.submit(name, recording_task(order, name, done[name]),
+                         on_position=lambda position, name=name: positions.__setitem__(name, position))
+    # Resubmitting moves session a behind b instead of keeping its old place
+    scheduler.submit("a", recording_task(order, "a", done["a"]),
+                     on_position=lambda position: positions.__setitem__("a", position))
+    scheduler.submit("c", recording_task(order, "c", done["c"]))
+    assert positions == {"b": 1, "a": 2}, positions
+
+    release.set()
+    assert all(event.wait(WAIT) for event in done.values())
+    assert order == ["b", "a", "c"], order
+
+
+def test_new_submit_replaces_the_sessions_job():
+    scheduler = AnalysisScheduler(max_workers=1, max_queue=10)
+    first, release = occupy_worker(scheduler, "user")
+
+    done = threading.Event()
+    second = scheduler.submit("user", recording_task([], "second", done))
+    assert first.cancelled
+    assert done.wait(WAIT)
+    assert not second.cancelled
+    release.set()
+
+
+def test_full_queue_refuses_without_cancelling():
+    scheduler = AnalysisScheduler(max_workers=1, max_queue=2)
+    running, release = occupy_worker(scheduler, "user")
+
+    queued_a = scheduler.submit("a", lambda job: None)
+    queued_b = scheduler.submit("b", lambda job: None)
+    assert scheduler.queue_depth() == 2
+
+    # Refused: the user keeps the analysis that is already running
+    assert scheduler.submit("user", lambda job: None) is None
+    assert not running.cancelled
+
+    # Replacing its own queued job does not need a free slot
+    replacement = scheduler.submit("a", lambda job: None)
+    assert replacement is not None
+    assert queued_a.cancelled and not queued_b.cancelled
+    assert scheduler.queue_depth() == 2
+    release.set()
+
+
+def test_user_job_preempts_running_prefetch():
+    scheduler = AnalysisScheduler(max_workers=1, max_queue=10, max_prefetch_workers=1)
+    started, release = threading.Event(), threading.Event()
+    prefetch = scheduler.submit_prefetch("reader", "article-1", blocking_task(started, release))
+    assert started.wait(WAIT)
+    # Already running: the same article is not queued twice
+    assert scheduler.submit_prefetch("reader", "article-1", lambda job: None) is None
+
+    done = threading.Event()
+    scheduler.submit("user", recording_task([], "user", done))
+    assert prefetch.cancelled
+    assert done.wait(WAIT)
+    release.set()
+
+
+def test_cancel_analysis_keeps_prefetch():
+    scheduler = AnalysisScheduler(max_workers=1, max_queue=10, max_prefetch_workers=1)
+    running, release = occupy_worker(scheduler, "user")
+    prefetch = scheduler.submit_prefetch("user", "article-2", lambda job: None)
+
+    # Showing a cached article stops the user's analysis, not the page's prefetching
+    scheduler.cancel_analysis("user")
+    assert running.cancelled
+    assert not prefetch.cancelled
+    release.set()
+
+
+if __name__ == "__main__":
+    test_sessions_are_served_round_robin()
+    test_new_submit_replaces_the_sessions_job()
+    test_full_queue_refuses_without_cancelling()
+    test_user_job_preempts_running_prefetch()
+    test_cancel_analysis_keeps_prefetch()
+    print("Scheduler: round-robin, replacement, back-pressure and prefetch preemption behave as expected")
@@ -0,0 +1,131 @@
+"""
+Entity Store Test: rows of the normalized entity tables and write retries
+
+entity_rows() must count every whole-word mention, keep the first offset in
+the text (not the offset NER reported), fall back to one mention at the NER
+offset for names that no longer match the text, and weight each pair of
+ranked entities by the sentences they share. A failed background write must
+be retried, and a retry must not overwrite a newer save of the same article.
+No database is needed: the connection settings below are placeholders and
+no connection is opened.
+Run directly: python testing/storage/test_entity_store.py
+"""
+
+import os
+import re
+import sys
+import threading
+from pathlib import Path
+
+sys.dont_write_bytecode = True
+
+base_path = Path(__file__).parent
+sys.path.append(str(base_path.parent.parent))
+
+for variable in ("DB_USER", "DB_PASS", "DB_HOST", "DB_NAME"):
+    os.environ.setdefault(variable, "test")
+
+from features import entity_store
+from features.entity_store import entity_rows, submit_article_entities
+
+WAIT = 5
+
+TEXT = (
+    "Apple hired Tim Cook. "
+    "Apple and Microsoft compete with Google. "
+    "Tim Cook met Microsoft staff. "
+    "Apple and Tim Cook agreed."
+)
+
+ALL_ENTITIES = [
+    # NER reported the second mention; the stored offset must be the first one
+    {"text": "Apple", "label": "ORG", "start": 22},
+    {"text": "Tim Cook", "label": "PER", "start": 12},
+    {"text": "Microsoft", "label": "ORG", "start": 32},
+    {"text": "Google.", "start": 55},
+    # Not in the text as written: stored from NER alone
+    {"text": "Alphabet Inc", "label": "ORG", "start": 200},
+    {"text": "Apple", "label": "ORG", "start": 0},
+]
+
+RANKINGS = [
+    {"name": "Apple", "distance": 0.1},
+    {"name": "Microsoft", "distance": 0.25},
+    {"name": "Tim Cook", "distance": 0.3},
+    {"name": "Not found by NER", "distance": 0.5},
+]
+
+
+class SentenceDocument:
+    """The sentences and spans find_entity_occurrences() reads, split at '. ' without a tokenizer model."""
+
+    def __init__(self, text):
+        self.clean_text = text
+        self.sentence_spans = [match.span() for match in re.finditer(r"[^.]+\.", text)]
+        self.sentences = [text[start:end] for start, end in self.sentence_spans]
+
+
+def test_entity_rows():
+    rows = entity_rows(SentenceDocument(TEXT), ALL_ENTITIES, RANKINGS)
+
+    assert rows["types"] == {
+        "Apple": "ORG", "Tim Cook": "PER", "Microsoft": "ORG", "Google": "MISC", "Alphabet Inc": "ORG"
+    }, rows["types"]
+    assert rows["extractions"] == {
+        "Apple": (0, 3),
+        "Tim Cook": (12, 3),
+        "Microsoft": (32, 2),
+        "Google": (55, 1),
+        "Alphabet Inc": (200, 1),
+    }, rows["extractions"]
+    assert rows["importance"] == {"Apple": 0.9, "Microsoft": 0.75, "Tim Cook": 0.7}, rows["importance"]
+    # Google shares a sentence with Apple and Microsoft but is not ranked, so it has no pairs
+    assert rows["relationships"] == {
+        ("Apple", "Tim Cook"): 2,
+        ("Apple", "Microsoft"): 1,
+        ("Microsoft", "Tim Cook"): 1,
+    }, rows["relationships"]
+
+
+def test_entity_rows_without_entities():
+    rows = entity_rows(SentenceDocument(TEXT), [], [])
+    assert rows == {"types": {}, "extractions": {}, "importance": {}, "relationships": {}}, rows
+
+
+def test_failed_write_is_retried_unless_replaced():
+    written = []
+    done = threading.Event()
+    failures = {"first": 1, "old": 1}
+
+    def flaky_write(article_id, text, all_entities, rankings):
+        if failures.get(text):
+            failures[text] -= 1
+            raise RuntimeError("connection lost")
+        written.append((article_id, text))
+        if text in ("first", "new"):
+            done.set()
+
+    original_write, original_delay = entity_store.write_article_entities, entity_store.ENTITY_WRITE_RETRY_DELAY
+    entity_store.write_article_entities, entity_store.ENTITY_WRITE_RETRY_DELAY = flaky_write, 0.05
+    try:
+        # Fails once, then the retry writes it
+        assert submit_article_entities(1, "first", [], []).result(WAIT) is False
+        assert done.wait(WAIT)
+        assert written == [(1, "first")], written
+
+        # Fails once, but a newer save arrives before the retry runs
+        done.clear()
+        assert submit_article_entities(2, "old", [], []).result(WAIT) is False
+        assert submit_article_entities(2, "new", [], []).result(WAIT) is True
+        assert done.wait(WAIT)
+        threading.Event().wait(entity_store.ENTITY_WRITE_RETRY_DELAY * 4)
+        assert written == [(1, "first"), (2, "new")], written
+    finally:
+        entity_store.write_article_entities, entity_store.ENTITY_WRITE_RETRY_DELAY = original_write, original_delay
+
+
+if __name__ == "__main__":
+    test_entity_rows()
+    test_entity_rows_without_entities()
+    test_failed_write_is_retried_unless_replaced()
+    print("Entity store: counts, first offsets, NER-only fallback, pair weights and write retries as expected")
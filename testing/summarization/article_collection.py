@@ -15,7 +15,7 @@ from bs4 import BeautifulSoup
 base_path = Path(__file__).parent
 sys.path.append(str(base_path.parent))
 
-from features.rss_handler import fetch_rss_articles
+from features.feed_ingestion import fetch_feeds
 
 # RSS feed sources
 FEEDS = {
@@ -36,9 +36,12 @@ def clean(text):
 collected_article_rows = []
 current_article_id = 1
 
+# Fetch every feed concurrently; a slow source only delays its own results
+feed_results = fetch_feeds(FEEDS.values())
+
 for source_name, feed_url in FEEDS.items():
-    # Fetch articles from this feed
-    raw_articles_list = fetch_rss_articles(feed_url)
+    # Articles from this feed (empty if it failed or timed out)
+    raw_articles_list = feed_results[feed_url]["articles"]
     articles_collected_from_source = 0
 
     for article_data in raw_articles_list:
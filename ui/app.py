@@ -10,6 +10,7 @@ from theme import (
 
 from state import current_user, current_role, current_view, is_checking_session
 from components import SessionRestorer, LoginScreen, DashboardScreen, AdminPage
+from logic import warm_up_models
 
 
 # MASTER PAGE (INJECTS CSS ONCE)
@@ -500,6 +501,9 @@ def Page():
     """)
 
     SessionRestorer()
+
+    # Load the NLP models in the background once the first page has been served
+    solara.use_effect(warm_up_models, [])
     
     print(f"DEBUG: checking={is_checking_session.value}, user={'LOGGED_IN' if current_user.value else 'NONE'}")
     
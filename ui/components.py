@@ -1,26 +1,29 @@
 import sys
 sys.dont_write_bytecode = True
 
+import time
 import urllib.parse
 import solara
 
 from features.auth_handler import get_google_login_url, exchange_code_for_user_info
-from features.database import SessionLocal, Account, UserSession
+from features.database import session_scope, Account, UserSession
+from features.relationship_mapping import render_graph_html
 
 from theme import COLORS, FONTS, SPACING, RADIUS, SHADOWS, SIZES, CARD_STYLES, LAYOUT_STYLES, MODAL_OVERLAY_STYLE, SIZES
 
 from state import (
     current_view, current_user, current_role, current_session_id,
     show_logout_confirm, show_delete_confirm, input_mode, sidebar_open, show_help_modal,
-    rss_link, is_loading, current_page, items_per_page, error_message,
+    rss_link, is_loading, analysis_status, analysis_stages, current_page, items_per_page, error_message,
     display_mode, notes_input, save_status, sidebar_search,
     news_title, news_description, selected_article_data, rss_feed_results,
     is_checking_session
 )
 from logic import (
     sync_user_to_db, create_session, resolve_session,
-    fetch_articles, AnalysisWorker, analyze_article, handle_manual_analysis, handle_rss_fetch,
-    RSSWorker, get_saved_titles, display_historical_analysis, save_to_azure,
+    fetch_articles, analyze_article, prefetch_articles, cancel_current_analysis, handle_manual_analysis, handle_rss_fetch,
+    PIPELINE_STAGES, is_analysis_complete,
+    RSSWorker, get_saved_titles, HISTORY_SEARCH_DEBOUNCE_SECONDS, display_historical_analysis, load_saved_graph, save_to_azure,
     delete_current_article, delete_user_from_db, get_user_activity
 )
 
@@ -233,15 +236,57 @@ def LoginScreen():
                     )
 
 
+def display_stage_placeholder(stage):
+    """Shows the status of a pipeline stage whose result is not available yet"""
+    status = analysis_stages.value.get(stage, "pending")
+    if status == "running":
+        message = next(text for name, _, text in PIPELINE_STAGES if name == stage)
+    elif status == "failed":
+        message = "This step failed."
+    elif status == "cancelled":
+        message = "Analysis cancelled."
+    else:
+        message = "Waiting for the previous step..."
+
+    solara.Text(
+        message, 
+        classes=["roboto-mono-light"], 
+        style={
+            "display": "block", 
+            "font-size": FONTS["body_small"],
+            "color": COLORS["text_secondary"]
+        }
+    )
+
+
+@solara.component
+def GraphFrame(graph):
+    """Relationship map iframe; the HTML is rendered once per graph, not on every re-render"""
+    # Articles saved before the compact graph format carry a finished HTML document
+    html = solara.use_memo(lambda: graph if isinstance(graph, str) else render_graph_html(graph), [graph])
+    solara.HTML(tag="iframe", attributes={
+        "srcdoc": html, 
+        "style": f"width:100%; height:35rem; border:1px solid {COLORS['border_light']}; border-radius:{RADIUS['md']}; background: {COLORS['bg_white']};"
+    })
+
+
 # DASHBOARD SCREEN COMPONENT
 @solara.component
 def DashboardScreen():
     """Main dashboard with sidebar, workspace, and analysis view"""
     solara.use_router().push("/")
-    # Create both workers at the top
-    AnalysisWorker()
+    # Analyses run on the shared scheduler; only the RSS worker lives in the page
     RSSWorker()
 
+    # Pre-analyze the visible page of RSS items while the user reads the list
+    def prefetch_visible_page():
+        if input_mode.value != "rss" or not rss_feed_results.value:
+            return
+        start = current_page.value * items_per_page
+        prefetch_articles(rss_feed_results.value[start:start + items_per_page])
+
+    solara.use_effect(prefetch_visible_page, [rss_feed_results.value, current_page.value, input_mode.value])
+
     with solara.Div(classes=["dashboard-container"]):
         # Left Sidebar - Saved articles list
         sidebar_class = "sidebar-open" if sidebar_open.value else "sidebar-closed"
@@ -295,15 +340,35 @@ def DashboardScreen():
                         classes=["roboto-mono-light", "input"],
                     )
 
-                # Fetch titles using current_user and refresh on save_status change
+                # First page of saved titles; refreshed on save and on every search change
                 email_val = current_user.value['email'] if current_user.value else None
-                saved_list = solara.use_memo(lambda: get_saved_titles(email_val), [email_val, save_status.value])
+                search_term = sidebar_search.value.strip()
+
+                def load_first_page():
+                    # Each keystroke cancels the previous thread during this pause, so only the
+                    # last one queries the database; rendering never waits for the query
+                    if search_term:
+                        time.sleep(HISTORY_SEARCH_DEBOUNCE_SECONDS)
+                    try:
+                        return get_saved_titles(email_val, search_term)
+                    except Exception as e:
+                        print(f"Error loading saved articles: {e}")
+                        return [], None
+
+                # Keeps the previous page on screen until the new one has loaded
+                first_page_result = solara.use_thread(load_first_page, dependencies=[email_val, search_term, save_status.value])
+                first_page = first_page_result.value
+                # (rows, next_cursor) of every page after the first; None until "Load more" is used
+                more_pages, set_more_pages = solara.use_state(None)
+                solara.use_effect(lambda: set_more_pages(None), [first_page])
 
-                # Filter the list based on the search term
-                filtered_list = [
-                    article for article in saved_list 
-                    if sidebar_search.value.lower() in article.title.lower()
-                ] if saved_list else []
+                first_rows, first_cursor = first_page if first_page is not None else ([], None)
+                extra_rows, next_cursor = more_pages if more_pages is not None else ([], first_cursor)
+                filtered_list = first_rows + extra_rows
+
+                def load_more_titles():
+                    rows, cursor = get_saved_titles(email_val, search_term, cursor=next_cursor)
+                    set_more_pages((extra_rows + rows, cursor))
 
                 # Display filtered articles
                 with solara.Div(style={
@@ -313,7 +378,10 @@ def DashboardScreen():
                     "background-color": "transparent", 
                     "overflow-y": "auto"
                 }):
-                    if not saved_list:
+                    if first_page is None:
+                        # First load still running
+                        pass
+                    elif not filtered_list and not search_term:
                         solara.Text(
                             "> No articles yet", 
                             classes=["roboto-mono-medium", "sidebar-info"], 
@@ -361,19 +429,32 @@ def DashboardScreen():
                                     classes=["roboto-mono-medium", "article-btn-text"],
                                     style=highlight_style
                                 )
-                
+
+                            if next_cursor:
+                                solara.Button(
+                                    "Load more",
+                                    on_click=load_more_titles,
+                                    text=True,
+                                    classes=["roboto-mono-medium", "article-btn-text"],
+                                    style={
+                                        "color": COLORS["text_white"],
+                                        "opacity": "0.8",
+                                        "text-transform": "none",
+                                        "width": "100%"
+                                    }
+                                )
+
                 # Logout logic
                 def handle_logout():    
                     """Handle user logout and session cleanup"""
                     sid = current_session_id.value
                     if sid:
-                        db = SessionLocal()
-                        try:
+                        with session_scope() as db:
                             # Remove the session from database
                             db.query(UserSession).filter(UserSession.session_id == sid).delete()
-                            db.commit()
-                        finally:
-                            db.close()
+
+                    # Stop any analysis still queued for this session
+                    cancel_current_analysis()
 
                     # Wipe Python App State
                     current_user.set(None)
@@ -456,7 +537,16 @@ def DashboardScreen():
             # Loading state
             if is_loading.value:
                 solara.ProgressLinear(color=COLORS["primary"])
-                solara.Text("Processing...", style={"margin-top":"10px", "color": COLORS["primary"]})
+                solara.Text(analysis_status.value or "Processing...", style={"margin-top":"10px", "color": COLORS["primary"]})
+                # Only analyses can be cancelled, not RSS fetches
+                if analysis_status.value:
+                    solara.Button(
+                        "Cancel", 
+                        icon_name="mdi-close", 
+                        on_click=cancel_current_analysis, 
+                        text=True, 
+                        classes=["roboto-mono-regular", "back-btn", "push-button"]
+                    )
 
             # Results view (selected article)
             elif selected_article_data.value:
@@ -482,6 +572,20 @@ def DashboardScreen():
                                 solara.Button("Summary", value="summary")
                                 solara.Button("Original Text", value="original")
 
+                    # Later stages are still running; finished ones are already shown below
+                    if not is_analysis_complete(data) and analysis_status.value:
+                        with solara.Column(style={"width": "100%"}):
+                            solara.ProgressLinear(color=COLORS["primary"])
+                            with solara.Row(justify="space-between", style={"align-items": "center"}):
+                                solara.Text(analysis_status.value, style={"color": COLORS["primary"]})
+                                solara.Button(
+                                    "Cancel", 
+                                    icon_name="mdi-close", 
+                                    on_click=cancel_current_analysis, 
+                                    text=True, 
+                                    classes=["roboto-mono-regular", "back-btn", "push-button"]
+                                )
+
                     # Main analysis layout
                     with solara.Row(classes=["analysis-grid"], style={
                         "padding": "10px", 
@@ -509,7 +613,9 @@ def DashboardScreen():
                                 )
                                 
                                 # Show summary or original text based on toggle
-                                if display_mode.value == "summary":
+                                if display_mode.value == "summary" and data['summary'] is None:
+                                    display_stage_placeholder("summary")
+                                elif display_mode.value == "summary":
                                     # Manhattan-distance based extractive summary
                                     solara.Text(
                                         data['summary'], 
@@ -556,8 +662,11 @@ def DashboardScreen():
                                     }
                                 )
                                 
+                                if data['rankings'] is None:
+                                    display_stage_placeholder("rankings")
+
                                 # Display top 8 entities with importance scores
-                                for item in data['rankings'][:8]: 
+                                for item in (data['rankings'] or [])[:8]: 
                                     # Calculation: Lower distance = higher importance (1.0 - dist)
                                     importance_percent = (1 - item['distance']) * 100
                                     
@@ -601,7 +710,9 @@ def DashboardScreen():
                                         "font-size": FONTS["body_default"]
                                     }
                                 )
-                                all_names = [e['text'] for e in data['all_entities']]
+                                if data['all_entities'] is None:
+                                    display_stage_placeholder("entities")
+                                all_names = [e['text'] for e in data['all_entities'] or []]
                                 with solara.Row(style={"flex-wrap": "wrap", "gap": SPACING["sm"]}):
                                     for name in all_names:
                                         solara.Div(
@@ -646,11 +757,18 @@ def DashboardScreen():
                             }
                         )
                         
-                        if data['graph']:
-                            solara.HTML(tag="iframe", attributes={
-                                "srcdoc": data['graph'], 
-                                "style": f"width:100%; height:35rem; border:1px solid {COLORS['border_light']}; border-radius:{RADIUS['md']}; background: {COLORS['bg_white']};"
-                            })
+                        if data['graph'] is None:
+                            display_stage_placeholder("graph")
+                        elif data.get('graph_deferred'):
+                            # Saved articles load the map only when asked for
+                            solara.Button(
+                                "Show relationship map",
+                                on_click=load_saved_graph,
+                                classes=["roboto-mono-medium"],
+                                style={"margin-top": SPACING["md"]}
+                            )
+                        elif data['graph']:
+                            GraphFrame(data['graph'])
                             
                     # Notes section
                     with solara.Div(classes=["notes-section-container"]):
@@ -684,6 +802,8 @@ def DashboardScreen():
                                     "align-item": "center"
                                 },
                                 on_click=lambda: save_to_azure(selected_article_data.value, notes_input.value),
+                                # Only complete analyses can be saved
+                                disabled=not is_analysis_complete(data),
                             )
                         with solara.Row(justify="end"):
                             # Only show if article is stored
@@ -1080,11 +1200,8 @@ def AdminPage():
 
     def load_users():
         """Load all users from database"""
-        db = SessionLocal()
-        try:
+        with session_scope() as db:
             set_users(db.query(Account).all())
-        finally:
-            db.close()
 
     solara.use_effect(load_users, [refresh_counter.value])
 
@@ -1103,12 +1220,8 @@ def AdminPage():
     def handle_logout():
         """Handle admin logout"""
         sid = solara.get_session_id()
-        db = SessionLocal()
-        try:
+        with session_scope() as db:
             db.query(UserSession).filter(UserSession.session_id == sid).delete()
-            db.commit()
-        finally:
-            db.close()
 
         current_user.set(None)
         current_role.set("user")
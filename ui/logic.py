@@ -1,32 +1,43 @@
 import solara
+from solara.server import kernel_context
 import sys
 sys.dont_write_bytecode = True
 
+import os
 import json
 import uuid
-import nltk
-from nltk.tokenize import sent_tokenize
 from datetime import datetime, timedelta, timezone
-from bs4 import BeautifulSoup
 
-from features.flair_ner import identify_entities
+from sqlalchemy import select, literal, tuple_, func, Text, LargeBinary
+from sqlalchemy.dialects.postgresql import insert
+
 from features.rss_handler import fetch_rss_articles
-from features.entity_ranking_and_summarization import entity_ranking, generate_summary
-from features.relationship_mapping import mapping
-from features.database import SessionLocal, Article, Summary, Account, Annotation, AnalysisResult, UserSession
+from features.feed_ingestion import fetch_feed
+from features.feed_poller import start_feed_poller, get_or_create_source, load_source_articles
+from features.inference import identify_entities, entity_ranking, generate_summary
+from features.relationship_mapping import build_graph, pack_graph, unpack_graph
+from features.document import build_document, clean_html
+from features.result_cache import analysis_cache_key, peek_cached_analysis, get_cached_analysis, store_analysis
+from features.model_registry import start_background_warm_up
+from features.entity_store import submit_article_entities
+from features.database import (
+    session_scope, article_content_hash,
+    Article, Summary, Account, Annotation, AnalysisResult, UserSession, EntityExtraction, RelationshipMap
+)
+from scheduler import analysis_scheduler
 
 from state import (
     current_user, current_role, current_session_id, current_view,
-    is_loading, selected_article_data, rss_feed_results,
+    is_loading, analysis_status, analysis_stages, selected_article_data, rss_feed_results,
     error_message, news_title, news_description, rss_link,
     save_status, notes_input, is_checking_session
 )
 
-# nltk requirement
-try:
-    nltk.data.find('tokenizers/punkt_tab')
-except LookupError:
-    nltk.download('punkt_tab', quiet=True)
+
+def warm_up_models():
+    """Start loading the NER and sentence-transformer models, and the feed poller, in background threads."""
+    start_background_warm_up()
+    start_feed_poller()
 
 
 def fetch_articles(rss_url):
@@ -41,58 +52,204 @@ def fetch_articles(rss_url):
     finally:
         is_loading.set(False)
 
-# Global reference to analysis worker
-analysis_worker_ref = None
+# Analyze the visible page of RSS items in the background (PREFETCH_ENABLED=0 turns it off)
+PREFETCH_ENABLED = os.getenv("PREFETCH_ENABLED", "1") == "1"
+
+# Sessions that already cancel their jobs when the browser tab closes
+_sessions_with_close_hook = set()
+
+# Pipeline stages in the order their results are published:
+# (stage name, result key, progress text)
+PIPELINE_STAGES = [
+    ("entities", "all_entities", "Extracting entities..."),
+    ("rankings", "rankings", "Ranking entities..."),
+    ("summary", "summary", "Summarizing..."),
+    ("graph", "graph", "Mapping relationships..."),
+]
+
+def is_analysis_complete(data):
+    """True once every stage has filled in its result key"""
+    return all(data.get(key) is not None for _, key, _ in PIPELINE_STAGES)
+
+def compute_analysis(job, document, on_stage=None):
+    """
+    Runs every pipeline stage on a document and stores the result in the cache.
+
+    Args:
+        job: The scheduler job, checked for cancellation between stages.
+        document: The AnalyzedDocument of the article.
+        on_stage: Optional callback(stage_name, partial_result) called when a
+            stage starts (with the result so far) and once more at the end
+            with stage_name None.
+
+    Returns the result dict, or None if the job was cancelled between stages.
+    """
+    # Keys are filled in as each stage finishes; None means not computed yet
+    result = {"original-text": document.clean_text}
+    result.update({key: None for _, key, _ in PIPELINE_STAGES})
+
+    def run_stage(name, key, compute):
+        # Stop between stages if the user started another analysis or left
+        if job.cancelled:
+            return False
+        if on_stage:
+            on_stage(name, dict(result))
+        result[key] = compute()
+        return True
 
-@solara.component
-def AnalysisWorker():
-    """Background worker component for article analysis"""
-    article_to_analyze = solara.use_reactive(None)
-    
-    def run_analysis():
-        if article_to_analyze.value is None:
+    if not run_stage("entities", "all_entities", lambda: identify_entities(document)):
+        return None
+    if not run_stage("rankings", "rankings", lambda: entity_ranking(document, result["all_entities"])):
+        return None
+    top_names = [e['name'] for e in result["rankings"]]
+    if not run_stage("summary", "summary", lambda: generate_summary(document, result["rankings"])['summary']):
+        return None
+    # The graph is kept as a compact payload; HTML is only rendered when it is displayed
+    if not run_stage("graph", "graph", lambda: build_graph(document, top_names) if len(top_names) > 1 else {}):
+        return None
+
+    if on_stage:
+        on_stage(None, dict(result))
+    store_analysis(analysis_cache_key(document.clean_text), result)
+    return result
+
+def stage_statuses(running_stage):
+    """Status of every stage while running_stage runs (None = all done)"""
+    names = [name for name, _, _ in PIPELINE_STAGES]
+    if running_stage is None:
+        return {name: "done" for name in names}
+    current = names.index(running_stage)
+    return {
+        name: "done" if index < current else "running" if index == current else "pending"
+        for index, name in enumerate(names)
+    }
+
+def run_analysis(job, article, context):
+    """Runs the NLP pipeline for one article on a scheduler worker thread"""
+    current_stage = [None]
+
+    def publish_stage(stage, partial_result):
+        # The result view renders whatever keys are filled in so far
+        current_stage[0] = stage
+        progress = next((text for name, _, text in PIPELINE_STAGES if name == stage), "")
+        publish_to_session(job, context, {
+            selected_article_data: {"title": article['title'], **partial_result},
+            analysis_stages: stage_statuses(stage),
+            analysis_status: progress,
+            is_loading: False,
+        })
+
+    try:
+        # Parse and split the article once; every stage reads the same document
+        document = build_document(article['description'])
+
+        # Reuse the stored result if this exact text was analyzed before
+        result = get_cached_analysis(analysis_cache_key(document.clean_text))
+        if result is not None:
+            publish_stage(None, result)
+        else:
+            compute_analysis(job, document, on_stage=publish_stage)
+    except Exception:
+        if current_stage[0] is not None:
+            statuses = stage_statuses(current_stage[0])
+            statuses[current_stage[0]] = "failed"
+            publish_to_session(job, context, {analysis_stages: statuses})
+        raise
+    finally:
+        # A replaced job leaves the loading state to the job that replaced it
+        publish_to_session(job, context, {is_loading: False, analysis_status: ""})
+
+def publish_to_session(job, context, updates):
+    """Set a session's reactive variables from a worker thread, unless the job was cancelled"""
+    if job.cancelled or context.closed_event.is_set():
+        return
+    with context:
+        for reactive_var, value in updates.items():
+            reactive_var.set(value)
+
+def submit_analysis(article):
+    """Queues an article on the shared scheduler, owned by the current browser session"""
+    context = kernel_context.get_current_context()
+    session_id = context.id
+
+    # Cancel this session's jobs when the user closes the tab or navigates away
+    if session_id not in _sessions_with_close_hook:
+        _sessions_with_close_hook.add(session_id)
+        def on_session_close():
+            analysis_scheduler.cancel_session(session_id)
+            _sessions_with_close_hook.discard(session_id)
+        context.on_close(on_session_close)
+
+    def report_position(position):
+        if context.closed_event.is_set():
             return
-        
-        article = article_to_analyze.value
-        is_loading.set(True)
-        try:
-            soup = BeautifulSoup(article['description'], "html.parser")
-            clean_text = soup.get_text(separator=" ")
+        with context:
+            if position == 0:
+                analysis_status.set("Processing...")
+            else:
+                analysis_status.set(f"Waiting for a free analysis worker (position {position} in queue)...")
 
-            entities = identify_entities(clean_text)
-            rankings = entity_ranking(clean_text, entities)
-            summary = generate_summary(clean_text, rankings)
-            
-            top_names = [e['name'] for e in rankings]
-            graph_html = mapping(clean_text, top_names) if len(top_names) > 1 else ""
-
-            selected_article_data.set({
-                "title": article['title'],
-                "original-text": clean_text,
-                "summary": summary['summary'],
-                "graph": graph_html,
-                "all_entities": entities,
-                "rankings": rankings
-            })
-        finally:
-            is_loading.set(False)
-            article_to_analyze.set(None)
-    
-    # Run analysis when article is set
-    solara.use_thread(run_analysis, dependencies=[article_to_analyze.value])
-    
-    # Store in global variable
-    global analysis_worker_ref
-    analysis_worker_ref = article_to_analyze
-    
-    # Return empty div
-    return solara.Div(style={"display": "none"})
+    error_message.set("")
+    is_loading.set(True)
+    analysis_status.set("Queued...")
+    analysis_stages.set({})
+    job = analysis_scheduler.submit(
+        session_id,
+        lambda job: run_analysis(job, article, context),
+        on_position=report_position
+    )
+
+    # Back-pressure: tell the user instead of piling up more work
+    if job is None:
+        is_loading.set(False)
+        analysis_status.set("")
+        error_message.set("The server is busy analyzing other articles. Please try again in a moment.")
+
+def cancel_current_analysis():
+    """Cancels this session's queued or running analysis"""
+    analysis_scheduler.cancel_session(kernel_context.get_current_context().id)
+    is_loading.set(False)
+    analysis_status.set("")
+    # Partial results stay on screen; unfinished stages are marked as cancelled
+    analysis_stages.set({
+        name: status if status == "done" else "cancelled"
+        for name, status in analysis_stages.value.items()
+    })
 
 def analyze_article(article):
-    if analysis_worker_ref is not None:
-        analysis_worker_ref.set(article)
-    else:
-        print("ERROR: Analysis worker not initialized")
+    # Results already in this process are shown instantly, without the worker
+    cached = peek_cached_analysis(analysis_cache_key(clean_html(article['description'])))
+    if cached is not None:
+        # An analysis still running for this session would publish over the chosen article
+        analysis_scheduler.cancel_analysis(kernel_context.get_current_context().id)
+        error_message.set("")
+        is_loading.set(False)
+        analysis_status.set("")
+        analysis_stages.set(stage_statuses(None))
+        selected_article_data.set({"title": article['title'], **cached})
+        return
+
+    submit_analysis(article)
+
+def run_prefetch(job, article):
+    """Analyzes an RSS item nobody opened yet, so a later click is served from the cache"""
+    document = build_document(article['description'])
+    if get_cached_analysis(analysis_cache_key(document.clean_text)) is None:
+        compute_analysis(job, document)
+
+def prefetch_articles(articles):
+    """Queues background analyses for the RSS items currently on screen"""
+    if not PREFETCH_ENABLED:
+        return
+    session_id = kernel_context.get_current_context().id
+
+    # Items from the previous page are no longer worth the CPU
+    analysis_scheduler.cancel_prefetch(session_id)
+    for article in articles:
+        cache_key = analysis_cache_key(clean_html(article['description']))
+        if peek_cached_analysis(cache_key) is not None:
+            continue
+        analysis_scheduler.submit_prefetch(session_id, cache_key, lambda job, a=article: run_prefetch(job, a))
 
 def handle_manual_analysis():
     # Reset error first
@@ -117,13 +274,10 @@ def handle_manual_analysis():
         error_message.set(f"Your description is too short ({word_count} word/s). Please provide a longer description.")
         return
 
-    if analysis_worker_ref is not None:
-        analysis_worker_ref.set({
-            'title': title, 
-            'description': desc
-        })
-    else:
-        print("ERROR: Analysis worker not initialized")
+    submit_analysis({
+        'title': title, 
+        'description': desc
+    })
 
 # Global reference to RSS worker
 rss_worker_ref = None
@@ -140,8 +294,20 @@ def RSSWorker():
         url = url_to_fetch.value
         is_loading.set(True)
         try:
-            fetched = fetch_rss_articles(url)
-            rss_feed_results.set(fetched)
+            # Feeds tracked by the poller are served from the article store
+            articles = load_source_articles(url)
+            if not articles:
+                # Bounded by the feed time limits, so a slow feed cannot hang this thread
+                result = fetch_feed(url)
+                if result["status"] == "timeout":
+                    error_message.set("The RSS feed took too long to respond. Please try again later.")
+                elif result["status"] == "error":
+                    error_message.set(f"RSS Error: {result['error']}")
+                articles = result["articles"]
+                # Track the feed so the poller ingests it from now on
+                if articles:
+                    get_or_create_source(url)
+            rss_feed_results.set(articles)
             selected_article_data.set(None)
         except Exception as e:
             error_message.set(f"RSS Error: {e}")
@@ -180,76 +346,122 @@ def handle_rss_fetch():
 
 def sync_user_to_db(email):
     """Ensures the Google user exists in the Azure Account table."""
-    db = SessionLocal()
     try:
-        user_acc = db.query(Account).filter(Account.gmail == email).first()
-        if not user_acc:
-            print(f"Registering new user in Azure: {email}")
-            user_acc = Account(gmail=email, account_role="user")
-            db.add(user_acc)
-            db.commit()
-        else:
-            print(f"User {email} already exists in database.")
-        current_role.set(user_acc.account_role)
+        with session_scope() as db:
+            user_acc = db.query(Account).filter(Account.gmail == email).first()
+            if not user_acc:
+                print(f"Registering new user in Azure: {email}")
+                user_acc = Account(gmail=email, account_role="user")
+                db.add(user_acc)
+                db.commit()
+            else:
+                print(f"User {email} already exists in database.")
+            current_role.set(user_acc.account_role)
     except Exception as e:
         print(f"Failed to sync user to database: {e}")
-        db.rollback()
-    finally:
-        db.close()
+
+def save_statement(email, data_dict, user_notes):
+    """
+    One INSERT ... ON CONFLICT statement that saves an analysis for a user.
+
+    The article is upserted on its content hash and the summary, note and
+    analysis result on their unique keys, chained through data-modifying CTEs,
+    so the save is a single round-trip.
+
+    Returns:
+        A select of (articleid, accountid); no row if the account doesn't exist.
+    """
+    content = data_dict.get('original-text') or data_dict.get('content') or ""
+
+    # New analyses carry a graph payload (stored compressed); articles saved
+    # before that may carry their old HTML document
+    graph = data_dict.get('graph')
+    graph_data = pack_graph(graph) if isinstance(graph, dict) and graph else None
+    graph_html = graph if isinstance(graph, str) and graph else None
+
+    article_insert = insert(Article).values(
+        title=data_dict['title'],
+        content=content,
+        content_hash=article_content_hash(content)
+    )
+    # DO UPDATE (not DO NOTHING) so RETURNING also yields the id of an existing article;
+    # the article is shared, so it keeps the title it was first stored with
+    article_row = article_insert.on_conflict_do_update(
+        index_elements=[Article.content_hash],
+        set_={"title": Article.title}
+    ).returning(Article.articleid).cte("article_row")
+
+    account_row = select(Account.accountid).where(Account.gmail == email).cte("account_row")
+
+    summary_insert = insert(Summary).from_select(
+        ["articleid", "accountid", "summarytext"],
+        select(article_row.c.articleid, account_row.c.accountid, literal(data_dict['summary'], Text))
+    )
+    summary_insert = summary_insert.on_conflict_do_update(
+        index_elements=[Summary.articleid, Summary.accountid],
+        set_={"summarytext": summary_insert.excluded.summarytext}
+    )
+
+    result_insert = insert(AnalysisResult).from_select(
+        ["articleid", "rankings_json", "entities_all_json", "graph_data", "graph_html"],
+        select(
+            article_row.c.articleid,
+            literal(json.dumps(data_dict.get('rankings', [])), Text),
+            # Just the names, for the bubbles section of the UI
+            literal(json.dumps(data_dict.get('all_entities', [])), Text),
+            literal(graph_data, LargeBinary),
+            literal(graph_html, Text)
+        )
+    )
+    result_update = {
+        "rankings_json": result_insert.excluded.rankings_json,
+        "entities_all_json": result_insert.excluded.entities_all_json,
+    }
+    # A saved article whose graph was never opened keeps its stored graph
+    if not data_dict.get('graph_deferred'):
+        result_update["graph_data"] = result_insert.excluded.graph_data
+        result_update["graph_html"] = result_insert.excluded.graph_html
+    result_insert = result_insert.on_conflict_do_update(
+        index_elements=[AnalysisResult.articleid],
+        set_=result_update
+    )
+
+    statement = select(article_row.c.articleid, account_row.c.accountid).add_cte(
+        summary_insert.cte("summary_row"),
+        result_insert.cte("result_row")
+    )
+
+    if user_notes:
+        note_insert = insert(Annotation).from_select(
+            ["articleid", "accountid", "note"],
+            select(article_row.c.articleid, account_row.c.accountid, literal(user_notes, Text))
+        )
+        note_insert = note_insert.on_conflict_do_update(
+            index_elements=[Annotation.articleid, Annotation.accountid],
+            set_={"note": note_insert.excluded.note}
+        )
+        statement = statement.add_cte(note_insert.cte("note_row"))
+
+    return statement
+
 
 def save_to_azure(data_dict, user_notes):
-    db = SessionLocal()
     try:
-        email = current_user.value['email']
-        user_acc = db.query(Account).filter(Account.gmail == email).first()
-        
-        # Article Logic
-        existing_article = db.query(Article).filter(Article.title == data_dict['title']).first()
-        if existing_article:
-            article_id = existing_article.articleid
-        else:
-            new_art = Article(
-                title=data_dict['title'], 
-                content=data_dict.get('original-text') or data_dict.get('content')
-            )
-            db.add(new_art)
-            db.flush() 
-            article_id = new_art.articleid
-
-        # Summary Logic
-        existing_summary = db.query(Summary).filter(Summary.articleid == article_id).first()
-        if existing_summary:
-            existing_summary.summarytext = data_dict['summary']
-        else:
-            db.add(Summary(articleid=article_id, accountid=user_acc.accountid, summarytext=data_dict['summary']))
-        
-        # Note Logic
-        if user_notes:
-            existing_note = db.query(Annotation).filter(Annotation.articleid == article_id, Annotation.accountid == user_acc.accountid).first()
-            if existing_note:
-                existing_note.note = user_notes
-            else:
-                db.add(Annotation(articleid=article_id, accountid=user_acc.accountid, note=user_notes))
-        
-        rankings_list = data_dict.get('rankings', [])
-        # Extract just names for the bubbles section of the UI
-        all_entity_names = data_dict.get('all_entities', [])
-        
-        existing_result = db.query(AnalysisResult).filter(AnalysisResult.articleid == article_id).first()
-        
-        if existing_result:
-            existing_result.rankings_json = json.dumps(rankings_list)
-            existing_result.entities_all_json = json.dumps(all_entity_names)
-            existing_result.graph_html = data_dict.get('graph', "")
-        else:
-            db.add(AnalysisResult(
-                articleid=article_id,
-                rankings_json=json.dumps(rankings_list),
-                entities_all_json=json.dumps(all_entity_names),
-                graph_html=data_dict.get('graph', "")
-            ))
-
-        db.commit()
+        with session_scope() as db:
+            email = current_user.value['email']
+            row = db.execute(save_statement(email, data_dict, user_notes)).first()
+            if row is None:
+                # Raising rolls back the article upsert as well
+                raise ValueError(f"No account found for {email}")
+            article_id = row.articleid
+
+        # Searchable copy of the entities in the normalized tables, written off the UI thread
+        submit_article_entities(
+            article_id,
+            data_dict.get('original-text') or data_dict.get('content') or "",
+            data_dict.get('all_entities') or [],
+            data_dict.get('rankings') or []
+        )
 
         new_data = {**selected_article_data.value} # Copy existing data
         new_data["articleid"] = article_id # Add the ID 
@@ -258,118 +470,218 @@ def save_to_azure(data_dict, user_notes):
         save_status.set("success")
 
     except Exception as e:
-        db.rollback()
         print(f"DATABASE ERROR: {e}")
-    finally:
-        db.close()
 
-def get_saved_titles(email):
-    db = SessionLocal()
-    try:
-        user_acc = db.query(Account).filter(Account.gmail == email).first()
-        if not user_acc:
-            return []
-        # Get articles linked to this user's summaries
-        articles = db.query(Article).join(Summary).filter(Summary.accountid == user_acc.accountid).all()
-        return articles
-    finally:
-        db.close()
+# Saved articles loaded per sidebar page
+HISTORY_PAGE_SIZE = 50
+# Pause after the last keystroke before the sidebar search queries the database
+HISTORY_SEARCH_DEBOUNCE_SECONDS = 0.3
+
+
+def escape_like(term):
+    """Escape LIKE wildcards so the search term matches literally."""
+    return term.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+
+def get_saved_titles(email, search="", cursor=None, limit=HISTORY_PAGE_SIZE):
+    """
+    One page of a user's saved articles, newest first.
+
+    Only (articleid, title, created_at) are selected. Pages are keyset-paginated,
+    so loading page N costs the same as page 1, and the search runs in SQL
+    (served by the optional trigram index, see database.HISTORY_TRIGRAM_INDEX).
+
+    Args:
+        email: The user's Google email.
+        search: Case-insensitive substring of the title; "" for all articles.
+        cursor: The next_cursor of the previous page, or None for the first page.
+        limit: Articles per page.
+
+    Returns:
+        (rows, next_cursor): rows with .articleid, .title and .created_at, and the
+        cursor of the following page (None when this is the last page).
+    """
+    if not email:
+        return [], None
+
+    with session_scope() as db:
+        query = db.query(Article.articleid, Article.title, Article.created_at).join(
+            Summary, Summary.articleid == Article.articleid
+        ).join(
+            Account, Account.accountid == Summary.accountid
+        ).filter(Account.gmail == email)
+
+        search = (search or "").strip()
+        if search:
+            query = query.filter(Article.title.ilike(f"%{escape_like(search)}%", escape="\\"))
+        if cursor:
+            created_at, article_id = cursor
+            query = query.filter(tuple_(Article.created_at, Article.articleid) < (created_at, article_id))
+
+        # One extra row tells whether another page exists
+        rows = query.order_by(Article.created_at.desc(), Article.articleid.desc()).limit(limit + 1).all()
+
+    if len(rows) > limit:
+        rows = rows[:limit]
+        return rows, (rows[-1].created_at, rows[-1].articleid)
+    return rows, None
+
+def decode_json_list(value):
+    """A saved JSON list, or [] if the column is empty."""
+    return json.loads(value) if value else []
 
 def display_historical_analysis(article_id):
-    """Fetches saved NLP results and updates the UI state."""
-    db = SessionLocal()
+    """
+    Fetches a saved analysis of the current user and updates the UI state.
+
+    Article, summary, result and note come from one joined query. The graph
+    columns are not loaded: the result view shows a button and
+    load_saved_graph() fetches the graph when the user opens the map.
+    """
     save_status.set("")
-    try:
-        # Retrieve data from all relevant tables
-        article = db.query(Article).filter(Article.articleid == article_id).first()
-        summary = db.query(Summary).filter(Summary.articleid == article_id).first()
-        result = db.query(AnalysisResult).filter(AnalysisResult.articleid == article_id).first()
-        note = db.query(Annotation).filter(Annotation.articleid == article_id).first()
-
-        if article and summary:
-            # Reconstruct the dictionary format for the result view
-            historical_dict = {
-                "articleid": article.articleid,
-                "title": article.title,
-                "original-text": article.content,
-                "summary": summary.summarytext,
-                # Graph HTML and Rankings must be parsed from JSON strings
-                "graph": result.graph_html if result else "",
-                "all_entities": json.loads(result.entities_all_json) if result and result.entities_all_json else [],
-                "rankings": json.loads(result.rankings_json) if result and result.rankings_json else []
-            }
-            
-            # Update Solara state variables to trigger the Result View automatically
-            selected_article_data.set(historical_dict)
-            notes_input.set(note.note if note else "")
-            
-    finally:
-        db.close()
+    email = current_user.value['email']
+    with session_scope() as db:
+        row = db.query(
+            Article.articleid,
+            Article.title,
+            Article.content,
+            Summary.summarytext,
+            AnalysisResult.entities_all_json,
+            AnalysisResult.rankings_json,
+            # Only whether a graph exists; octet_length reads the stored size without fetching the data
+            (func.coalesce(func.octet_length(AnalysisResult.graph_data), 0)
+             + func.coalesce(func.octet_length(AnalysisResult.graph_html), 0) > 0).label("has_graph"),
+            Annotation.note
+        ).join(
+            Summary, Summary.articleid == Article.articleid
+        ).join(
+            Account, Account.accountid == Summary.accountid
+        ).outerjoin(
+            AnalysisResult, AnalysisResult.articleid == Article.articleid
+        ).outerjoin(
+            Annotation, (Annotation.articleid == Article.articleid) & (Annotation.accountid == Account.accountid)
+        ).filter(
+            Article.articleid == article_id,
+            Account.gmail == email
+        ).first()
+
+    if row is None:
+        return
+
+    # Reconstruct the dictionary format for the result view
+    historical_dict = {
+        "articleid": row.articleid,
+        "title": row.title,
+        "original-text": row.content,
+        "summary": row.summarytext,
+        "graph": "",
+        # True until load_saved_graph() has fetched the graph
+        "graph_deferred": row.has_graph,
+        "all_entities": decode_json_list(row.entities_all_json),
+        "rankings": decode_json_list(row.rankings_json)
+    }
+
+    # Update Solara state variables to trigger the Result View automatically
+    selected_article_data.set(historical_dict)
+    notes_input.set(row.note or "")
+
+def load_saved_graph():
+    """Fetches the relationship map of the saved article on screen (deferred by display_historical_analysis)."""
+    data = selected_article_data.value
+    if not data or not data.get("graph_deferred"):
+        return
+
+    with session_scope() as db:
+        row = db.query(AnalysisResult.graph_data, AnalysisResult.graph_html).filter(
+            AnalysisResult.articleid == data["articleid"]
+        ).first()
+
+    # Articles saved before graph_data existed keep their HTML document
+    if row is None:
+        graph = ""
+    elif row.graph_data:
+        graph = unpack_graph(row.graph_data)
+    else:
+        graph = row.graph_html or ""
+
+    # Ignore the result if the user opened another article meanwhile
+    if selected_article_data.value is data:
+        selected_article_data.set({**data, "graph": graph, "graph_deferred": False})
 
 def delete_current_article():
     if not selected_article_data.value or 'articleid' not in selected_article_data.value:
         return
 
-    db = SessionLocal()
     try:
-        article_id = selected_article_data.value['articleid']
-        
-        # These are the Tables that reference articleid
-        db.query(Annotation).filter(Annotation.articleid == article_id).delete()
-        db.query(Summary).filter(Summary.articleid == article_id).delete()
-        db.query(AnalysisResult).filter(AnalysisResult.articleid == article_id).delete()
-        
-        db.flush()
-        db.query(Article).filter(Article.articleid == article_id).delete()
-        db.commit()
+        with session_scope() as db:
+            article_id = selected_article_data.value['articleid']
+            email = current_user.value['email']
+            account_id = db.query(Account.accountid).filter(Account.gmail == email).scalar()
+
+            # Only this account's copy of the saved analysis
+            db.query(Annotation).filter(Annotation.articleid == article_id, Annotation.accountid == account_id).delete()
+            db.query(Summary).filter(Summary.articleid == article_id, Summary.accountid == account_id).delete()
+            db.flush()
+
+            # The article row is shared (one per content hash): keep it while another account
+            # still has it saved or it came from a feed. Locking it first makes a concurrent
+            # save of the same article finish before the check below reads the summaries.
+            article = db.query(Article.articleid, Article.sourceid).filter(
+                Article.articleid == article_id
+            ).with_for_update().first()
+            still_saved = db.query(
+                select(Summary.articleid).where(Summary.articleid == article_id).exists()
+                | select(Annotation.articleid).where(Annotation.articleid == article_id).exists()
+            ).scalar()
+
+            if article and article.sourceid is None and not still_saved:
+                # These are the other Tables that reference articleid
+                db.query(AnalysisResult).filter(AnalysisResult.articleid == article_id).delete()
+                # Entity importance rows are removed with their extractions (ON DELETE CASCADE)
+                db.query(RelationshipMap).filter(RelationshipMap.articleid == article_id).delete()
+                db.query(EntityExtraction).filter(EntityExtraction.articleid == article_id).delete()
+
+                db.flush()
+                db.query(Article).filter(Article.articleid == article_id).delete()
+            db.commit()
         
         # Force Sidebar refresh and clear view
         save_status.set("deleted-{article_id}") 
         selected_article_data.set(None)
         
     except Exception as e:
-        db.rollback()
         print(f"DELETE ERROR: {e}")
-    finally:
-        db.close()
 
 # Admin functions
 def delete_user_from_db(account_id, gmail):
-    db = SessionLocal()
     try:
-        # Don't delete if it's an admin account
-        user = db.query(Account).filter(Account.accountid == account_id).first()
-        if user and user.account_role == "admin":
-            return False
-
-        # Delete dependent data in order
-        db.query(Annotation).filter(Annotation.accountid == account_id).delete()
-        db.query(Summary).filter(Summary.accountid == account_id).delete()
-        db.query(UserSession).filter(UserSession.gmail == gmail).delete()
-        db.query(Account).filter(Account.accountid == account_id).delete()
-        
-        db.commit()
-        return True
+        with session_scope() as db:
+            # Don't delete if it's an admin account
+            user = db.query(Account).filter(Account.accountid == account_id).first()
+            if user and user.account_role == "admin":
+                return False
+
+            # Delete dependent data in order
+            db.query(Annotation).filter(Annotation.accountid == account_id).delete()
+            db.query(Summary).filter(Summary.accountid == account_id).delete()
+            db.query(UserSession).filter(UserSession.gmail == gmail).delete()
+            db.query(Account).filter(Account.accountid == account_id).delete()
+            
+            db.commit()
+            return True
     except Exception as e:
-        db.rollback()
         print(f"Error deleting user: {e}")
         return False
-    finally:
-        db.close()
 
 def get_user_activity(account_id):
-    db = SessionLocal()
-    try:
+    with session_scope() as db:
         # Fetch articles that have summaries created by this specific user
         articles = db.query(Article).join(Summary).filter(Summary.accountid == account_id).order_by(Article.created_at.desc()).all()
         return [(a.title, a.created_at) for a in articles]
-    finally:
-        db.close()
 
 def resolve_session(sid):
     """Checks the database for the Solara Session ID."""
-    db = SessionLocal()
-    try:
+    with session_scope() as db:
         session = db.query(UserSession).filter(UserSession.session_id == sid).first()
         if session:
             # Use timezone-aware comparison
@@ -390,32 +702,27 @@ def resolve_session(sid):
                     "name": session.name,
                     "picture": session.picture
                 }
-    finally:
-        db.close()
     return None
 
 def create_session(user_info, sid):
     """Stores the Solara Session ID in the database."""
-    db = SessionLocal()
     try:
-        existing = db.query(UserSession).filter(UserSession.session_id == sid).first()
-        if existing:
+        with session_scope() as db:
+            existing = db.query(UserSession).filter(UserSession.session_id == sid).first()
+            if existing:
+                return sid
+
+            new_session = UserSession(
+                session_id=sid,
+                gmail=user_info["email"],
+                name=user_info.get("name", "User"),
+                picture=user_info.get("picture", ""),
+                expires_at=datetime.now(timezone.utc) + timedelta(days=7)  
+            )
+            
+            db.add(new_session)
+            db.commit()
             return sid
-
-        new_session = UserSession(
-            session_id=sid,
-            gmail=user_info["email"],
-            name=user_info.get("name", "User"),
-            picture=user_info.get("picture", ""),
-            expires_at=datetime.now(timezone.utc) + timedelta(days=7)  
-        )
-        
-        db.add(new_session)
-        db.commit()
-        return sid
     except Exception as e:
-        db.rollback()
         print(f"CRITICAL ERROR creating session: {e}")
         return None
-    finally:
-        db.close()
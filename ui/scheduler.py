@@ -0,0 +1,268 @@
+import os
+import sys
+sys.dont_write_bytecode = True
+
+import itertools
+import threading
+from collections import OrderedDict, deque
+
+# Fixed number of analysis threads shared by every session
+ANALYSIS_WORKERS = int(os.getenv("ANALYSIS_WORKERS", "2"))
+# Maximum number of queued (not yet running) analyses across all sessions
+ANALYSIS_QUEUE_LIMIT = int(os.getenv("ANALYSIS_QUEUE_LIMIT", "32"))
+# Workers that may run background prefetch jobs at the same time (the rest stay free for users)
+PREFETCH_WORKERS = int(os.getenv("PREFETCH_WORKERS", "1"))
+# Maximum number of queued prefetch jobs across all sessions
+PREFETCH_QUEUE_LIMIT = int(os.getenv("PREFETCH_QUEUE_LIMIT", "50"))
+
+
+class AnalysisJob:
+    """One queued analysis owned by a session"""
+
+    _ids = itertools.count(1)
+
+    def __init__(self, session_id, task, on_position=None, prefetch_key=None):
+        self.id = next(self._ids)
+        self.session_id = session_id
+        self.task = task
+        # Set for low-priority background jobs; identifies the article being prefetched
+        self.prefetch_key = prefetch_key
+        # Called with the number of jobs ahead of this one while it waits (0 = running)
+        self.on_position = on_position
+        self.status = "queued"  # queued, running, done, failed, cancelled
+        self._cancel_event = threading.Event()
+
+    @property
+    def is_prefetch(self):
+        return self.prefetch_key is not None
+
+    @property
+    def cancelled(self):
+        """Tasks check this between pipeline stages and stop early when set"""
+        return self._cancel_event.is_set()
+
+    def cancel(self):
+        self._cancel_event.set()
+        if self.status == "queued":
+            self.status = "cancelled"
+
+
+class AnalysisScheduler:
+    """
+    Bounded analysis queue with a fixed worker pool and per-session ownership.
+
+    Sessions are served round-robin: a worker takes one job from the session at
+    the front of the rotation, then moves that session to the back, so one
+    user queuing many articles cannot starve the others. Each session has at
+    most one pending analysis; submitting a new one cancels the previous one.
+
+    Prefetch jobs (speculative analyses of RSS items the user has not opened
+    yet) wait in a separate low-priority queue. A worker only takes one when
+    no user job is waiting, at most max_prefetch_workers run at once, and a
+    user job arriving while every worker is busy cancels a running prefetch
+    so it gets a worker at the next stage boundary.
+    """
+
+    def __init__(self, max_workers=ANALYSIS_WORKERS, max_queue=ANALYSIS_QUEUE_LIMIT,
+                 max_prefetch_workers=PREFETCH_WORKERS, max_prefetch_queue=PREFETCH_QUEUE_LIMIT):
+        self.max_workers = max_workers
+        self.max_queue = max_queue
+        self.max_prefetch_workers = min(max_prefetch_workers, max_workers)
+        self.max_prefetch_queue = max_prefetch_queue
+
+        self._condition = threading.Condition()
+        # session_id -> deque of queued jobs, in round-robin order
+        self._queues = OrderedDict()
+        self._running = {}
+        self._workers = []
+        # prefetch_key -> queued prefetch job, oldest first
+        self._prefetch_queue = OrderedDict()
+
+    def _start_workers(self):
+        """Start the worker threads the first time a job is submitted"""
+        if self._workers:
+            return
+        for index in range(self.max_workers):
+            worker = threading.Thread(target=self._work, name=f"analysis-worker-{index}", daemon=True)
+            worker.start()
+            self._workers.append(worker)
+
+    def submit(self, session_id, task, on_position=None):
+        """
+        Queue task(job) for a session.
+
+        Returns the AnalysisJob, or None when the queue is full (back-pressure).
+        """
+        with self._condition:
+            # The session's own queued jobs are about to be replaced, so they don't count
+            replaced = len(self._queues.get(session_id, ()))
+            if self.queue_depth_locked() - replaced >= self.max_queue:
+                # Refused: the session keeps its current analysis
+                return None
+
+            # A newer request from the same session replaces the older ones
+            self._cancel_locked(session_id)
+
+            job = AnalysisJob(session_id, task, on_position)
+            self._queues.setdefault(session_id, deque()).append(job)
+            self._preempt_prefetch_locked()
+            self._start_workers()
+            self._condition.notify()
+
+        self._report_positions()
+        return job
+
+    def submit_prefetch(self, session_id, prefetch_key, task):
+        """
+        Queue a low-priority background job for task(job).
+
+        Jobs for a key that is already queued or running are skipped.
+        Returns the AnalysisJob, or None when it was skipped or the prefetch queue is full.
+        """
+        with self._condition:
+            if prefetch_key in self._prefetch_queue:
+                return None
+            if any(job.prefetch_key == prefetch_key for job in self._running.values()):
+                return None
+            if len(self._prefetch_queue) >= self.max_prefetch_queue:
+                return None
+
+            job = AnalysisJob(session_id, task, prefetch_key=prefetch_key)
+            self._prefetch_queue[prefetch_key] = job
+            self._start_workers()
+            self._condition.notify()
+            return job
+
+    def cancel_prefetch(self, session_id):
+        """Drop a session's queued prefetch jobs (e.g. the user moved to another page)"""
+        with self._condition:
+            for key, job in list(self._prefetch_queue.items()):
+                if job.session_id == session_id:
+                    job.cancel()
+                    del self._prefetch_queue[key]
+
+    def _preempt_prefetch_locked(self):
+        """Cancel one running prefetch job if the new user job would otherwise have to wait"""
+        if len(self._running) < self.max_workers:
+            return
+        for job in self._running.values():
+            if job.is_prefetch and not job.cancelled:
+                job.cancel()
+                return
+
+    def cancel_analysis(self, session_id):
+        """Cancel a session's queued or running analysis but keep its prefetch jobs"""
+        with self._condition:
+            self._cancel_locked(session_id)
+        self._report_positions()
+
+    def cancel_session(self, session_id):
+        """Cancel every queued or running job of a session (e.g. the user navigated away)"""
+        with self._condition:
+            self._cancel_locked(session_id)
+            for key, job in list(self._prefetch_queue.items()):
+                if job.session_id == session_id:
+                    job.cancel()
+                    del self._prefetch_queue[key]
+        self._report_positions()
+
+    def _cancel_locked(self, session_id):
+        for job in self._queues.pop(session_id, ()):
+            job.cancel()
+        for job in self._running.values():
+            if job.session_id == session_id and not job.is_prefetch:
+                job.cancel()
+
+    def queue_depth_locked(self):
+        return sum(len(jobs) for jobs in self._queues.values())
+
+    def queue_depth(self):
+        """Number of analyses waiting for a worker"""
+        with self._condition:
+            return self.queue_depth_locked()
+
+    def stats(self):
+        """Queue depth, running jobs and capacity for monitoring"""
+        with self._condition:
+            return {
+                "queued": self.queue_depth_locked(),
+                "running": len(self._running),
+                "workers": self.max_workers,
+                "queue_limit": self.max_queue,
+                "sessions_waiting": len(self._queues),
+                "prefetch_queued": len(self._prefetch_queue),
+                "prefetch_running": self._running_prefetch_locked(),
+            }
+
+    def _positions_locked(self):
+        """Number of jobs ahead of each queued job, following the round-robin order"""
+        positions = []
+        pending = [list(jobs) for jobs in self._queues.values()]
+        ahead = 0
+        round_index = 0
+        while any(round_index < len(jobs) for jobs in pending):
+            for jobs in pending:
+                if round_index < len(jobs):
+                    positions.append((jobs[round_index], ahead))
+                    ahead += 1
+            round_index += 1
+        return positions
+
+    def _report_positions(self):
+        with self._condition:
+            positions = self._positions_locked()
+        for job, ahead in positions:
+            if job.on_position:
+                job.on_position(ahead + 1)
+
+    def _running_prefetch_locked(self):
+        return sum(1 for job in self._running.values() if job.is_prefetch)
+
+    def _has_work_locked(self):
+        """User jobs always count; prefetch jobs only while a prefetch slot is free"""
+        if self._queues:
+            return True
+        return bool(self._prefetch_queue) and self._running_prefetch_locked() < self.max_prefetch_workers
+
+    def _next_job_locked(self):
+        """Take one job from the session at the front and rotate it to the back"""
+        if not self._queues:
+            _, job = self._prefetch_queue.popitem(last=False)
+            return job
+
+        session_id, jobs = next(iter(self._queues.items()))
+        job = jobs.popleft()
+        del self._queues[session_id]
+        if jobs:
+            self._queues[session_id] = jobs
+        return job
+
+    def _work(self):
+        while True:
+            with self._condition:
+                while not self._has_work_locked():
+                    self._condition.wait()
+                job = self._next_job_locked()
+                job.status = "running"
+                self._running[job.id] = job
+
+            if not job.is_prefetch:
+                self._report_positions()
+            if job.on_position:
+                job.on_position(0)
+
+            try:
+                job.task(job)
+                job.status = "cancelled" if job.cancelled else "done"
+            except Exception as e:
+                job.status = "failed"
+                print(f"Analysis job {job.id} failed: {e}")
+            finally:
+                with self._condition:
+                    self._running.pop(job.id, None)
+                    # A freed prefetch slot may let a waiting prefetch job start
+                    self._condition.notify_all()
+
+
+# Shared by every Solara session in this process
+analysis_scheduler = AnalysisScheduler()
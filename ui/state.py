@@ -19,6 +19,8 @@ sidebar_open = solara.reactive(True)
 show_help_modal = solara.reactive(False)
 rss_link = solara.reactive("")
 is_loading = solara.reactive(False)
+analysis_status = solara.reactive("")  # Queue position / progress text shown while loading
+analysis_stages = solara.reactive({})  # Pipeline stage name -> "pending", "running", "done", "failed" or "cancelled"
 current_page = solara.reactive(0)
 items_per_page = 10
 error_message = solara.reactive("")